@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Measure selexe startup cost: CLI help, bare package import (ie. in worker processes) and driver module import.
+
+Each scenario runs in a fresh interpreter several times, best and median wall times are reported in milliseconds.
+
+Usage: python benchmarks/import_time.py [repeat]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+SCENARIOS = (
+    ('python (baseline)', ('-c', 'pass')),
+    ('import selexe', ('-c', 'import selexe')),
+    ('selexe --help', ('-c', 'from selexe.__main__ import main; main(["--help"])')),
+    ('import selexe.parse_sel', ('-c', 'import selexe.parse_sel')),
+    ('import selexe.selenium_driver', ('-c', 'import selexe.selenium_driver')),
+)
+
+
+def measure(args, repeat):
+    """
+    Run python with given arguments `repeat` times.
+
+    @param args: python command line arguments
+    @param repeat: number of runs
+    @return: list of wall times in milliseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.check_call((sys.executable,) + args, cwd=ROOT, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(repeat=10):
+    print('%-32s %10s %10s' % ('scenario', 'best ms', 'median ms'))
+    for name, args in SCENARIOS:
+        timings = measure(args, repeat)
+        print('%-32s %10.1f %10.1f' % (name, min(timings), statistics.median(timings)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -1,6 +1,5 @@
 import os
 import warnings
-from pkg_resources import parse_version
 
 from .selexe_runner import SelexeRunner, SelexeError
 from .__main__ import SelexeArgumentParser
@@ -9,4 +8,11 @@ warnings.filterwarnings('once', category=DeprecationWarning)  # show all depreca
 del warnings
 
 __version_str__ = open(os.path.join(os.path.dirname(__file__), 'version.txt')).readline().strip()
-__version__ = parse_version(__version_str__)
+
+
+def __getattr__(name):
+    # __version__ is parsed on first access, as importing pkg_resources is slow
+    if name == '__version__':
+        from pkg_resources import parse_version
+        return parse_version(__version_str__)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
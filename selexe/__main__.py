@@ -1,6 +1,7 @@
 
 import os
 import sys
+import json
 import functools
 import logging
 import argparse
@@ -94,10 +95,19 @@ class SelexeArgumentParser(argparse.ArgumentParser):
         self.add_main_args(self.add_argument)
         self.add_cli_args(self.add_argument)
 
-    @staticmethod
-    def add_main_args(add):
+    @classmethod
+    def add_main_args(cls, add):
         """Add command line arguments useful for both the CLI version and the one embedded in pytest-selexe
 
+        :param add: A function (e.g. ArgumentParser.add_argument() or pytest's Parser.addoption())
+        """
+        cls.add_runner_args(add)
+        cls.add_sequence_args(add)
+
+    @staticmethod
+    def add_runner_args(add):
+        """Add command line arguments configuring browsers and test runners, also supported in load mode
+
         :param add: A function (e.g. ArgumentParser.add_argument() or pytest's Parser.addoption())
         """
         add('--timeit', action='store_true', default=False,
@@ -108,12 +118,76 @@ class SelexeArgumentParser(argparse.ArgumentParser):
             help='base URI of server to run the selenium tests, ie. "http://localhost:8080"')
         add('--useragent', action='store', default=None,
             help='selenium browser useragent')
-        add('--pmd', action='store_true', default=False,
-            help='postmortem debugging')
         add('--selexe-fixtures', '-F', action='store',
             help='python module containing setUp(driver) and/or tearDown(driver) fixture functions')
         add('--size', '-S', metavar="WIDTHxHEIGHT", action=SizeAction,
             help='selenium browser window size, ie. 1280x720')
+        add('--profile', choices=sorted(selexe_runner.SelexeRunner.launch_profiles), default=None,
+            help='browser launch profile, ie. fast-headless (headless, no images, no first-run nor telemetry work)')
+        add('--no-check', dest='check', action='store_false', default=True,
+            help='do not validate selenese files before launching the browser')
+        add('--smart-pause', action='store_true', default=False,
+            help='make pause commands wait until page is quiet (loaded, without pending requests nor recent DOM '
+                 'changes) instead of sleeping, using pause time as upper bound')
+        add('--network-idle', action='store_true', default=False,
+            help='make open, AndWait commands and waitForPageToLoad also wait until there are no pending XHR, fetch '
+                 'nor connecting WebSocket requests, ie. for single-page applications')
+        add('--time-warp', metavar='FACTOR', type=int, default=1,
+            help='run page timers (setTimeout, setInterval, Date...) FACTOR times faster while waiting on pause and '
+                 'waitFor commands, ie. for debounced inputs or auto-hiding messages')
+        add('--no-animations', dest='animations', action='store_false', default=True,
+            help='disable CSS transitions, animations and smooth scrolling on every page, so visibility waits resolve '
+                 'without animation delays')
+        add('--fast-forms', action='store_true', default=False,
+            help='apply consecutive type, select, check and uncheck rows at once, setting values and dispatching input '
+                 'and change events in a single script call')
+        add('--native-input', metavar='SELECTOR', default=None,
+            help='CSS selector of form fields which must always get real keystrokes and clicks with --fast-forms')
+        add('--http-timeout', metavar='MILLISECONDS', type=int, default=None,
+            help='timeout for REST user functions (ie. putRest), defaults to selenium timeout')
+        add('--block', metavar='PATTERN', action='append', default=None,
+            help='answer requests whose host (or url, if pattern contains "/") matches wildcard PATTERN with an '
+                 'empty response, using a local proxy, ie. "*.google-analytics.com", can be given many times')
+        add('--cache-assets', action='store_true', default=False,
+            help='serve repeated static assets (scripts, stylesheets, fonts, images) to all browsers from a local '
+                 'caching proxy')
+        add('--cache-rule', metavar='PATTERN', dest='cache_rules', action='append', default=None,
+            help='wildcard pattern of url paths cached by --cache-assets, replacing default ones (ie. "*.js"), can be '
+                 'given many times')
+        add('--cache-dir', metavar='DIRECTORY', default=None,
+            help='directory where cached assets are also stored between runs, implies --cache-assets')
+        add('--cache-ttl', metavar='SECONDS', type=int, default=None,
+            help='maximum age of cached assets, no expiry by default')
+        add('--error-sentinel', metavar='SENTINEL', dest='error_sentinels', action='append', default=None,
+            help='condition aborting waits immediately when met: "title=REGEX", "js=EXPRESSION" or an element '
+                 'locator (ie. "css=.error-banner"), can be given many times')
+
+    @staticmethod
+    def add_sequence_args(add):
+        """Add command line arguments about running test files in sequence (debugging, setUp snapshots, shared
+        prefixes, prefetching and data rows), not supported in load mode
+
+        :param add: A function (e.g. ArgumentParser.add_argument() or pytest's Parser.addoption())
+        """
+        add('--pmd', action='store_true', default=False,
+            help='postmortem debugging')
+        add('--snapshot-setup', action='store_true', default=False,
+            help='call fixtures setUp once per baseuri and driver, restoring browser session (cookies, storages, url, '
+                 'stored variables) captured after it on following files')
+        add('--snapshot-dir', metavar='DIRECTORY', default=None,
+            help='directory where session snapshots are kept between runs, implies --snapshot-setup')
+        add('--snapshot-expiry', metavar='SECONDS', type=int, default=600,
+            help='maximum age of session snapshots, defaults to 600 seconds')
+        add('--shared-prefix', action='store_true', default=False,
+            help='run files starting with the same steps on a single browser per driver, running shared steps just '
+                 'once and restoring browser session state where they diverge')
+        add('--prefetch', metavar='K', type=int, default=0,
+            help='launch browsers for the next K runs in background while current one executes')
+        add('--data', metavar='FILE', default=None,
+            help='run every test file once per row of a CSV (with header row) or JSON (list of objects) data file, '
+                 'row values being stored variables')
+        add('--workers', metavar='N', type=int, default=1,
+            help='number of browsers running data rows in parallel with --data')
 
     @staticmethod
     def add_cli_args(add):
@@ -125,51 +199,101 @@ class SelexeArgumentParser(argparse.ArgumentParser):
             help='verbosity level, accumulated, ie. -vvv')
         add('--print-implemented-methods', action='store_true', default=False,
             help='Print list of currently implemented selese methods in selenium driver and exit.')
+        add('--check', dest='check_only', action='store_true', default=False,
+            help='Validate selenese files (commands, locators, arguments and suite links) for the chosen driver '
+                 'without running them and exit, with status 1 if any problem is found.')
+        add('--dump-commands', metavar='FILE', default=None,
+            help='Write JSON catalogue of selenese commands (name, variant, wait behaviour, implementation status) '
+                 'to FILE, or stdout if FILE is "-", and exit.')
         add('paths', metavar='PATH', nargs='*',
             help='Selenium IDE file paths')
 
 
-def print_implemented_methods():
-    """Print an alphabetically sorted list of implemented selenese methods in selenium driver"""
-    from .selenium_driver import SeleniumDriver
-    supported_methods = []
-    for attr in SeleniumDriver.__dict__:
-        method = getattr(SeleniumDriver, attr)
-        try:
-            # Set wait_for_page to False so that we can call 'method' further down without real driver instance
-            method.command.wait_for_page = False
-        except AttributeError:
-            # no such command attribute, i.e. method is not a SeleniumCommand
-            continue
-
-        try:
-            method(None)
-        except NotImplementedError:
-            # this method is only a stub and not implemented yet, so ignore it
-            continue
-        except:  # noqa
-            # This method just fails be cause we have not called it correctly. However it is at this
-            # stage very likely that this is a properly implemented selenese command.
-            supported_methods.append(attr)
-    supported_methods.sort()
-    print('\n'.join(supported_methods))
+def command_catalogue(driver_class=None):
+    """
+    Get catalogue of selenese commands from selenium driver command registry, see
+    `selexe.selenium_command.command_catalogue`.
 
+    @param driver_class: selenium driver class, defaults to SelexeRunner.browser_driver_class
+    @return: list of dictionaries, one per command, sorted by name
+    """
+    from .selenium_command import command_catalogue
+    driver_class = driver_class or selexe_runner.SelexeRunner.browser_driver_class
+    return command_catalogue(driver_class.commands)
 
-def main(argv=None):
+
+def dump_commands(path):
     """
-    Selexe command-line entry point
+    Write JSON catalogue of selenese commands, so tooling (editors, validators) can check commands without importing
+    selenium.
 
-    @param argv: list of command line arguments (excluding command), defaults to sys.argv slice
-    @raise SystemExit on completion
+    @param path: destination file path or '-' for stdout
     """
-    args = SelexeArgumentParser().parse_args(sys.argv[1:] if argv is None else argv)
+    from . import __version_str__
+    data = {'selexe': __version_str__, 'commands': command_catalogue()}
+    if path == '-':
+        json.dump(data, sys.stdout, indent=1)
+        sys.stdout.write('\n')
+    else:
+        with open(path, 'w') as fp:
+            json.dump(data, fp, indent=1)
 
-    if args.print_implemented_methods:
-        print_implemented_methods()
-        exit()
 
+def print_implemented_methods():
+    """Print an alphabetically sorted list of implemented selenese methods in selenium driver"""
+    print('\n'.join(command['name'] for command in command_catalogue() if command['implemented']))
+
+
+def think_time_range(value):
+    """Parse think time argument, "SECONDS" or "MIN-MAX", into a (min, max) tuple"""
+    try:
+        low, _, high = value.partition('-')
+        return float(low), float(high or low)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid think time %r' % value)
+
+
+class LoadArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser for selexe load mode"""
+    def __init__(self):
+        super(LoadArgumentParser, self).__init__(
+            prog='selexe load', description='Replay Selenium IDE test files as concurrent virtual users')
+        SelexeArgumentParser.add_runner_args(self.add_argument)
+        self.add_load_args(self.add_argument)
+
+    @staticmethod
+    def add_load_args(add):
+        """Add command line arguments of load mode
+
+        :param add: A function (e.g. ArgumentParser.add_argument())
+        """
+        add('--users', '-u', metavar='N', type=int, default=1,
+            help='number of concurrent virtual users, each one driving its own browser')
+        add('--ramp-up', metavar='SECONDS', type=float, default=0.,
+            help='period along which virtual users are started')
+        add('--think-time', metavar='SECONDS', type=think_time_range, default=(0., 0.),
+            help='pause of virtual users after every page change, or random pause range, ie. "2" or "1-3"')
+        add('--duration', metavar='SECONDS', type=float, default=None,
+            help='stop starting new iterations after SECONDS, users run test files in turn until then')
+        add('--iterations', metavar='N', type=int, default=None,
+            help='maximum number of test file runs per user, defaults to one if no duration is given')
+        add('--report', metavar='FILE', default=None,
+            help='write summary report to FILE, as JSON if FILE ends with .json, defaults to stdout')
+        add('--verbose', '-v', action=VerbosityAction,
+            help='verbosity level, accumulated, ie. -vvv')
+        add('paths', metavar='PATH', nargs='+',
+            help='Selenium IDE file paths')
+
+
+def configure_logging(args):
+    """
+    Configure selexe (and selenium, on debug verbosity) loggers from command line arguments.
+
+    @param args: parsed command line arguments
+    @return: selexe logger
+    """
     maxlevel = (logging.INFO if args.timeit else logging.ERROR)
-    level = min(maxlevel, args.verbose, args.logging)
+    level = min(maxlevel, args.verbose)
 
     # Create handler with TTYColorFormat
     handler = logging.StreamHandler()
@@ -188,28 +312,166 @@ def main(argv=None):
     logger.setLevel(level)
     logger.addHandler(handler)
     logger.propagate = False
+    return logger
+
+
+def runner_options(args):
+    """
+    Get SelexeRunner keyword arguments from command line arguments.
+
+    @param args: parsed command line arguments
+    @return: dictionary, with a LocalProxy instance as proxy if requests are blocked or assets cached
+    """
+    options = dict(baseuri=args.baseuri, fixtures=args.selexe_fixtures, timeit=args.timeit, window_size=args.size,
+                   useragent=args.useragent, http_timeout=args.http_timeout, check=args.check,
+                   error_sentinels=args.error_sentinels, profile=args.profile, smart_pause=args.smart_pause,
+                   network_idle=args.network_idle, time_warp=args.time_warp, animations=args.animations,
+                   fast_forms=args.fast_forms, native_input=args.native_input)
+    if args.block or args.cache_assets or args.cache_dir:
+        from .proxy import LocalProxy
+        cache = None
+        if args.cache_assets or args.cache_dir:
+            from .asset_cache import AssetCache
+            cache = AssetCache(rules=args.cache_rules, directory=args.cache_dir, ttl=args.cache_ttl)
+        options['proxy'] = LocalProxy(block=args.block, cache=cache)
+    return options
+
+
+def load_main(argv):
+    """
+    Selexe load mode entry point, see `selexe.load`
+
+    @param argv: list of command line arguments (excluding command and mode)
+    @raise SystemExit on completion
+    """
+    from .load import LoadRunner
+    args = LoadArgumentParser().parse_args(argv)
+    logger = configure_logging(args)
+    options = runner_options(args)
+    reports = []
+    try:
+        for driver in args.drivers:
+            runner = LoadRunner(args.paths, users=args.users, ramp_up=args.ramp_up, think_time=args.think_time,
+                                duration=args.duration, iterations=args.iterations, driver=driver, **options)
+            reports.append(runner.run())
+    finally:
+        if options.get('proxy'):
+            options['proxy'].close()
+
+    for driver, report in zip(args.drivers, reports):
+        if args.report:
+            root, extension = os.path.splitext(args.report)
+            path = args.report if len(args.drivers) == 1 else '%s.%s%s' % (root, driver, extension)
+            report.write(path)
+            logger.info('Load report for %s written to %s' % (driver, path))
+        else:
+            print(report.format())
+    failed = sum(report.failed for report in reports)
+    if failed:
+        logger.error('%d of %d iterations failed.' % (failed, sum(report.iterations for report in reports)))
+    sys.exit(1 if failed else 0)
+
+
+def main(argv=None):
+    """
+    Selexe command-line entry point, "load" as first argument switches to load mode (see `load_main`)
+
+    @param argv: list of command line arguments (excluding command), defaults to sys.argv slice
+    @raise SystemExit on completion
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'load':
+        load_main(argv[1:])
+        return
+
+    args = SelexeArgumentParser().parse_args(argv)
+
+    if args.print_implemented_methods:
+        print_implemented_methods()
+        exit()
+
+    if args.dump_commands:
+        dump_commands(args.dump_commands)
+        exit()
+
+    if args.check_only:
+        from .selenese_check import check_paths, format_problems
+        problems = [
+            problem
+            for driver in args.drivers
+            for problem in check_paths(args.paths, driver_class=selexe_runner.SelexeRunner.driver_class_for(driver),
+                                       baseuri=args.baseuri)
+            ]
+        if problems:
+            print(format_problems(problems))
+        sys.exit(1 if problems else 0)
+
+    logger = configure_logging(args)
 
     # Run selenium tests
+    options = runner_options(args)
+    options['pmd'] = args.pmd
+    if args.snapshot_setup or args.snapshot_dir:
+        from .session_snapshot import SnapshotCache
+        options['snapshot_cache'] = SnapshotCache(expiry=args.snapshot_expiry, directory=args.snapshot_dir)
+    prefetcher = None
+    if args.prefetch:
+        from .browser_pool import BrowserPrefetcher
+        prefetcher = BrowserPrefetcher(size=args.prefetch)
+    data = None
+    if args.data:
+        from .data_driven import DataDrivenRunner, load_data
+        data = load_data(args.data)
+    jobs = []
+    for driver in args.drivers:
+        if data is not None:
+            for path in args.paths:
+                runner = DataDrivenRunner(path, data=data, workers=args.workers, driver=driver, prefetcher=prefetcher,
+                                          **options)
+                jobs.append((runner.labels, runner))
+        elif args.shared_prefix:
+            from .prefix_tree import SharedPrefixRunner
+            jobs.append((args.paths, SharedPrefixRunner(args.paths, driver=driver, prefetcher=prefetcher, **options)))
+        else:
+            jobs.extend(
+                ([path], selexe_runner.SelexeRunner(path, driver=driver, prefetcher=prefetcher, **options))
+                for path in args.paths
+                )
+    if prefetcher:
+        prefetcher.schedule(runner for paths, runner in jobs)
+
     failed = 0
-    for path in args.paths:
-        for driver in args.drivers:
-            runner = selexe_runner.SelexeRunner(path, baseuri=args.baseuri, pmd=args.pmd, fixtures=args.fixtures,
-                                                timeit=args.timeit, driver=driver, window_size=args.size,
-                                                useragent=args.useragent)
+    try:
+        for paths, runner in jobs:
             try:
-                errors = runner.run()
+                results = runner.run()
+                if not isinstance(results, dict):
+                    results = {paths[0]: results}
             except KeyboardInterrupt:
                 raise
             except Exception as msg:
-                errors = "Running %s failed with %s\n" % (path, str(msg))
-            if errors:
-                failed += 1
-                logging.error("Verification errors in %s %s: %s\n" % (driver, path, errors))
+                results = {path: "Running %s failed with %s\n" % (path, str(msg)) for path in paths}
+            for path in paths:
+                errors = results.get(path)
+                if errors:
+                    failed += 1
+                    logging.error("Verification errors in %s %s: %s\n" % (runner.webdriver, path, errors))
+    finally:
+        if prefetcher:
+            prefetcher.close()
+        if options.get('proxy'):
+            options['proxy'].close()
 
     # Result reporting
     log = logger.error if failed else functools.partial(logger.log, SUCCESS)
     text = ('failed' if failed else 'passed')
-    if len(args.paths) == 1:
+    if data is not None:
+        total = len(args.paths) * len(data)
+        if failed:
+            log('%d of %d data-driven runs failed.' % (failed, total))
+        else:
+            log('All %d data-driven runs passed.' % total)
+    elif len(args.paths) == 1:
         log('Test file %s.' % text)
     elif failed:
         log('%d of %d test files failed.' % (failed, len(args.paths)))
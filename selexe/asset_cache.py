@@ -0,0 +1,199 @@
+"""
+Asset cache
+-----------
+Cache of static asset responses (scripts, stylesheets, fonts, images...) used by `selexe.proxy.LocalProxy`, so
+browsers sharing the proxy (each one starting with a cold cache on its fresh profile) download every asset from the
+application under test just once.
+
+Only plain HTTP requests can be cached, HTTPS ones are tunneled by the proxy. As the cache is shared between browser
+sessions, responses setting cookies and responses to requests sending credentials (cookies or authorization) are never
+stored.
+"""
+import os
+import json
+import time
+import fnmatch
+import hashlib
+import logging
+import threading
+import collections
+from urllib.parse import urlsplit
+
+from .connection_pool import Response
+
+
+logger = logging.getLogger(__name__)
+
+
+class AssetCache(object):
+    """
+    Thread-safe LRU cache of GET responses whose url path matches any of `rules` wildcard patterns, kept in memory up
+    to `max_memory` bytes and optionally in a directory.
+    """
+    default_rules = ('*.js', '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*.png', '*.jpg', '*.jpeg',
+                     '*.gif', '*.svg', '*.ico', '*.webp')
+    uncacheable_directives = ('no-store', 'private')
+    keyed_headers = ('accept-encoding',)  # request headers cache keys depend on, see `key`
+    credential_headers = ('cookie', 'authorization')  # request headers making responses session specific
+
+    def __init__(self, rules=None, max_memory=64 * 1024 * 1024, directory=None, ttl=None):
+        """
+        @param rules: iterable of wildcard patterns matched against url paths, defaults to `default_rules`
+        @param max_memory: maximum size in bytes of responses kept in memory
+        @param directory: optional directory where responses are also stored, shared between processes and runs
+        @param ttl: maximum age of cached responses in seconds, None for no expiry
+        """
+        self.rules = tuple(self.default_rules if rules is None else rules)
+        self.max_memory = max_memory
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # (created, Response) by key, in LRU order
+        self._memory = 0
+        self._lock = threading.Lock()
+
+    def cacheable(self, method, url):
+        """
+        @param method: HTTP method
+        @param url: absolute request url
+        @return: True if request matches caching rules
+        """
+        if method != 'GET':
+            return False
+        path = urlsplit(url).path
+        return any(fnmatch.fnmatchcase(path, rule) for rule in self.rules)
+
+    @staticmethod
+    def key(url, headers):
+        """
+        @param url: absolute request url
+        @param headers: request headers dictionary, or list of (name, value) tuples
+        @return: cache key, different for every content encoding browsers accept
+        """
+        items = headers.items() if isinstance(headers, dict) else headers
+        encoding = next((value for key, value in items if key.lower() == 'accept-encoding'), '')
+        return url, encoding
+
+    def _path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, 'selexe-asset-%s' % digest)
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _remember(self, key, created, response):
+        """Keep response in memory, evicting least recently used ones over `max_memory`"""
+        size = len(response.data)
+        if size > self.max_memory:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory -= len(previous[1].data)
+            self._entries[key] = (created, response)
+            self._memory += size
+            while self._memory > self.max_memory:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._memory -= len(evicted.data)
+
+    def _load(self, key):
+        """Get (created, response) tuple from directory, or None"""
+        path = self._path(key)
+        try:
+            with open('%s.json' % path) as f:
+                meta = json.load(f)
+            with open('%s.body' % path, 'rb') as f:
+                data = f.read()
+        except (IOError, ValueError):
+            return None
+        headers = [tuple(header) for header in meta['headers']]
+        return meta['created'], Response(meta['status'], meta['reason'], headers, data)
+
+    def _save(self, key, created, response):
+        """Store response in directory"""
+        path = self._path(key)
+        meta = {'created': created, 'status': response.status, 'reason': response.reason,
+                'headers': response.headers}
+        try:
+            with open('%s.body.%d.tmp' % (path, os.getpid()), 'wb') as f:
+                f.write(response.data)
+            with open('%s.json.%d.tmp' % (path, os.getpid()), 'w') as f:
+                json.dump(meta, f)
+            os.replace('%s.body.%d.tmp' % (path, os.getpid()), '%s.body' % path)
+            os.replace('%s.json.%d.tmp' % (path, os.getpid()), '%s.json' % path)
+        except (IOError, TypeError, ValueError) as e:
+            logger.warning('Asset cannot be cached to %s: %s' % (path, e))
+
+    def get(self, url, headers):
+        """
+        Get cached response for given request, accounting hit or miss.
+
+        @param url: absolute request url
+        @param headers: request headers dictionary, or list of (name, value) tuples
+        @return: `selexe.connection_pool.Response` namedtuple or None
+        """
+        key = self.key(url, headers)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.directory:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, *entry)
+        if entry is None or self._expired(entry[0]):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry[1]
+
+    def put(self, url, headers, response):
+        """
+        Cache response for given request, if cacheable (successful, not marked as private or no-store, not varying on
+        request headers cache keys do not depend on, and neither setting cookies nor answering a request sending
+        credentials, as it could be served to other sessions).
+
+        @param url: absolute request url
+        @param headers: request headers dictionary, or list of (name, value) tuples
+        @param response: `selexe.connection_pool.Response` namedtuple
+        """
+        if response.status != 200:
+            return
+        items = headers.items() if isinstance(headers, dict) else headers
+        if any(name.lower() in self.credential_headers for name, _ in items):
+            return
+        for name, value in response.headers:
+            if name.lower() == 'set-cookie':
+                return
+            if name.lower() == 'cache-control' and any(d in value.lower() for d in self.uncacheable_directives):
+                return
+            if name.lower() == 'vary' and any(field.strip().lower() not in self.keyed_headers
+                                              for field in value.split(',')):
+                return
+        key = self.key(url, headers)
+        created = time.time()
+        self._remember(key, created, response)
+        if self.directory:
+            self._save(key, created, response)
+
+    @property
+    def hit_ratio(self):
+        """ Ratio of cacheable requests served from cache, None if there was none. """
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else None
+
+    def stats(self):
+        """
+        @return: dictionary with hits, misses, hit_ratio, entries and memory (bytes) keys
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hit_ratio,
+                'entries': len(self._entries),
+                'memory': self._memory,
+                }
@@ -0,0 +1,113 @@
+"""
+Browser prefetching
+-------------------
+Browser startup takes seconds. When many files are run one after another, browsers for the next scheduled runs can be
+launched in background while the current file executes, so startup overlaps with test execution instead of adding to
+it.
+"""
+import logging
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPrefetcher(object):
+    """
+    Keeps browsers for up to `size` scheduled runners launching in background, ahead of demand.
+
+    Browsers are launched using runner's `launch_webdriver` method, so runner's webdriver, options (including
+    useragent) and window size are honored.
+
+    Example:
+        >>> prefetcher = BrowserPrefetcher(size=2)
+        >>> runners = [SelexeRunner(path, prefetcher=prefetcher) for path in paths]
+        >>> prefetcher.schedule(runners)
+        >>> with prefetcher:
+        ...     for runner in runners:
+        ...         runner.run()
+    """
+    def __init__(self, size=1):
+        """
+        @param size: number of browsers launched ahead of demand
+        """
+        self.size = size
+        self._queue = collections.deque()  # scheduled runners whose browser is not launched yet
+        self._launching = collections.OrderedDict()  # futures of browsers launched ahead by runner
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(size, 1))
+
+    def schedule(self, runners):
+        """
+        Add runners, in the order they will acquire their browsers.
+
+        @param runners: iterable of SelexeRunner instances
+        """
+        with self._lock:
+            self._queue.extend(runners)
+
+    def _fill(self):
+        """Start launching browsers for next scheduled runners, up to `size`"""
+        with self._lock:
+            while self._queue and len(self._launching) < self.size:
+                runner = self._queue.popleft()
+                logger.debug('Prefetching %s browser for %s' % (runner.webdriver, runner.filename))
+                self._launching[runner] = self._executor.submit(runner.launch_webdriver)
+
+    def acquire(self, runner):
+        """
+        Get browser for given runner, launched ahead if it was scheduled, and start launching next ones.
+
+        @param runner: SelexeRunner instance
+        @return: selenium WebDriver instance
+        """
+        with self._lock:
+            future = self._launching.pop(runner, None)
+            if future is None and runner in self._queue:
+                self._queue.remove(runner)
+        self._fill()
+        if future is None:
+            return runner.launch_webdriver()
+        return future.result()
+
+    def discard(self, runner):
+        """
+        Forget given runner, ie. when it fails before acquiring its browser, quitting its browser if launched ahead.
+
+        @param runner: SelexeRunner instance
+        """
+        with self._lock:
+            future = self._launching.pop(runner, None)
+            if future is None and runner in self._queue:
+                self._queue.remove(runner)
+        if future is not None and not future.cancel():
+            future.add_done_callback(self._quit)
+        self._fill()
+
+    @staticmethod
+    def _quit(future):
+        """Quit browser of given launch future, if launched successfully"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            future.result().quit()
+        except Exception:  # noqa
+            logger.exception('Prefetched browser cannot be quit')
+
+    def close(self):
+        """Stop launching browsers and quit those launched but never acquired"""
+        with self._lock:
+            self._queue.clear()
+            launching, self._launching = self._launching, collections.OrderedDict()
+        for future in launching.values():
+            if not future.cancel():
+                future.add_done_callback(self._quit)
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
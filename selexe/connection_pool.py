@@ -0,0 +1,277 @@
+"""
+HTTP connection pool
+--------------------
+This module provides a small keep-alive HTTP client used by the REST user functions (see `selexe.userfunctions`).
+
+Connections are kept per scheme, host and port and reused between requests, so fixture-heavy tests issuing hundreds
+of REST calls only need a handful of sockets instead of one (never closed) socket per call.
+"""
+import select
+import contextlib
+import logging
+import threading
+import collections
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+Response = collections.namedtuple('Response', ('status', 'reason', 'headers', 'data'))
+
+# Errors raised when a server already closed an idle keep-alive connection
+STALE_CONNECTION_EXCEPTIONS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError,
+                               BrokenPipeError)
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections keyed by (scheme, host, port).
+
+    Responses are always read completely (drained) before connections are given back to the pool, so they can be
+    safely reused by the next request.
+    """
+    connection_classes = {
+        'http': http.client.HTTPConnection,
+        'https': http.client.HTTPSConnection,
+    }
+    default_ports = {
+        'http': 80,
+        'https': 443,
+    }
+    retried_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')  # safe to send again if server may have got them
+
+    def __init__(self, timeout=30., maxsize=10, ssl_context=None):
+        """
+        @param timeout: socket timeout in seconds for connecting and reading, None for no timeout
+        @param maxsize: maximum number of idle connections kept per (scheme, host, port)
+        @param ssl_context: optional ssl.SSLContext used for https connections
+        """
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.ssl_context = ssl_context
+        self._idle = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def split_url(cls, url, baseuri=None):
+        """
+        Get pool key and request path for given url, relative urls are resolved against baseuri.
+
+        @param url: absolute url or path
+        @param baseuri: base url used for relative urls, ie. "http://localhost:8080"
+        @return: tuple with (scheme, host, port) key and path (including query string)
+        """
+        if '://' not in url:
+            if not baseuri:
+                raise RuntimeError('Relative %r cannot be resolved, baseuri not specified.' % url)
+            if '://' not in baseuri:
+                baseuri = 'http://%s' % baseuri  # compatibility with bare host:port baseuris
+            url = '%s%s' % (baseuri.rstrip('/'), url if url.startswith('/') else '/%s' % url)
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in cls.connection_classes:
+            raise ValueError('Unsupported url scheme %r' % scheme)
+        path = parts.path or '/'
+        if parts.query:
+            path = '%s?%s' % (path, parts.query)
+        return (scheme, parts.hostname, parts.port or cls.default_ports[scheme]), path
+
+    def _connect(self, key):
+        """
+        Create a new connection for given pool key.
+
+        @param key: (scheme, host, port) tuple
+        @return: http.client.HTTPConnection instance
+        """
+        scheme, host, port = key
+        kwargs = {'timeout': self.timeout}
+        if scheme == 'https' and self.ssl_context is not None:
+            kwargs['context'] = self.ssl_context
+        logger.debug('Opening %s connection to %s:%d' % (scheme, host, port))
+        return self.connection_classes[scheme](host, port, **kwargs)
+
+    def _acquire(self, key):
+        """
+        Get an idle connection for given key or create a new one.
+
+        @param key: (scheme, host, port) tuple
+        @return: tuple with connection and True if connection was reused, False otherwise
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                connection = idle.pop()
+                if not self._dropped(connection):
+                    return connection, True
+                logger.debug('Discarding connection to %s:%d closed by server' % key[1:])
+                connection.close()
+        return self._connect(key), False
+
+    @staticmethod
+    def _dropped(connection):
+        """
+        Check if an idle connection was closed by the server, as idle connections have nothing to read otherwise.
+
+        @param connection: http.client.HTTPConnection instance
+        @return: True if connection cannot be reused
+        """
+        if connection.sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _release(self, key, connection):
+        """
+        Give connection back to the pool, closing it if pool is full.
+
+        @param key: (scheme, host, port) tuple
+        @param connection: http.client.HTTPConnection instance
+        """
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.maxsize:
+                idle.append(connection)
+                return
+        connection.close()
+
+    @staticmethod
+    def _send(connection, method, path, body, headers):
+        """
+        Send request over given connection.
+
+        @param connection: http.client.HTTPConnection instance
+        @param method: HTTP method
+        @param path: request path
+        @param body: request body or None, str bodies are sent UTF-8 encoded
+        @param headers: dictionary of request headers, or list of (name, value) tuples
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')  # so Content-Length counts bytes, not characters
+        if isinstance(headers, dict):
+            connection.request(method, path, body, headers)
+            return
+        names = {name.lower() for name, _ in headers}
+        connection.putrequest(method, path, skip_host='host' in names, skip_accept_encoding='accept-encoding' in names)
+        for name, value in headers:
+            connection.putheader(name, value)
+        if body is not None and 'content-length' not in names:
+            connection.putheader('Content-Length', str(len(body)))
+        connection.endheaders(body)
+
+    def _open(self, key, method, path, body, headers):
+        """
+        Send a request over a pooled connection and read response status and headers, see `request`.
+
+        @param key: (scheme, host, port) tuple
+        @return: tuple with connection and http.client.HTTPResponse instance, whose body is not read yet
+        """
+        for retry in (False, True):
+            connection, reused = self._acquire(key)
+            sent = False
+            try:
+                self._send(connection, method, path, body, headers)
+                sent = True
+                return connection, connection.getresponse()
+            except STALE_CONNECTION_EXCEPTIONS:
+                connection.close()
+                if reused and not retry and (not sent or method.upper() in self.retried_methods):
+                    logger.debug('Discarding stale connection to %s:%d' % key[1:])
+                    continue
+                raise
+            except:  # noqa
+                connection.close()
+                raise
+
+    def _done(self, key, connection, response):
+        """
+        Give connection back to the pool if response was read completely and connection is kept alive, close it
+        otherwise.
+        """
+        if response.isclosed() and not response.will_close:
+            self._release(key, connection)
+        else:
+            connection.close()
+
+    def request(self, method, url, body=None, headers=None, baseuri=None):
+        """
+        Send a request over a pooled connection and read the whole response.
+
+        Idle connections already closed by the server are discarded before sending. A request failing on a reused
+        connection which was closed by the server meanwhile is retried once on a fresh connection, if its method is
+        one of `retried_methods` or if it failed while being sent (so it was not handled), as other requests (ie.
+        POST) could have been handled already.
+
+        @param method: HTTP method, ie. "GET"
+        @param url: absolute url or path relative to baseuri
+        @param body: optional request body (str, sent UTF-8 encoded, or bytes)
+        @param headers: optional dictionary of request headers, or list of (name, value) tuples to send repeated ones
+        @param baseuri: base url used for relative urls
+        @return: Response namedtuple with status, reason, headers (list of tuples) and data (bytes)
+        """
+        key, path = self.split_url(url, baseuri)
+        connection, response = self._open(key, method, path, body, headers or {})
+        try:
+            data = response.read()  # drain response, so connection can be reused
+        except:  # noqa
+            connection.close()
+            raise
+        self._done(key, connection, response)
+        return Response(response.status, response.reason, response.getheaders(), data)
+
+    @contextlib.contextmanager
+    def stream(self, method, url, body=None, headers=None, baseuri=None):
+        """
+        Send a request over a pooled connection, giving its response before reading its body, ie. to forward it as
+        it is received. Connection is given back to the pool on exit if response body was read completely.
+
+        Example:
+            >>> with pool.stream('GET', 'http://localhost:8080/events') as response:
+            ...     chunk = response.read1(65536)
+
+        @param method: HTTP method, ie. "GET"
+        @param url: absolute url or path relative to baseuri
+        @param body: optional request body (str, sent UTF-8 encoded, or bytes)
+        @param headers: optional dictionary of request headers, or list of (name, value) tuples to send repeated ones
+        @param baseuri: base url used for relative urls
+        @yield: http.client.HTTPResponse instance
+        """
+        key, path = self.split_url(url, baseuri)
+        connection, response = self._open(key, method, path, body, headers or {})
+        try:
+            yield response
+        except:  # noqa
+            connection.close()
+            raise
+        self._done(key, connection, response)
+
+    def batch(self, requests, baseuri=None, max_workers=None):
+        """
+        Send many requests concurrently over the pool.
+
+        @param requests: iterable of (method, url, body, headers) tuples, body and headers are optional
+        @param baseuri: base url used for relative urls
+        @param max_workers: maximum number of concurrent requests, defaults to pool's maxsize
+        @return: list of Response namedtuples, in the same order as given requests
+        @raise: first exception raised by any of the requests
+        """
+        requests = [tuple(request) + (None,) * (4 - len(request)) for request in requests]
+        if not requests:
+            return []
+        workers = min(max_workers or self.maxsize, len(requests))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.request, method, url, body, headers, baseuri)
+                       for method, url, body, headers in requests]
+            return [future.result() for future in futures]
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, collections.defaultdict(collections.deque)
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
@@ -0,0 +1,180 @@
+"""
+Data-driven execution
+---------------------
+Runs a single selenese file once per row of a CSV or JSON data file, every row seeding stored variables, so
+`${variable}` references in the file take row values. The file is parsed and validated only once, and rows are run in
+parallel by a pool of browsers, each browser running many rows one after another.
+
+CSV files must have a header row with variable names. JSON files must contain a list of objects, values which are not
+strings (numbers, booleans, null...) are converted to their JSON text, as variables are expanded into command text.
+
+Browsers are reused between rows: cookies and storages of the current page origin are cleared before every row, so
+test files should not rely on state left on other origins.
+"""
+import os
+import csv
+import json
+import logging
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from .selexe_runner import SelexeRunner, SelexeError
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_data(path, encoding='utf-8'):
+    """
+    Load data rows from CSV (with header row) or JSON (list of objects) file.
+
+    @param path: data file path, format is guessed from extension (.json or any other for CSV)
+    @param encoding: file encoding
+    @return: list of dictionaries of strings
+    @raise SelexeError: if file cannot be loaded
+    """
+    try:
+        if os.path.splitext(path)[1].lower() == '.json':
+            with open(path, encoding=encoding) as f:
+                rows = json.load(f)
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise SelexeError('Data file %s must contain a list of objects' % path)
+            return [
+                {name: value if isinstance(value, str) else json.dumps(value) for name, value in row.items()}
+                for row in rows
+                ]
+        with open(path, encoding=encoding, newline='') as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    except (IOError, ValueError, csv.Error) as e:
+        raise SelexeError('Data file %s cannot be loaded: %s' % (path, e))
+
+
+class DataDrivenRunner(SelexeRunner):
+    """
+    Runner executing a selenese file once per data row, on a pool of browsers, see module documentation.
+    """
+    def __init__(self, filename, data=(), workers=1, **kwargs):
+        """
+        @param filename: Selenium IDE file
+        @param data: iterable of dictionaries of stored variables, one per run, or data file path (see `load_data`)
+        @param workers: number of browsers running rows in parallel
+        @param **kwargs: keyword arguments accepted by SelexeRunner
+        """
+        super(DataDrivenRunner, self).__init__(filename, **kwargs)
+        self.data = load_data(data, self.encoding) if isinstance(data, str) else list(data)
+        self.workers = max(workers, 1)
+
+    @property
+    def labels(self):
+        """Labels of every data row run, as used as result keys"""
+        return [self.label(number) for number in range(1, len(self.data) + 1)]
+
+    def label(self, number):
+        """
+        @param number: data row number, starting from 1
+        @return: label identifying data row run
+        """
+        return '%s [row %d]' % (self.filename, number)
+
+    def run(self):
+        """
+        Start execution of selenium tests once per data row (within setUp and tearDown wrappers)
+
+        @return: ordered dictionary with verification errors (list) by data row label, or error message if run failed
+        """
+        logger.info('Selexe working on file %s with %d data rows' % (self.filename, len(self.data)))
+        self.track_proxy()
+        try:
+            parser = self.parser_class.from_path(self.filename, encoding=self.encoding)
+            if self.check:
+                self.validate(parser)
+            rows = list(parser)
+        except Exception:  # noqa
+            if self.prefetcher is not None:
+                self.prefetcher.discard(self)
+            self.release_proxy()
+            raise
+
+        queue = collections.deque(enumerate(self.data, 1))
+        results = {}
+        errors = []
+        lock = threading.Lock()
+        workers = min(self.workers, len(self.data))
+        if not workers and self.prefetcher is not None:
+            self.prefetcher.discard(self)
+        try:
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+                futures = [
+                    executor.submit(self._work, worker, queue, rows, results, errors, lock)
+                    for worker in range(workers)
+                    ]
+                for future in futures:
+                    future.result()
+        finally:
+            self.release_proxy()
+        for number in range(1, len(self.data) + 1):
+            if number not in results:
+                results[number] = 'Running %s failed with %s\n' % (
+                    self.label(number), errors[0] if errors else 'no browser available')
+        return collections.OrderedDict((self.label(number), results[number]) for number in sorted(results))
+
+    def _work(self, worker, queue, rows, results, errors, lock):
+        """Run queued data rows one after another on a single browser"""
+        driver = None
+        try:
+            while True:
+                try:
+                    number, data = queue.popleft()
+                except IndexError:
+                    return
+                if driver is None:
+                    try:
+                        # first worker takes the browser launched ahead by prefetcher, if any
+                        driver = self.acquire_webdriver() if worker == 0 else self.launch_webdriver()
+                    except Exception as e:  # noqa
+                        logger.exception('Browser for %s cannot be launched' % self.label(number))
+                        with lock:
+                            errors.append(e)
+                        queue.appendleft((number, data))  # left to other workers
+                        return
+                    reset = False
+                else:
+                    reset = True
+                result = self._runRow(driver, rows, number, data, reset)
+                with lock:
+                    results[number] = result
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    def _runRow(self, driver, rows, number, data, reset=False):
+        """
+        Run selenese rows with given data row as stored variables.
+
+        @param driver: selenium WebDriver instance
+        @param rows: parsed selenese rows
+        @param number: data row number
+        @param data: dictionary of stored variables
+        @param reset: clear cookies and storages left by a previous run if True
+        @return: list of verification errors or error message
+        """
+        label = self.label(number)
+        logger.info('Running %s' % label)
+        sd = self.create_driver(driver)
+        try:
+            if reset:
+                driver.delete_all_cookies()
+                try:
+                    sd.runtime.call('restoreStorage', {'localStorage': {}, 'sessionStorage': {}})
+                except Exception as e:  # noqa
+                    logger.debug('Storages cannot be cleared: %s' % e)  # ie. about:blank
+            sd.storedVariables = data
+            return self._wrapExecution(rows, sd)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:  # noqa
+            # any error, SelexeError included (ie. raised by fixtures), only fails this data row
+            return 'Running %s failed with %s\n' % (label, e)
+        finally:
+            sd.close_connections()
@@ -0,0 +1,418 @@
+"""
+HTTP driver
+-----------
+Browserless selenese driver, replaying navigation and REST rows over plain HTTP, ie. for smoke checks and load runs
+needing thousands of iterations per minute.
+
+`HttpSession` stands in for a webdriver: it opens pages with a keep-alive connection pool (see
+`selexe.connection_pool`), keeps cookies in a cookie jar and follows redirects. `HttpDriver` runs selenese commands on
+it: `open`, REST user functions (ie. `postRest`, `assertGetRest`), title, location and text presence commands (ie.
+`verifyTitle`, `verifyTextPresent`) on server-rendered HTML, parsed with python's own HTML parser.
+
+No script is ever run, so text presence only sees text rendered by the server, and hides nothing but text of script,
+style, template, noscript and head elements, as stylesheets are not evaluated. Commands needing a browser (clicks,
+typing, JavaScript...) are refused with a clear error, both by `SelexeRunner` pre-flight validation and on execution.
+"""
+import os
+import time
+import email.message
+import logging
+import urllib.request
+import http.cookiejar
+from urllib.parse import urljoin
+from html.parser import HTMLParser
+
+from selenium.common.exceptions import TimeoutException
+
+from .selenium_command import seleniumcommand, seleniumimperative, seleniummulticommand, \
+    selenium_multicommand_discover
+from .selenium_driver import SeleniumDriver
+from .selenium_polling import StepTiming
+from .connection_pool import ConnectionPool
+from .stored_variables import StoredVariables
+
+
+logger = logging.getLogger(__name__)
+
+
+class PageParser(HTMLParser):
+    """
+    HTML parser collecting page title and text shown to users, see module documentation.
+    """
+    hidden_tags = frozenset(('head', 'script', 'style', 'template', 'noscript'))
+    # elements not separating their text from surrounding one
+    inline_tags = frozenset(('a', 'abbr', 'b', 'bdi', 'bdo', 'cite', 'code', 'data', 'dfn', 'em', 'font', 'i', 'kbd',
+                             'label', 'mark', 'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'u',
+                             'var'))
+
+    def __init__(self):
+        super(PageParser, self).__init__(convert_charrefs=True)
+        self.title = None
+        self.texts = []  # text nodes
+        self.text = ''  # whole text, whitespace collapsed as rendered by browsers, set when parsing is over
+        self._parts = []  # text parts, with a space for every element boundary breaking text
+        self._hidden = []  # open hidden elements
+        self._title = None  # title text parts while parsing title element
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.inline_tags:
+            self._parts.append(' ')
+        if tag == 'body':
+            del self._hidden[:]  # body implicitly closes head
+        elif tag == 'title' and self.title is None:
+            self._title = []
+        elif tag in self.hidden_tags:
+            self._hidden.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.inline_tags:
+            self._parts.append(' ')
+        if tag == 'title' and self._title is not None:
+            self.title = ' '.join(''.join(self._title).split())
+            self._title = None
+        elif tag in self._hidden:
+            while self._hidden.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if self._title is not None:
+            self._title.append(data)
+        elif not self._hidden:
+            self._parts.append(data)
+            if data.strip():
+                self.texts.append(data)
+
+    def close(self):
+        super(PageParser, self).close()
+        self.text = ' '.join(''.join(self._parts).split())
+
+    @classmethod
+    def parse(cls, source):
+        """
+        :param source: HTML document
+        :return: PageParser instance holding `title`, `texts` and `text` of given document
+        """
+        parser = cls()
+        parser.feed(source)
+        parser.close()
+        return parser
+
+
+class HttpSession(object):
+    """
+    Webdriver stand-in opening pages over HTTP, with a cookie jar, see module documentation.
+    """
+    connection_pool_class = ConnectionPool
+    page_parser_class = PageParser
+    redirect_statuses = (301, 302, 303, 307, 308)
+    max_redirects = 10
+    default_headers = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        }
+
+    def __init__(self, useragent=None, timeout=30.):
+        """
+        :param useragent: User-Agent header sent on every request
+        :param timeout: socket timeout in seconds
+        """
+        self.headers = dict(self.default_headers)
+        if useragent:
+            self.headers['User-Agent'] = useragent
+        self.cookies = http.cookiejar.CookieJar()
+        self.connection_pool = self.connection_pool_class(timeout=timeout)
+        self.current_url = 'about:blank'
+        self.response = None
+        self.page_source = ''
+        self._page = None
+
+    def request(self, method, url, body=None, headers=None):
+        """ Send request with session cookies, storing cookies it sets and following redirects.
+
+        :param method: HTTP method
+        :param url: absolute url
+        :param body: optional request body (str or bytes)
+        :param headers: optional dictionary of extra request headers
+        :return: tuple with final url and `selexe.connection_pool.Response` namedtuple
+        :raises RuntimeError: if there are more than `max_redirects` redirects
+        """
+        for _ in range(self.max_redirects + 1):
+            request = urllib.request.Request(url, method=method, headers=dict(self.headers, **(headers or {})))
+            self.cookies.add_cookie_header(request)
+            response = self.connection_pool.request(method, url, body, dict(request.header_items()))
+            info = email.message.Message()
+            for name, value in response.headers:
+                info[name] = value
+            self.cookies.extract_cookies(ResponseInfo(info), request)
+            location = info['Location']
+            if response.status not in self.redirect_statuses or not location:
+                return url, response
+            url = urljoin(url, location)
+            if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+                method, body, headers = 'GET', None, None
+        raise RuntimeError('More than %d redirects opening %s' % (self.max_redirects, url))
+
+    def navigate(self, method, url, body=None, headers=None):
+        """ Load page from given request, see `request`.
+
+        :return: `selexe.connection_pool.Response` namedtuple
+        """
+        self.current_url, self.response = self.request(method, url, body, headers)
+        info = email.message.Message()
+        info['Content-Type'] = next(
+            (value for name, value in self.response.headers if name.lower() == 'content-type'), 'text/html')
+        charset = info.get_content_charset() or 'utf-8'
+        self.page_source = self.response.data.decode(charset, 'replace')
+        self._page = None
+        if self.response.status >= 400:
+            logger.warning('%s returned %d %s' % (self.current_url, self.response.status, self.response.reason))
+        return self.response
+
+    def get(self, url):
+        """ Open page of given absolute url. """
+        self.navigate('GET', url)
+
+    def refresh(self):
+        """ Open current page again. """
+        self.get(self.current_url)
+
+    @property
+    def page(self):
+        """ PageParser instance of current page, parsed on first use. """
+        if self._page is None:
+            self._page = self.page_parser_class.parse(self.page_source)
+        return self._page
+
+    @property
+    def title(self):
+        """ Title of current page, empty if it has none. """
+        return self.page.title or ''
+
+    def get_cookies(self):
+        """ :return: list of cookie dictionaries with name, value, domain, path and secure keys """
+        return [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path,
+                 'secure': cookie.secure} for cookie in self.cookies]
+
+    def delete_all_cookies(self):
+        self.cookies.clear()
+
+    def set_window_size(self, width, height):
+        """ Nothing to do, there is no window. """
+
+    def quit(self):
+        """ Close all connections. """
+        self.connection_pool.close()
+
+
+class ResponseInfo(object):
+    """ Response adapter giving access to headers the way `http.cookiejar.CookieJar` expects. """
+    def __init__(self, info):
+        self._info = info
+
+    def info(self):
+        return self._info
+
+
+@selenium_multicommand_discover
+class HttpDriver(object):
+    """
+    Selenese driver running navigation, REST and server-rendered page verification commands on a `HttpSession`, see
+    module documentation.
+    """
+    # user functions HttpDriver can run, as they only use its connection pool
+    userfunctions = ('postRest', 'putRest', 'deleteRest', 'assertGetRest', 'batchRest')
+    form_commands = ()  # no form fill batches, see `SeleniumDriver.fill_form`
+    verification_errors = ()
+    pause_saved = 0
+    browser_driver_class = SeleniumDriver  # driver whose commands are reported as requiring a browser
+    step_timing_class = StepTiming
+    sleep = staticmethod(time.sleep)
+    clock = staticmethod(time.monotonic)
+    commands = {}  # command registry, populated by `selenium_multicommand_discover`
+
+    # pattern matching, locator parsing and variable expansion work as on browsers
+    matches = staticmethod(SeleniumDriver.matches)
+    _tag_and_value = staticmethod(SeleniumDriver._tag_and_value)
+    _translatePatternToRegex = staticmethod(SeleniumDriver._translatePatternToRegex)
+    _target_locators = SeleniumDriver._target_locators
+    _sel_var_pat = SeleniumDriver._sel_var_pat
+    _expandVariables = SeleniumDriver._expandVariables
+    _expandVariablesCallback = SeleniumDriver._expandVariablesCallback
+    slowest_steps = SeleniumDriver.slowest_steps
+    clean_verification_errors = SeleniumDriver.clean_verification_errors
+
+    def __init_subclass__(cls, **kwargs):
+        """ Generate related commands and command registry for subclasses. """
+        super().__init_subclass__(**kwargs)
+        selenium_multicommand_discover(cls)
+
+    def __init__(self, driver, baseuri=None, timeout=30000, poll=100, http_timeout=None, error_sentinels=None,
+                 **options):
+        """
+        :param driver: HttpSession instance
+        :param baseuri: base url, as `SeleniumDriver`
+        :param timeout: timeout in milliseconds, used by REST user functions unless http_timeout is given
+        :param poll: unused, pages do not change without a browser
+        :param http_timeout: timeout in milliseconds for REST user functions, defaults to timeout
+        :param error_sentinels: unsupported, a warning is logged if given
+        :param **options: browser options accepted by `SeleniumDriver` (ie. smart_pause), ignored
+        """
+        self.driver = driver
+        self.baseuri = baseuri or ''
+        self.verification_errors = []
+        self.step_timings = []
+        self.current_step = None
+        self.timeout = timeout
+        self.poll = poll
+        if error_sentinels:
+            logger.warning('Error sentinels are not checked by %s' % self.__class__.__name__)
+        self.storedVariables = {}
+        self.connection_pool = self.driver.connection_pool
+        if http_timeout is not None:
+            self.connection_pool.timeout = http_timeout / 1000.
+
+    @property
+    def storedVariables(self):
+        """ Stored variables, see `SeleniumDriver.storedVariables`. """
+        return self._stored_variables
+
+    @storedVariables.setter
+    def storedVariables(self, value):
+        self._stored_variables = value if isinstance(value, StoredVariables) else StoredVariables(value)
+
+    @classmethod
+    def unsupported_command(cls, command):
+        """ Explain why a command is missing from registry, used by `selexe.selenese_check`.
+
+        :param command: selenese command name
+        :return message if command requires a browser, None if command is unknown
+        """
+        if command not in cls.commands and command in cls.browser_driver_class.commands:
+            return 'requires a browser (JavaScript, rendering or user input), not supported by %s' % cls.__name__
+
+    def execute(self, command, target=None, value=None):
+        """ Execute a selenese command, see `SeleniumDriver.execute`.
+
+        :raises NotImplementedError: if command is unknown or requires a browser
+        """
+        method = self.commands.get(command)
+        if method is None:
+            raise NotImplementedError('sel command "%s" %s' % (
+                command, self.unsupported_command(command) or 'is not implemented'))
+
+        v_target = self._expandVariables(target) if target else target
+        v_value = self._expandVariables(value) if value else value
+
+        step = self.step_timing_class(command, v_target, v_value)
+        self.step_timings.append(step)
+        previous, self.current_step = self.current_step, step
+        start = self.clock()
+        try:
+            return method(self, v_target, v_value)
+        finally:
+            step.elapsed = self.clock() - start
+            self.current_step = previous
+
+    def wait_pageload(self, timeout=None):
+        """ Nothing to wait for, pages are completely loaded when their response is read. """
+
+    def wait_pagechange(self, timeout=None):
+        """ Nothing to wait for, see `wait_pageload`. """
+
+    def deprecate_page(self):
+        """ Nothing to do, see `wait_pageload`. """
+
+    def retries(self, timeout=None, poll=None):
+        """ Single attempt, as pages cannot change without a browser.
+
+        :yields 0
+        :raises TimeoutException after the attempt
+        """
+        yield 0
+        raise TimeoutException('Condition not met, %s pages do not change until next page load'
+                               % self.__class__.__name__)
+
+    def close_connections(self):
+        """ Close all idle connections of session pool """
+        self.connection_pool.close()
+
+    def save_screenshot(self, path):
+        """ Save page source instead of a screenshot, next to given path with .html extension.
+
+        :param path: screenshot filename
+        """
+        with open('%s.html' % os.path.splitext(path)[0], 'w', encoding='utf-8') as f:
+            f.write(self.driver.page_source)
+
+    def _absolute_url(self, target):
+        """ Resolve url against baseuri or current url, as `SeleniumDriver.open` """
+        if '://' in target:
+            return target
+        if not self.baseuri:
+            raise RuntimeError('Relative %r cannot be resolved, baseuri not specified.' % target)
+        if target[0] == '/':
+            return '%s%s' % (self.baseuri, target)
+        return '%s/%s' % (self.driver.current_url.rstrip('/'), target.lstrip('/'))
+
+    @seleniumcommand.nowait
+    def open(self, target, value=None):  # noqa
+        """ Open a URL over HTTP, following redirects.
+
+        :param target: URL (string)
+        :param value: <not used>
+        """
+        self.driver.get(self._absolute_url(target))
+
+    @seleniumimperative.nowait
+    def refresh(self, _target=None, value=None):  # noqa
+        """ Open current page again. """
+        self.driver.refresh()
+
+    @seleniumcommand.nowait
+    def pause(self, target, value=None):  # noqa
+        """ Wait for the specified amount of time (in milliseconds)
+
+        :param target: the amount of time to sleep (in milliseconds), defaults to timeout
+        :param value: <not used>
+        """
+        self.sleep(int(target or self.timeout) / 1000.)
+
+    @seleniumcommand.nowait
+    def setTimeout(self, target, value=None):  # noqa
+        """ Specifies the amount of time that REST user functions wait, in milliseconds.
+
+        :param target: timeout in milliseconds
+        :param value: <not used>
+        """
+        self.timeout = int(target)
+        self.connection_pool.timeout = self.timeout / 1000.
+
+    @seleniummulticommand
+    def TextPresent(self, target, value=None):  # noqa
+        """ Verify that the specified text pattern appears in the text of the server-rendered page, whitespace
+        collapsed as browsers render it (so text split by inline markup matches too).
+
+        :param target: a pattern to match with the text of the page
+        :param value: <not used>
+        :return true if the pattern matches the text, false otherwise
+        """
+        pattern = self._translatePatternToRegex(target)
+        return True, bool(pattern.search(self.driver.page.text))
+
+    @seleniummulticommand
+    def Title(self, target=None, value=None):  # noqa
+        """ Get the title of the current page.
+
+        :param target: <not used>
+        :param value: <not used>
+        :return the title of the current page
+        """
+        return target, self.driver.title
+
+    @seleniummulticommand
+    def Location(self, target, value=None):  # noqa
+        """ Get absolute url of current page, after redirects.
+
+        :param target:
+        :param value: <not used>
+        """
+        return target, self.driver.current_url
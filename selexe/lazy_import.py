@@ -0,0 +1,78 @@
+"""
+Lazy import utils
+-----------------
+This module provides helpers for resolving objects by dotted name on first use.
+
+Importing `selenium.webdriver` loads every browser module it ships, which is costly for code paths never launching a
+browser at all (ie. `selexe --help`, or worker processes before receiving any job).
+"""
+import importlib
+import collections.abc
+
+
+def import_string(dotted_path):
+    """
+    Import object for given dotted path.
+
+    @param dotted_path: path as string, ie. "selenium.webdriver.Firefox"
+    @return: imported object
+    """
+    module_name, _, attribute = dotted_path.rpartition('.')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class LazyImportMapping(collections.abc.MutableMapping):
+    """
+    Mapping whose string values are dotted paths, imported (and cached) when the item is first accessed.
+
+    Non-string values are returned as they are, so regular objects can be added too.
+    """
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        if isinstance(value, str):
+            value = self._data[key] = import_string(value)
+        return value
+
+    def __contains__(self, key):
+        return key in self._data  # without importing value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def copy(self):
+        return self.__class__(self._data)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self._data)
+
+
+class lazyimport(object):
+    """
+    Class attribute descriptor importing given dotted path on first access.
+
+    Example:
+        >>> class Runner(object):
+        ...     driver_class = lazyimport('selexe.selenium_driver.SeleniumDriver')
+    """
+    __slots__ = ('dotted_path', '_value')
+
+    def __init__(self, dotted_path):
+        self.dotted_path = dotted_path
+        self._value = None
+
+    def __get__(self, instance, owner=None):
+        if self._value is None:
+            self._value = import_string(self.dotted_path)
+        return self._value
@@ -0,0 +1,302 @@
+"""
+Load generation
+---------------
+Replays selenese files as concurrent virtual users, so existing flows put realistic load on a staging system.
+
+Every virtual user drives its own browser (headless by default, see `SelexeRunner.launch_profiles`), running the given
+files in turn, one iteration per file. Users are started gradually along the ramp-up period, and pause for a think
+time after every page change, as real users reading pages would. Users keep iterating until the test duration is
+over (current iterations are completed), or until they ran the given number of iterations.
+
+Latencies of page changes and waits (`open`, `AndWait` commands and `waitFor` commands) are collected per step, and
+summarized as percentiles by `LoadReport`.
+"""
+import json
+import time
+import random
+import logging
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .selexe_runner import SelexeRunner, SelexeError
+
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples, p):
+    """
+    Get percentile of sorted samples, interpolating linearly between closest ranks.
+
+    @param samples: sorted list of numbers
+    @param p: percentile, from 0 to 100
+    @return: number or None if there are no samples
+    """
+    if not samples:
+        return None
+    rank = (len(samples) - 1) * p / 100.
+    low = int(rank)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low]) * (rank - low)
+
+
+class LoadReport(object):
+    """
+    Thread-safe collector of step latencies and iteration outcomes of a load test.
+    """
+    percentiles = (50, 90, 95, 99)
+    iteration_command = '(iteration)'  # command name of whole iteration latencies
+
+    def __init__(self, users=0):
+        """
+        @param users: number of virtual users
+        """
+        self.users = users
+        self.started = None
+        self.finished = None
+        self.iterations = 0
+        self.failed = 0
+        self.samples = collections.OrderedDict()  # latencies in seconds by (path, command, target)
+        self.step_errors = collections.Counter()  # failures by (path, command, target)
+        self.errors = collections.Counter()  # failures by error message
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Mark load test start"""
+        self.started = time.monotonic()
+
+    def finish(self):
+        """Mark load test end"""
+        self.finished = time.monotonic()
+
+    @property
+    def duration(self):
+        """ Load test duration in seconds, up to now if not finished. """
+        if self.started is None:
+            return 0.
+        return (self.finished or time.monotonic()) - self.started
+
+    def add_iteration(self, path, steps, elapsed, error=None, failed_step=None):
+        """
+        Record outcome of an iteration.
+
+        @param path: selenese file path
+        @param steps: iterable of measured StepTiming instances
+        @param elapsed: iteration duration in seconds
+        @param error: error message if iteration failed, None otherwise
+        @param failed_step: StepTiming instance of step which failed, if any
+        """
+        with self._lock:
+            self.iterations += 1
+            self.samples.setdefault((path, self.iteration_command, ''), []).append(elapsed)
+            for step in steps:
+                if step is not failed_step:
+                    self.samples.setdefault((path, step.command, step.target or ''), []).append(step.elapsed)
+            if error is not None:
+                self.failed += 1
+                self.errors[error] += 1
+                if failed_step is not None:
+                    self.step_errors[(path, failed_step.command, failed_step.target or '')] += 1
+
+    def summary(self):
+        """
+        @return: dictionary with users, duration (seconds), iterations, failed, throughput (iterations per second),
+                 steps (list of dictionaries with file, command, target, count, errors, and min, mean, max and
+                 percentile latencies in milliseconds, ie. p95) and errors (failure counts by message) keys
+        """
+        with self._lock:
+            keys = list(self.samples)
+            keys.extend(key for key in self.step_errors if key not in self.samples)
+            steps = []
+            for key in keys:
+                samples = sorted(self.samples.get(key, ()))
+                path, command, target = key
+                step = {'file': path, 'command': command, 'target': target, 'count': len(samples),
+                        'errors': self.step_errors[key]}
+                step['min'] = samples[0] * 1000. if samples else None
+                step['mean'] = sum(samples) * 1000. / len(samples) if samples else None
+                step['max'] = samples[-1] * 1000. if samples else None
+                for p in self.percentiles:
+                    value = percentile(samples, p)
+                    step['p%d' % p] = value * 1000. if samples else None
+                steps.append(step)
+            duration = self.duration
+            return {
+                'users': self.users,
+                'duration': duration,
+                'iterations': self.iterations,
+                'failed': self.failed,
+                'throughput': self.iterations / duration if duration else 0.,
+                'steps': steps,
+                'errors': dict(self.errors),
+                }
+
+    def format(self):
+        """
+        @return: human readable summary, as a text table of step latencies in milliseconds
+        """
+        summary = self.summary()
+        lines = ['Load test: %(users)d users, %(duration).1f sec, %(iterations)d iterations (%(failed)d failed), '
+                 '%(throughput).2f iterations/sec' % summary]
+        columns = ['count', 'errors', 'mean'] + ['p%d' % p for p in self.percentiles] + ['max']
+        names = ['%(file)s %(command)s %(target)s' % step for step in summary['steps']]
+        width = max([len(name) for name in names] + [len('step')])
+        lines.append(' '.join(['step'.ljust(width)] + [column.rjust(8) for column in columns]) + ' (ms)')
+        for name, step in zip(names, summary['steps']):
+            cells = [
+                ('%d' % step[column]) if column in ('count', 'errors') else
+                ('-' if step[column] is None else '%.0f' % step[column])
+                for column in columns
+                ]
+            lines.append(' '.join([name.ljust(width)] + [cell.rjust(8) for cell in cells]))
+        for message, count in sorted(summary['errors'].items(), key=lambda item: -item[1]):
+            lines.append('%d x %s' % (count, message.strip()))
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """
+        Write summary to given path, as JSON if path ends with .json, as text table otherwise.
+
+        @param path: report file path
+        """
+        with open(path, 'w') as f:
+            if path.lower().endswith('.json'):
+                json.dump(self.summary(), f, indent=1)
+            else:
+                f.write(self.format())
+            f.write('\n')
+
+
+class LoadRunner(SelexeRunner):
+    """
+    Runner replaying selenese files as concurrent virtual users, see module documentation.
+    """
+    report_class = LoadReport
+    default_profile = 'fast-headless'
+    measured_variants = ('AndWait',)  # command suffixes of measured steps
+    measured_prefixes = ('open', 'waitFor')  # command prefixes of measured steps
+
+    def __init__(self, filenames, users=1, ramp_up=0., think_time=0., duration=None, iterations=None, **kwargs):
+        """
+        @param filenames: Selenium IDE files, run in turn by every virtual user
+        @param users: number of virtual users, each one driving its own browser
+        @param ramp_up: seconds along which virtual users are started
+        @param think_time: seconds users pause after every page change, or (min, max) tuple for random pauses
+        @param duration: seconds after which users stop starting new iterations, None to run iterations only
+        @param iterations: maximum number of iterations per user, defaults to one if no duration is given
+        @param **kwargs: keyword arguments accepted by SelexeRunner, except filename, profile defaults to
+                         `default_profile`
+        """
+        self.filenames = list(filenames)
+        kwargs['profile'] = kwargs.get('profile') or self.default_profile
+        super(LoadRunner, self).__init__(self.filenames[0] if self.filenames else None, **kwargs)
+        self.users = max(users, 1)
+        self.ramp_up = ramp_up
+        self.think_time = think_time if isinstance(think_time, (tuple, list)) else (think_time, think_time)
+        self.duration = duration
+        self.iterations = iterations if iterations is not None or duration is not None else 1
+        self.report = None
+
+    def measured(self, command):
+        """
+        @param command: selenese command name
+        @return: True if latencies of given command are reported
+        """
+        return command.endswith(self.measured_variants) or command.startswith(self.measured_prefixes)
+
+    def run(self):
+        """
+        Run load test.
+
+        @return: LoadReport instance
+        """
+        logger.info('Selexe load test on files %s with %d users' % (', '.join(self.filenames), self.users))
+        self.track_proxy()
+        try:
+            testcases = []
+            for path in self.filenames:
+                parser = self.parser_class.from_path(path, encoding=self.encoding)
+                if self.check:
+                    self.validate(parser)
+                testcases.append((path, list(parser)))
+        except Exception:  # noqa
+            self.release_proxy()
+            raise
+        if not testcases:
+            raise SelexeError('No selenese file to run')
+
+        self.report = self.report_class(self.users)
+        stop = threading.Event()
+        self.report.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.users) as executor:
+                futures = [executor.submit(self._user, user, testcases, stop) for user in range(self.users)]
+                try:
+                    wait(futures, timeout=self.duration)
+                finally:
+                    stop.set()  # duration is over, or interrupted
+                for future in futures:
+                    future.result()
+        finally:
+            self.report.finish()
+            self.release_proxy()
+        return self.report
+
+    def _user(self, user, testcases, stop):
+        """Run iterations of a virtual user on its own browser, until stopped or out of iterations"""
+        if stop.wait(self.ramp_up * user / self.users):
+            return
+        try:
+            driver = self.launch_webdriver()
+        except Exception as e:  # noqa
+            logger.exception('Browser for virtual user %d cannot be launched' % user)
+            path = testcases[user % len(testcases)][0]
+            self.report.add_iteration(path, (), 0., 'Browser launch failed with %s' % e)
+            return
+        try:
+            iteration = 0
+            while not stop.is_set() and (self.iterations is None or iteration < self.iterations):
+                if iteration:
+                    driver.delete_all_cookies()
+                path, rows = testcases[(user + iteration) % len(testcases)]
+                self._iterate(driver, path, rows, stop)
+                iteration += 1
+        finally:
+            driver.quit()
+
+    def _iterate(self, driver, path, rows, stop):
+        """Run a selenese file once, recording step latencies"""
+        logger.debug('Running %s' % path)
+        sd = self.create_driver(driver)
+        error = failed_step = None
+        start = time.monotonic()
+        try:
+            errors = self._wrapExecution(self._thinking(rows, stop), sd)
+            if errors:
+                error = '%d verification errors in %s' % (len(errors), path)
+        except (KeyboardInterrupt, SelexeError):
+            raise
+        except Exception as e:  # noqa
+            error = 'Running %s failed with %s' % (path, e)
+            failed_step = sd.step_timings[-1] if sd.step_timings else None
+        finally:
+            sd.close_connections()
+        elapsed = time.monotonic() - start
+        steps = [step for step in sd.step_timings if self.measured(step.command)]
+        self.report.add_iteration(path, steps, elapsed, error, failed_step)
+
+    def _thinking(self, rows, stop):
+        """
+        Pause for think time before every row following a measured one, unless stopped.
+
+        @param rows: iterable of (baseuri, command, target, value) tuples
+        @param stop: threading.Event set when load test is over
+        @yield: given rows
+        """
+        think = False
+        for row in rows:
+            if think and self.think_time[1] > 0:
+                stop.wait(random.uniform(*self.think_time))
+            yield row
+            think = self.measured(row[1])
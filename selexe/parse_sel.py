@@ -4,22 +4,21 @@ import os
 import logging
 import io
 import six
-import bs4 as beautifulsoup
-import html
 
 logger = logging.getLogger(__name__)
 
 
 class SeleniumTestCaseParser(object):
     __slots__ = ('path', 'soup', 'baseuri')
-    htmlentity_map = html.entities.name2codepoint
-    htmlentity_compiled_re = re.compile('&(%s);' % '|'.join(htmlentity_map))
+    htmlentity_map = None  # built on first use, see _htmlentity_tables
+    htmlentity_compiled_re = None
     br_compiled_re = re.compile(r"<br\s*/?>")
     tag_compiled_re = re.compile("<.*>")
 
     def __init__(self, path, data):
         self.path = path
         assert isinstance(data, six.text_type), '%r is required' % six.text_type
+        import bs4 as beautifulsoup
         self.soup = beautifulsoup.BeautifulSoup(data, 'html.parser')
         baseuri = self.soup.find('link', attrs={'rel': 'selenium.base'})
         self.baseuri = baseuri['href'].rstrip('/') if baseuri else None
@@ -44,6 +43,15 @@ class SeleniumTestCaseParser(object):
         encoding = getattr(fp, 'encoding', encoding)
         return name, cls.force_unicode(fp.read() if length is None else fp.read(length), encoding)
 
+    @classmethod
+    def _htmlentity_tables(cls):
+        """Get HTML entity map and regex, building them on first use as the regex is quite expensive to compile"""
+        if cls.htmlentity_compiled_re is None:
+            from html.entities import name2codepoint
+            cls.htmlentity_map = name2codepoint
+            cls.htmlentity_compiled_re = re.compile('&(%s);' % '|'.join(name2codepoint))
+        return cls.htmlentity_map, cls.htmlentity_compiled_re
+
     @classmethod
     def _htmlentity_translate_handler(cls, match):
         return chr(cls.htmlentity_map[match.group(1)])
@@ -51,7 +59,8 @@ class SeleniumTestCaseParser(object):
     @classmethod
     def htmlentity_translate(cls, s):
         """translate all HTML entities like &nbsp; into clean text characters"""
-        return cls.htmlentity_compiled_re.sub(cls._htmlentity_translate_handler, s)
+        _, htmlentity_compiled_re = cls._htmlentity_tables()
+        return htmlentity_compiled_re.sub(cls._htmlentity_translate_handler, s)
 
     @classmethod
     def handle_tags(cls, s):
@@ -64,6 +73,7 @@ class SeleniumTestCaseParser(object):
         return cls.htmlentity_translate(s)
 
     def __iter__(self):
+        import bs4 as beautifulsoup
         body = self.soup.find('tbody')
         for tr in body.findAll('tr'):
             try:
@@ -94,16 +104,21 @@ class SeleniumTestSuiteParser(SeleniumTestCaseParser):
             candidate = os.path.join(base, path)
             if os.path.exists(candidate):
                 return candidate
-        raise IOError('File not found')
+        raise IOError('File %r not found' % path)
 
-    def __iter__(self):
+    def iter_links(self):
+        """Yield (unresolved) paths of test cases linked from suite table, see `find_filename`"""
         body = self.soup.find('tbody')
         for tr in body.findAll('tr'):
             a = tr.find('a')
             if a:
-                path = self.find_filename(a['href'])
-                for baseuri, command, v_target, v_value in self.testcase_class.from_path(path):
-                    yield (baseuri, command, v_target, v_value)
+                yield a['href']
+
+    def __iter__(self):
+        for link in self.iter_links():
+            path = self.find_filename(link)
+            for baseuri, command, v_target, v_value in self.testcase_class.from_path(path):
+                yield (baseuri, command, v_target, v_value)
 
 
 class SeleniumParser(SeleniumTestCaseParser):
@@ -0,0 +1,229 @@
+"""
+Shared-prefix execution
+-----------------------
+Test cases often start with the same selenese rows (open, login, navigate to a module...). This module arranges test
+cases in a prefix tree, so every shared prefix runs just once: browser session state is captured (see
+`SeleniumDriver.snapshot`) where test cases diverge, and restored before running every other branch. Test cases
+sharing no rows at all run on their own browser.
+
+Only state captured by session snapshots (cookies, storages, url and stored variables) is forked, so test cases
+relying on in-page state left by shared rows (ie. unsaved form fields) should not be run this way. Snapshots only
+cover the origin where test cases diverge: cookies and storages a branch leaves on other origins (ie. a single sign-on
+server) are seen by the following branches, a warning is logged when a branch ends on another origin.
+"""
+import logging
+import collections
+from urllib.parse import urlsplit
+
+from .selexe_runner import SelexeRunner, SelexeError
+
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixNode(object):
+    """
+    Prefix tree node with the rows shared by all test cases below it.
+    """
+    __slots__ = ('rows', 'children', 'paths')
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)  # rows (baseuri, command, target, value) from parent node
+        self.children = []
+        self.paths = []  # test cases ending at this node
+
+    def iter_paths(self):
+        """
+        @yield: paths of test cases ending at this node or below
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            for path in node.paths:
+                yield path
+            stack.extend(reversed(node.children))
+
+    def __repr__(self):
+        return '<%s %d rows, %d children, %d paths>' % (
+            self.__class__.__name__, len(self.rows), len(self.children), len(self.paths))
+
+
+class PrefixTree(object):
+    """
+    Compressed prefix tree (radix tree) of test case rows.
+    """
+    node_class = PrefixNode
+
+    def __init__(self, testcases=()):
+        """
+        @param testcases: iterable of (path, rows) tuples, rows being iterables of (baseuri, command, target, value)
+        """
+        self.total_rows = 0
+        trie = self._trie()
+        for path, rows in testcases:
+            node = trie
+            for row in rows:
+                node = node['children'].setdefault(tuple(row), self._trie())
+                self.total_rows += 1
+            node['paths'].append(path)
+        self.root = self._compress((), trie)
+
+    @staticmethod
+    def _trie():
+        return {'children': collections.OrderedDict(), 'paths': []}
+
+    def _compress(self, row, trie):
+        """
+        Convert trie into compressed nodes, merging chains of single-child nodes.
+
+        @param row: row leading to trie node, empty for root
+        @param trie: trie node dictionary
+        @return: PrefixNode instance
+        """
+        rows = [row] if row else []
+        while len(trie['children']) == 1 and not trie['paths']:
+            (row, trie), = trie['children'].items()
+            rows.append(row)
+        node = self.node_class(rows)
+        node.paths.extend(trie['paths'])
+        node.children.extend(self._compress(child_row, child) for child_row, child in trie['children'].items())
+        return node
+
+    @property
+    def tree_rows(self):
+        """ Number of rows to execute when running shared prefixes once. """
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            count += len(node.rows)
+            stack.extend(node.children)
+        return count
+
+
+class SharedPrefixRunner(SelexeRunner):
+    """
+    Runner executing many selenese files on a single browser, running their shared prefixes once.
+    """
+    tree_class = PrefixTree
+
+    def __init__(self, filenames, **kwargs):
+        """
+        @param filenames: Selenium IDE files
+        @param **kwargs: keyword arguments accepted by SelexeRunner, except filename
+        """
+        self.filenames = list(filenames)
+        super(SharedPrefixRunner, self).__init__(self.filenames[0] if self.filenames else None, **kwargs)
+
+    def run(self):
+        """
+        Start execution of selenium tests (within setUp and tearDown wrappers)
+
+        @return: dictionary with verification errors (list) by file path, or error message if file failed
+        """
+        logger.info('Selexe working on files %s' % ', '.join(self.filenames))
+        self.track_proxy()
+        try:
+            parsers = [self.parser_class.from_path(path, encoding=self.encoding) for path in self.filenames]
+            if self.check:
+                for parser in parsers:
+                    self.validate(parser)
+        except Exception:  # noqa
+            if self.prefetcher is not None:
+                self.prefetcher.discard(self)
+            self.release_proxy()
+            raise
+        tree = self.tree_class((path, list(parser)) for path, parser in zip(self.filenames, parsers))
+        logger.info('Shared prefixes: running %d of %d steps' % (tree.tree_rows, tree.total_rows))
+
+        results = {}
+        try:
+            for i, node in enumerate(self._sessions(tree.root)):
+                driver = self.acquire_webdriver() if not i else self.launch_webdriver()
+                try:
+                    self._runSession(node, driver, results)
+                finally:
+                    driver.quit()
+        finally:
+            self.release_proxy()
+        return results
+
+    def _sessions(self, root):
+        """
+        Split tree into nodes run on their own browser session.
+
+        Browser session snapshots can only reset state of their own origin, so files sharing no rows (when root has
+        no rows but many children) are run on fresh browsers, one per root branch, instead of restoring a snapshot
+        taken before any page was opened.
+
+        @param root: tree root node
+        @return: list of PrefixNode instances
+        """
+        if root.rows or len(root.children) < 2:
+            return [root]
+        sessions = []
+        for child in root.children:
+            node = self.tree_class.node_class()
+            node.children.append(child)
+            sessions.append(node)
+        sessions[0].paths.extend(root.paths)
+        return sessions
+
+    def _runSession(self, node, driver, results):
+        """Run node on given browser, within setUp and tearDown fixtures"""
+        logger.info('baseURI: %s' % self.baseuri)
+        sd = self.create_driver(driver)
+        try:
+            if self.setUpFunc:
+                self._setUp(sd)
+            try:
+                self._runNode(node, sd, results)
+            finally:
+                if self.tearDownFunc:
+                    logger.info("Calling tearDown()")
+                    self.tearDownFunc(sd)
+                    logger.info("tearDown() finished")
+        finally:
+            sd.close_connections()
+
+    def _runNode(self, node, sd, results):
+        """Run node rows, then every branch starting from the same session state"""
+        try:
+            self._executeSteps(node.rows, sd)
+        except (KeyboardInterrupt, SelexeError):
+            raise
+        except Exception as e:  # noqa
+            self._handleFailure(sd)
+            for path in node.iter_paths():
+                results[path] = 'Running %s failed with %s\n' % (path, e)
+            return
+        for path in node.paths:
+            results[path] = list(sd.verification_errors)
+        if not node.children:
+            return
+        snapshot = sd.snapshot() if len(node.children) > 1 else None
+        errors = list(sd.verification_errors)
+        for i, child in enumerate(node.children):
+            if i:
+                paths = list(child.iter_paths())
+                logger.info('Restoring session state shared by %s' % ', '.join(paths))
+                try:
+                    sd.restore(snapshot)
+                except Exception as e:  # noqa
+                    results.update((path, 'Restoring session for %s failed with %s\n' % (path, e)) for path in paths)
+                    continue
+                sd.verification_errors[:] = errors
+            self._runNode(child, sd, results)
+            if i < len(node.children) - 1:
+                self._checkOrigin(sd, snapshot, child)
+
+    def _checkOrigin(self, sd, snapshot, node):
+        """Warn if node branch ended on another origin than snapshot's, as its state there is not reset"""
+        try:
+            url = sd.driver.current_url
+        except Exception:  # noqa
+            return
+        origin = urlsplit(url)[:2]
+        if origin != urlsplit(snapshot.url)[:2]:
+            logger.warning('%s ended on %s://%s, cookies and storages left on that origin are not reset for following '
+                           'branches' % (', '.join(node.iter_paths()), origin[0], origin[1]))
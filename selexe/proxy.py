@@ -0,0 +1,293 @@
+"""
+Local proxy
+-----------
+Small HTTP proxy browsers launched by `SelexeRunner` can be configured to use.
+
+Requests matching block list patterns (ie. analytics, ads or font CDNs unreachable from CI machines) are answered
+immediately with an empty response instead of hanging until they time out, delaying page loads. Blocked requests are
+counted, so they can be reported per test.
+
+Static assets can also be cached (see `selexe.asset_cache`), so browsers sharing the proxy download them just once.
+
+Patterns are shell-style wildcards, matched against request host if they contain no slash (ie.
+"*.google-analytics.com"), or against the whole url otherwise (ie. "http://cdn.example.com/fonts/*"). HTTPS requests
+are tunneled, so only host patterns apply to them.
+"""
+import socket
+import fnmatch
+import logging
+import http.client
+import selectors
+import threading
+import collections
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .connection_pool import ConnectionPool
+
+
+logger = logging.getLogger(__name__)
+
+# Headers meaningful for a single connection, which must not be forwarded
+HOP_BY_HOP_HEADERS = frozenset((
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'proxy-connection', 'te', 'trailer',
+    'transfer-encoding', 'upgrade',
+    ))
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """
+    Request handler forwarding plain HTTP requests and tunneling CONNECT ones, see `LocalProxy`.
+    """
+    protocol_version = 'HTTP/1.1'
+    tunnel_buffer_size = 65536
+
+    @property
+    def proxy(self):
+        """
+        @rtype: LocalProxy
+        """
+        return self.server.proxy
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_empty(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_CONNECT(self):  # noqa
+        host, _, port = self.path.rpartition(':')
+        if self.proxy.blocked(host):
+            self._send_empty(403)
+            return
+        try:
+            upstream = socket.create_connection((host, int(port)), timeout=self.proxy.timeout)
+        except (OSError, ValueError):
+            self._send_empty(502)
+            return
+        self.send_response(200, 'Connection Established')
+        self.end_headers()
+        self.close_connection = True
+        with upstream, selectors.DefaultSelector() as selector:
+            selector.register(self.connection, selectors.EVENT_READ, upstream)
+            selector.register(upstream, selectors.EVENT_READ, self.connection)
+            while True:
+                events = selector.select(timeout=self.proxy.timeout)
+                if not events:
+                    return  # idle tunnel
+                for key, _ in events:
+                    try:
+                        data = key.fileobj.recv(self.tunnel_buffer_size)
+                        if not data:
+                            return
+                        key.data.sendall(data)
+                    except OSError:
+                        return
+
+    def _relay(self, response):
+        """
+        Forward upstream response as it is received, so streamed responses (ie. server-sent events or long polling)
+        reach browsers without delay.
+
+        @param response: http.client.HTTPResponse instance, whose body is not read yet
+        """
+        bodyless = self.command == 'HEAD' or response.status in (204, 304) or response.status < 200
+        chunked = not bodyless and response.getheader('Content-Length') is None
+        self.send_response(response.status, response.reason)
+        for key, value in response.getheaders():
+            if key.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(key, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        while not bodyless:
+            data = response.read1(self.tunnel_buffer_size)
+            if not data:
+                break
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data) if chunked else data)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        response.read()  # mark response as complete, so upstream connection is reused
+
+    def do_GET(self):  # noqa
+        url = self.path
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        if self.proxy.blocked(urlsplit(url).hostname or '', url):
+            self._send_empty(204)
+            return
+        headers = [(key, value) for key, value in self.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS]
+        relayed = False
+        try:
+            if self.proxy.cacheable(self.command, url):
+                response = self.proxy.fetch(self.command, url, body, headers)
+                self.send_response(response.status, response.reason)
+                for key, value in response.headers:
+                    if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != 'content-length':
+                        self.send_header(key, value)
+                self.send_header('Content-Length', str(len(response.data)))
+                self.end_headers()
+                self.wfile.write(response.data)
+                return
+            with self.proxy.forward(self.command, url, body, headers) as response:
+                relayed = True
+                self._relay(response)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            logger.debug('Proxied request to %s failed: %s' % (url, e))
+            if relayed:
+                self.close_connection = True  # response is incomplete
+            else:
+                self._send_empty(502)
+
+    do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = do_GET
+
+
+class LocalProxy(object):
+    """
+    Local HTTP proxy answering requests matching block list patterns with empty responses, see module documentation.
+
+    Example:
+        >>> with LocalProxy(block=['*.google-analytics.com', 'fonts.googleapis.com']) as proxy:
+        ...     runner = SelexeRunner('test.sel', proxy=proxy)
+        ...     runner.run()
+        ...     proxy.take_counts()
+        Counter({'fonts.googleapis.com': 2})
+    """
+    handler_class = ProxyHandler
+    connection_pool_class = ConnectionPool
+
+    def __init__(self, block=(), host='127.0.0.1', port=0, timeout=30., cache=None):
+        """
+        @param block: iterable of block list patterns
+        @param cache: optional AssetCache instance, see `selexe.asset_cache`
+        @param host: listening address
+        @param port: listening port, 0 for any free one
+        @param timeout: upstream socket timeout in seconds
+        """
+        self.block = list(block or ())
+        self.timeout = timeout
+        self.cache = cache
+        self.server = ThreadingHTTPServer((host, port), self.handler_class)
+        self.server.daemon_threads = True
+        self.server.proxy = self
+        self.connection_pool = self.connection_pool_class(timeout=timeout)
+        self.counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def address(self):
+        """ Listening (host, port) tuple. """
+        return self.server.server_address[:2]
+
+    def start(self):
+        """Start serving in a background thread, if not started yet"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.server.serve_forever, name='selexe-proxy')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def close(self):
+        """Stop serving and close all connections"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self.server.shutdown()
+            thread.join()
+        self.server.server_close()
+        self.connection_pool.close()
+
+    def blocked(self, host, url=None):
+        """
+        Check if request must be blocked, counting it if so.
+
+        @param host: request host name
+        @param url: request url, None for tunneled requests
+        @return: True if request is blocked, False otherwise
+        """
+        host = host.lower()
+        for pattern in self.block:
+            subject = host if '/' not in pattern else url
+            if subject is not None and fnmatch.fnmatchcase(subject, pattern):
+                with self._lock:
+                    self.counts[host] += 1
+                return True
+        return False
+
+    def cacheable(self, method, url):
+        """
+        @param method: HTTP method
+        @param url: absolute url
+        @return: True if response to request can be served by asset cache
+        """
+        return self.cache is not None and self.cache.cacheable(method, url)
+
+    def forward(self, method, url, body=None, headers=None):
+        """
+        Send request upstream, see `selexe.connection_pool.ConnectionPool.stream`.
+
+        @param method: HTTP method
+        @param url: absolute url
+        @param body: request body or None
+        @param headers: list of (name, value) request header tuples
+        @return: context manager giving http.client.HTTPResponse instance, whose body is not read yet
+        """
+        return self.connection_pool.stream(method, url, body, headers)
+
+    def fetch(self, method, url, body=None, headers=None):
+        """
+        Get response for a cacheable request (see `cacheable`) from asset cache, or from upstream caching it.
+
+        @param method: HTTP method
+        @param url: absolute url
+        @param body: request body or None
+        @param headers: list of (name, value) request header tuples
+        @return: `selexe.connection_pool.Response` namedtuple
+        """
+        headers = headers or []
+        response = self.cache.get(url, headers)
+        if response is None:
+            response = self.connection_pool.request(method, url, body, headers)
+            self.cache.put(url, headers, response)
+        return response
+
+    def take_counts(self):
+        """
+        Get blocked request counts since last call, and reset them.
+
+        @return: collections.Counter of blocked requests by host
+        """
+        with self._lock:
+            counts, self.counts = self.counts, collections.Counter()
+        return counts
+
+    def firefox_preferences(self):
+        """
+        @return: dictionary of firefox preferences making firefox use this proxy
+        """
+        host, port = self.address
+        return {
+            'network.proxy.type': 1,
+            'network.proxy.http': host,
+            'network.proxy.http_port': port,
+            'network.proxy.ssl': host,
+            'network.proxy.ssl_port': port,
+            'network.proxy.no_proxies_on': '',
+            'network.proxy.allow_hijacking_localhost': True,
+            }
+
+    def chrome_arguments(self):
+        """
+        @return: list of chrome command line arguments making chrome use this proxy
+        """
+        return ['--proxy-server=http://%s:%d' % self.address, '--proxy-bypass-list=<-loopback>']
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,250 @@
+"""
+Selenese pre-flight validation
+------------------------------
+This module checks selenese files without launching any browser: command names against the driver command registry,
+locator prefixes, option locators, numeric arguments and test suite links.
+
+It is used by `selexe --check` and, unless disabled, by `SelexeRunner.run` before starting the webdriver, so broken
+files fail in milliseconds instead of after the browser started and many steps already ran.
+"""
+import difflib
+import collections
+
+from selenium.common.exceptions import UnexpectedTagNameException
+
+from .parse_sel import SeleniumParser, SeleniumTestSuiteParser
+from .lazy_import import lazyimport
+
+
+class Problem(collections.namedtuple('Problem', ('path', 'row', 'command', 'message'))):
+    """Validation problem found at given (1-based) row of a selenese file, row is None for file-level problems"""
+    __slots__ = ()
+
+    def __str__(self):
+        location = self.path if self.row is None else '%s:%d' % (self.path, self.row)
+        if self.command:
+            return '%s: %s: %s' % (location, self.command, self.message)
+        return '%s: %s' % (location, self.message)
+
+
+class SeleneseValidator(object):
+    """
+    Static validator for selenese test cases and suites.
+
+    Argument checks are looked up by proto-command name (see `SeleniumCommand.proto`), so they apply to every derived
+    command, ie. checks for 'Text' are used for 'verifyText', 'waitForNotText', 'storeText' and so on.
+    """
+    parser_class = SeleniumParser
+    driver_class = lazyimport('selexe.selenium_driver.SeleniumDriver')
+    # kind of target argument by proto-command
+    target_kinds = {
+        'click': 'locator',
+        'select': 'locator',
+        'addSelection': 'locator',
+        'removeSelection': 'locator',
+        'removeAllSelections': 'locator',
+        'type': 'locator',
+        'check': 'locator',
+        'uncheck': 'locator',
+        'mouseOver': 'locator',
+        'mouseOut': 'locator',
+        'fireEvent': 'locator',
+        'Visible': 'locator',
+        'Editable': 'locator',
+        'ElementPresent': 'locator',
+        'Text': 'locator',
+        'Value': 'locator',
+        'Attribute': 'attribute_locator',
+        'Table': 'table_locator',
+        'selectFrame': 'frame_locator',
+        'open': 'url',
+        'setTimeout': 'integer',
+        'setSpeed': 'integer',
+        'pause': 'optional_integer',
+    }
+    # kind of value argument by proto-command
+    value_kinds = {
+        'select': 'option_locator',
+        'addSelection': 'option_locator',
+        'removeSelection': 'option_locator',
+        'waitForPopUp': 'optional_integer',
+    }
+    option_locators = ('id', 'label', 'value', 'index')
+    null_values = ('', 'null')
+
+    def __init__(self, driver_class=None, baseuri=None, encoding='utf-8'):
+        """
+        @param driver_class: selenium driver class providing command registry and locators, defaults to SeleniumDriver
+        @param baseuri: base url given to runner, if any
+        @param encoding: encoding of selenese files
+        """
+        if driver_class is not None:
+            self.driver_class = driver_class
+        self.baseuri = baseuri
+        self.encoding = encoding
+
+    def validate_path(self, path):
+        """
+        Validate selenese test case or test suite file.
+
+        @param path: selenese file path
+        @return: list of Problem instances, empty if file is valid
+        """
+        try:
+            parser = self.parser_class.from_path(path, encoding=self.encoding)
+        except (IOError, UnicodeError) as e:
+            return [Problem(path, None, None, 'cannot be read: %s' % e)]
+        return self.validate_parser(parser)
+
+    def validate_parser(self, parser, _visited=None):
+        """
+        Validate already parsed selenese test case or suite, including test cases linked from suites.
+
+        @param parser: SeleniumTestCaseParser or SeleniumTestSuiteParser instance
+        @return: list of Problem instances, empty if file is valid
+        """
+        path = parser.path or '<selenese>'
+        if parser.soup.find('tbody') is None:
+            return [Problem(path, None, None, 'no test table found')]
+        if not isinstance(parser, SeleniumTestSuiteParser):
+            return self.validate_rows(path, parser)
+
+        visited = set() if _visited is None else _visited
+        problems = []
+        for row, link in enumerate(parser.iter_links(), 1):
+            try:
+                testcase_path = parser.find_filename(link)
+            except IOError:
+                problems.append(Problem(path, row, None, 'linked test case %r not found' % link))
+                continue
+            if testcase_path in visited:
+                continue
+            visited.add(testcase_path)
+            try:
+                testcase = parser.testcase_class.from_path(testcase_path, encoding=self.encoding)
+            except (IOError, UnicodeError) as e:
+                problems.append(Problem(testcase_path, None, None, 'cannot be read: %s' % e))
+                continue
+            problems.extend(self.validate_parser(testcase, visited))
+        return problems
+
+    def validate_rows(self, path, rows):
+        """
+        Validate selenese rows.
+
+        @param path: file path used for reporting
+        @param rows: iterable of (baseuri, command, target, value) tuples, as yielded by selenese parsers
+        @return: list of Problem instances
+        """
+        commands = self.driver_class.commands
+        locators = dict(self.driver_class._target_locators)
+        problems = []
+        for row, (baseuri, command, target, value) in enumerate(rows, 1):
+            fnc = commands.get(command)
+            unsupported = getattr(self.driver_class, 'unsupported_command', None)  # ie. browserless drivers
+            message = unsupported(command) if fnc is None and unsupported is not None else None
+            if message:
+                problems.append(Problem(path, row, command, message))
+                continue
+            if fnc is None:
+                suggestions = difflib.get_close_matches(command, commands, n=1)
+                hint = ', did you mean %r?' % suggestions[0] if suggestions else ''
+                problems.append(Problem(path, row, command, 'unknown command%s' % hint))
+                continue
+            sel_cmd = fnc.command
+            if not sel_cmd.implemented:
+                problems.append(Problem(path, row, command, 'command is not implemented yet'))
+                continue
+            if sel_cmd.proto == 'addLocationStrategy' and target:
+                locators[target] = None  # custom locators are available on following rows
+            for argument, kinds in (('target', self.target_kinds), ('value', self.value_kinds)):
+                kind = kinds.get(sel_cmd.proto)
+                data = target if argument == 'target' else value
+                if kind is None or '${' in (data or ''):
+                    continue  # no check or expanded at runtime
+                message = getattr(self, '_check_%s' % kind)(data, locators, baseuri or self.baseuri)
+                if message:
+                    problems.append(Problem(path, row, command, '%s %r %s' % (argument, data, message)))
+        return problems
+
+    def _check_locator(self, data, locators, baseuri=None):
+        if not data:
+            return 'is missing'
+        try:
+            tag, _ = self.driver_class._tag_and_value(data, locators=locators, default='identifier')
+        except UnexpectedTagNameException:
+            return 'has an unknown locator prefix, expected one of %s' % ', '.join(sorted(locators))
+        if tag == 'ui':
+            return 'uses ui locators which are not implemented yet'
+
+    def _check_attribute_locator(self, data, locators, baseuri=None):
+        locator, sep, attribute = (data or '').rpartition('@')
+        if not sep or not attribute:
+            return 'is not a locator followed by @attribute'
+        return self._check_locator(locator, locators)
+
+    def _check_table_locator(self, data, locators, baseuri=None):
+        parts = (data or '').rsplit('.', 2)
+        if len(parts) != 3 or not (parts[1].isdigit() and parts[2].isdigit()):
+            return 'is not a tableLocator.row.column cell address'
+        return self._check_locator(parts[0], locators)
+
+    def _check_frame_locator(self, data, locators, baseuri=None):
+        if data and (data.isdigit() or data in ('relative=top', 'relative=parent')):
+            return
+        if data and data.startswith('relative='):
+            return 'is not a valid relative frame, expected relative=top or relative=parent'
+        return self._check_locator(data, locators)
+
+    def _check_option_locator(self, data, locators=None, baseuri=None):
+        if not data:
+            return 'is missing'
+        try:
+            tag, option = self.driver_class._tag_and_value(data, locators=self.option_locators, default='label')
+        except UnexpectedTagNameException:
+            return 'has an unknown option locator prefix, expected one of %s' % ', '.join(self.option_locators)
+        if tag == 'index' and not option.isdigit():
+            return 'is not a valid option index'
+
+    def _check_url(self, data, locators=None, baseuri=None):
+        if not data:
+            return 'is missing'
+        if '://' not in data and data.startswith('/') and not baseuri:
+            return 'is relative but no baseuri is given'
+
+    def _check_integer(self, data, locators=None, baseuri=None):
+        try:
+            int(data)
+        except (TypeError, ValueError):
+            return 'is not an integer'
+
+    def _check_optional_integer(self, data, locators=None, baseuri=None):
+        if data not in self.null_values and data is not None:
+            return self._check_integer(data)
+
+
+def check_paths(paths, driver_class=None, baseuri=None, encoding='utf-8'):
+    """
+    Validate selenese files.
+
+    @param paths: iterable of selenese file paths
+    @param driver_class: selenium driver class, defaults to SeleniumDriver
+    @param baseuri: base url given to runner, if any
+    @param encoding: encoding of selenese files
+    @return: list of Problem instances for all given files
+    """
+    validator = SeleneseValidator(driver_class, baseuri=baseuri, encoding=encoding)
+    problems = []
+    for path in paths:
+        problems.extend(validator.validate_path(path))
+    return problems
+
+
+def format_problems(problems):
+    """
+    Get human readable report of given problems.
+
+    @param problems: iterable of Problem instances
+    @return: string, one problem per line
+    """
+    return '\n'.join(str(problem) for problem in problems)
@@ -1,5 +1,9 @@
 
+import types
+import inspect
 import logging
+import functools
+import importlib
 import six
 
 from selenium.common.exceptions import NoSuchElementException, NoAlertPresentException, StaleElementReferenceException
@@ -8,12 +12,17 @@ logger = logging.getLogger(__name__)
 
 NOT_PRESENT_EXCEPTIONS = (NoSuchElementException, NoAlertPresentException, StaleElementReferenceException)
 
+USERFUNCTIONS_MODULE = 'selexe.userfunctions'
+USERFUNCTIONS_ENTRY_POINT = 'selexe.userfunctions'
+
 
 def selenium_multicommand_discover(klass):
     """
     Class-decorator which looks for seleniumgeneric instances in attributes and
     generate proper related selenium command methods.
 
+    Once done, an immutable command registry is assigned to `commands` class attribute, see `command_registry`.
+
     :param: klass: class that is decorated, most likely SeleniumDriver
     :returns: given class
     """
@@ -25,13 +34,130 @@ def selenium_multicommand_discover(klass):
         delattr(klass, key)
     for key, value in relatedattrs:
         setattr(klass, key, value)
+    klass.commands = command_registry(klass)
     return klass
 
 
+def command_registry(klass):
+    """
+    Build command registry for given class, mapping selenese command names to prepared (`seleniumcommand`-decorated)
+    functions taking `(driver, target, value)` arguments.
+
+    User functions (see `userfunction_commands`) take precedence over class commands. Classes can restrict user
+    functions to the names given in their `userfunctions` attribute, ie. drivers without browser.
+
+    :param klass: class containing `seleniumcommand` functions, most likely SeleniumDriver
+    :returns: read-only mapping
+    """
+    commands = {}
+    for name in dir(klass):
+        value = getattr(klass, name, None)
+        if isinstance(getattr(value, 'command', None), SeleniumCommand):
+            commands[name] = value
+    allowed = getattr(klass, 'userfunctions', None)
+    commands.update((name, fnc) for name, fnc in six.iteritems(userfunction_commands())
+                    if allowed is None or name in allowed)
+    return types.MappingProxyType(commands)
+
+
+def command_catalogue(commands):
+    """
+    Describe commands of given registry using their `SeleniumCommand` metadata only, without calling them nor
+    requiring a driver instance.
+
+    :param commands: command registry, ie. `SeleniumDriver.commands`
+    :returns: list of dictionaries sorted by command name, with keys:
+        name: selenese command name
+        proto: name of proto-command the command is derived from, ie. 'Text' for 'verifyText'
+        variant: kind of command, 'command' for plain ones, otherwise ie. 'AndWait', 'get', 'is', 'verify', 'assert',
+                 'waitFor', 'store' or inverse variants like 'verifyNot'
+        wait_for_page: True if command waits for ongoing page loads before running
+        implemented: False if command is just a stub raising NotImplementedError
+        source: 'userfunction' for user functions, 'driver' otherwise
+        doc: first line of command docstring
+    """
+    userfunctions = userfunction_commands()
+    catalogue = []
+    for name in sorted(commands):
+        fnc = commands[name]
+        command = fnc.command
+        docstring = command.docstring.strip()
+        catalogue.append({
+            'name': name,
+            'proto': command.proto,
+            'variant': command.variant,
+            'wait_for_page': command.wait_for_page,
+            'implemented': command.implemented,
+            'source': 'userfunction' if userfunctions.get(name) is fnc else 'driver',
+            'doc': docstring.splitlines()[0] if docstring else '',
+            })
+    return catalogue
+
+
+def _iter_entry_points(group):
+    """
+    Iterate over installed entry points of given group.
+
+    :param group: entry point group name
+    :yields: entry point objects with `name` attribute and `load` method
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # python < 3.8
+        from pkg_resources import iter_entry_points
+        return iter_entry_points(group)
+    eps = entry_points()
+    return eps.select(group=group) if hasattr(eps, 'select') else eps.get(group, ())
+
+
+def _module_functions(module):
+    """
+    Get public functions defined (not just imported) in given module.
+
+    :param module: module object
+    :returns: dictionary of function names and functions
+    """
+    return {key: value for key, value in six.iteritems(module.__dict__)
+            if not key.startswith('_') and inspect.isfunction(value) and value.__module__ == module.__name__}
+
+
+@functools.lru_cache(maxsize=None)
+def userfunction_commands():
+    """
+    Discover user functions, once per process.
+
+    User functions are taken from module `selexe.userfunctions` and from plugins registered under the
+    `selexe.userfunctions` entry point group, which can point either to a module (all its public functions are taken)
+    or to a single function. Each function has to take 3 arguments: SeleniumDriver instance, target string and value
+    string.
+
+    :returns: read-only mapping of command names and `seleniumcommand`-decorated functions
+    """
+    fncdict = {}
+    try:
+        fncdict.update(_module_functions(importlib.import_module(USERFUNCTIONS_MODULE)))
+    except ImportError:
+        logger.info('Using no user functions from %s' % USERFUNCTIONS_MODULE)
+    for entry_point in _iter_entry_points(USERFUNCTIONS_ENTRY_POINT):
+        try:
+            plugin = entry_point.load()
+        except Exception:
+            logger.exception('Cannot load user functions plugin %r' % entry_point.name)
+            continue
+        if inspect.ismodule(plugin):
+            fncdict.update(_module_functions(plugin))
+        else:
+            fncdict[entry_point.name] = plugin
+    if fncdict:
+        logger.info('User functions: %s' % ', '.join(sorted(fncdict)))
+    return types.MappingProxyType({key: seleniumcommand(fnc) for key, fnc in six.iteritems(fncdict)})
+
+
 class SeleniumCommand:
-    __slots__ = ('fnc', 'name', 'docstring', 'defaults', 'wait_for_page', '_original_name')
+    __slots__ = ('fnc', 'name', 'docstring', 'defaults', 'wait_for_page', 'implemented', 'poll', 'proto', 'variant',
+                 '_original_name')
 
-    def __init__(self, fnc, wait_for_page=True):
+    def __init__(self, fnc, wait_for_page=True, implemented=True, poll=None):
         # print('__init__ called for', fnc)
         self.fnc = fnc
         self.name = getattr(fnc, 'fnc_name', None) or getattr(fnc, '__name__', None) \
@@ -39,6 +165,10 @@ class SeleniumCommand:
         self.docstring = getattr(fnc, '__doc__', None) or ''
         self.defaults = {}  # default kwargs parsed command
         self.wait_for_page = wait_for_page  # wait for ongoing page load before running
+        self.implemented = implemented  # False for stubs raising NotImplementedError
+        self.poll = poll  # maximum polling time hint in milliseconds for waits, None for driver's default
+        self.proto = self.name  # name of proto-command this command is derived from
+        self.variant = 'command'  # kind of derived command, ie. 'AndWait', 'verify' or 'waitForNot'
         self._original_name = self.name
 
     @classmethod
@@ -54,6 +184,29 @@ class SeleniumCommand:
         """
         return cls(fnc, wait_for_page=False)
 
+    @classmethod
+    def stub(cls, fnc):
+        """
+        Convenience alternate constructor for decorating commands which are not implemented yet, so command catalogues
+        (see `command_catalogue`) can tell them apart without calling them.
+
+        @param fnc: function to be encapsulated
+        @return instance of this class
+        """
+        return cls(fnc, implemented=False)
+
+    @classmethod
+    def polling(cls, poll, **kwargs):
+        """
+        Convenience decorator factory setting a polling time hint, used by waits while running the command instead of
+        driver's polling time, ie. for commands whose probes are expensive.
+
+        @param poll: maximum polling time in milliseconds
+        @param **kwargs: extra keyword arguments given to constructor
+        @return decorator returning instances of this class
+        """
+        return functools.partial(cls, poll=poll, **kwargs)
+
     def __eq__(self, other):
         """
         Test equality of SeleniumCommandType instances: equal if `fnc` and `defaults` attributes are equal.
@@ -79,9 +232,10 @@ class seleniumcommand(SeleniumCommand):
     This decorator returns a function with signature `(driver_instance, target=None, value=None)`, with the related
     `command_class` instance assigned to `command` function attribute.
     """
-    def __new__(cls, fnc, wait_for_page=True):
+    def __new__(cls, fnc, wait_for_page=True, implemented=True, poll=None):
         # print('__new__ called for', fnc)
-        sel_cmd = fnc if isinstance(fnc, SeleniumCommand) else SeleniumCommand(fnc, wait_for_page=wait_for_page)
+        sel_cmd = fnc if isinstance(fnc, SeleniumCommand) else \
+            SeleniumCommand(fnc, wait_for_page=wait_for_page, implemented=implemented, poll=poll)
 
         def wrapped(driver, target=None, value=None):
             if sel_cmd.wait_for_page:
@@ -128,21 +282,24 @@ class SeleniumMultiCommand(SeleniumCommand):
                     break
         return docstring
 
-    def _wrapper(self, name, fnc=None, waitDefault=None, **kw):
+    def _wrapper(self, name, fnc=None, waitDefault=None, variant='command', **kw):
         """
         Apply `seleniumcommand` attribute to given callable
 
         @param name: final command name
         @param fnc: wrapped proto-command
         @param waitDefault: True if command should wait for ongoing loads before executing, False otherwise (default)
+        @param variant: kind of derived command, ie. 'AndWait' or 'verifyNot', defaults to 'command'
         @param inverse: True if callable involves negation of original proto-command, False otherwise (default)
         @param **kw: extra keyword arguments will be forwarded to given function
         @return command_decorated function (defined by `seleniumcommand` itself)
         """
-        command = SeleniumCommand(fnc or self.fnc)
+        command = SeleniumCommand(fnc or self.fnc, implemented=self.implemented, poll=self.poll)
         command.defaults.update(kw)
         command.wait_for_page = self.wait_for_page if waitDefault is None else waitDefault
         command.name = name
+        command.proto = self.name
+        command.variant = variant
         command.docstring = self._docstring(name, kw.get('inverse', False))
         return seleniumcommand(command)
 
@@ -172,7 +329,7 @@ class seleniumimperative(SeleniumMultiCommand):
         """
         driver.deprecate_page()
         self.fnc(driver, target, value=value)
-        driver.wait_pageload()
+        driver.wait_pagechange()
 
     def related_commands(self):
         """
@@ -182,7 +339,7 @@ class seleniumimperative(SeleniumMultiCommand):
         @yield attribute `command_descriptor` instance, seleniumcommand in default implementation.
         """
         yield self._wrapper(self.name)
-        yield self._wrapper('%sAndWait' % self.name, self._and_wait)
+        yield self._wrapper('%sAndWait' % self.name, self._and_wait, variant='AndWait')
 
 
 class seleniummulticommand(SeleniumMultiCommand):
@@ -282,16 +439,17 @@ class seleniummulticommand(SeleniumMultiCommand):
         else:
             verb = 'get%s'
 
-        yield self._wrapper(verb % self.name, self._get)
-        yield self._wrapper('verify%s' % self.name, self._verify)
-        yield self._wrapper('assert%s' % self.name, self._assert)
-        yield self._wrapper('waitFor%s' % self.name, self._waitFor, waitDefault=False)
-        yield self._wrapper('store%s' % self.name, self._store)
+        yield self._wrapper(verb % self.name, self._get, variant=verb[:-2])
+        yield self._wrapper('verify%s' % self.name, self._verify, variant='verify')
+        yield self._wrapper('assert%s' % self.name, self._assert, variant='assert')
+        yield self._wrapper('waitFor%s' % self.name, self._waitFor, waitDefault=False, variant='waitFor')
+        yield self._wrapper('store%s' % self.name, self._store, variant='store')
 
         for inverse_name in inverse_names:
-            yield self._wrapper('verify%s' % inverse_name, self._verify, inverse=True)
-            yield self._wrapper('assert%s' % inverse_name, self._assert, inverse=True)
-            yield self._wrapper('waitFor%s' % inverse_name, self._waitFor, inverse=True, waitDefault=False)
+            yield self._wrapper('verify%s' % inverse_name, self._verify, inverse=True, variant='verifyNot')
+            yield self._wrapper('assert%s' % inverse_name, self._assert, inverse=True, variant='assertNot')
+            yield self._wrapper('waitFor%s' % inverse_name, self._waitFor, inverse=True, waitDefault=False,
+                                variant='waitForNot')
 
         if self.name == 'Expression':
-            yield self._wrapper('store', self._store)
+            yield self._wrapper('store', self._store, variant='store')
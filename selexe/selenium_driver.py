@@ -9,12 +9,10 @@ import itertools
 import logging
 import time
 import re
-import math
 import json
 import types
 import six
 import functools
-import bs4 as beautifulsoup
 import selenium.webdriver
 
 from selenium.common.exceptions import NoSuchWindowException, NoSuchElementException, NoSuchAttributeException, \
@@ -22,12 +20,18 @@ from selenium.common.exceptions import NoSuchWindowException, NoSuchElementExcep
     StaleElementReferenceException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.alert import Alert
 
 from .selenium_command import seleniumcommand, seleniumimperative, seleniummulticommand, \
     selenium_multicommand_discover, NOT_PRESENT_EXCEPTIONS
 from .selenium_external import ExternalElement, ExternalContext, element_context, original_element
+from .connection_pool import ConnectionPool
+from .stored_variables import StoredVariables
+from .selenium_runtime import SeleniumRuntime
+from .selenium_polling import PollSchedule, StepTiming
+from .selenium_sentinel import ErrorSentinel, SentinelTriggered
+from .session_snapshot import SessionSnapshot
+from .selenium_events import EventEngine
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +41,15 @@ class SeleniumDriver:
 
     _timeout = 1
     _poll = 1
-    _num_retries = 1
+    initial_poll = 10  # time before second poll in milliseconds, backing off up to poll
+    poll_backoff = 2.
+    sentinel_interval = 250  # minimum time between error sentinel checks in milliseconds
+    quiet_period = 300  # time without DOM mutations for page to be considered quiet by smart pause, in milliseconds
+    network_idle_period = 500  # time without pending requests for network to be considered idle, in milliseconds
+    form_commands = ('type', 'select', 'check', 'uncheck')  # commands `fill_form` can apply in a single script call
+    script_locator_kinds = ('css', 'id', 'name', 'xpath', 'dom')  # locator kinds runtime can find elements with
+    # elements `fill_form` leaves to native commands (real keystrokes and clicks)
+    native_input_selector = '[data-selexe-native], input[type=file], [contenteditable]'
     verification_errors = ()
     _by_target_locators = {
         'css': By.CSS_SELECTOR,
@@ -59,6 +71,18 @@ class SeleniumDriver:
         'ui': None,
     }
     sleep = staticmethod(time.sleep)
+    clock = staticmethod(time.monotonic)
+    poll_schedule_class = PollSchedule
+    step_timing_class = StepTiming
+    connection_pool_class = ConnectionPool
+    runtime_class = SeleniumRuntime
+    event_engine_class = EventEngine
+    commands = {}  # command registry, populated by `selenium_multicommand_discover`
+
+    def __init_subclass__(cls, **kwargs):
+        """ Generate related commands and command registry for subclasses. """
+        super().__init_subclass__(**kwargs)
+        selenium_multicommand_discover(cls)
 
     @property
     def timeout(self):
@@ -71,7 +95,6 @@ class SeleniumDriver:
         :param timeout: time in ms until timeout
         """
         self._timeout = int(timeout)
-        self._num_retries = self._count_retries()
 
         # self.driver.set_page_load_timeout(timeout) # not sure about this should or shouldn't be set
         self.driver.set_script_timeout(timeout)
@@ -84,72 +107,140 @@ class SeleniumDriver:
     def poll(self, poll):
         """ Time until the function inside a waitFor command is repeated in milliseconds. """
         self._poll = int(poll)
-        self._num_retries = self._count_retries()
 
     def deprecate_page(self):
-        self.driver.execute_script('document._deprecated_by_selexe=true;')
+        self.runtime.call('deprecate')
 
     def wait_pageload(self, timeout=None):
         """ Wait for document to get loaded. If document has frames, wait for them too. """
-        script = 'return (document.readyState===\'complete\')&&(!document._deprecated_by_selexe);'
         for _ in self.retries(timeout=timeout):
-            if self.driver.execute_script(script):
+            if self.runtime.call('pageReady'):
                 break
 
-    def _count_retries(self, timeout=None, poll=None):
-        """ Get number of retries for given timeout and polling time.
+    def wait_network_idle(self, timeout=None):
+        """ Wait for document to get loaded, without pending XMLHttpRequest, fetch nor connecting WebSocket requests for
+        `network_idle_period`, checking everything in a single call on every poll.
 
-        :param timeout: minimum timeout should be waited, defaults to current timeout
-        :param poll: time between retries, defaults to current polling time
-        :return: number of retries
+        Network idleness also ends waits on pages deprecated by `deprecate_page` which are not replaced (ie.
+        single-page application transitions), once `network_idle_period` elapsed since deprecation. Deprecation is then
+        cleared, so later commands waiting for page load (see `wait_pageload`) run on that same document. """
+        for _ in self.retries(timeout=timeout):
+            if self.runtime.call('networkIdle', self.network_idle_period):
+                break
+
+    def wait_pagechange(self, timeout=None):
+        """ Wait for page changed by a command, see `wait_pageload` and, in network idle mode, `wait_network_idle`. """
+        if self.network_idle:
+            self.wait_network_idle(timeout)
+        else:
+            self.wait_pageload(timeout)
+
+    def poll_schedule(self, timeout=None, poll=None):
+        """ Get deadline-based polling schedule, see `selexe.selenium_polling.PollSchedule`.
+
+        :param timeout: timeout in milliseconds, defaults to default timeout
+        :param poll: maximum time between polls in milliseconds, defaults to current command polling hint, if any,
+                     or current polling time
+        :return: PollSchedule instance
         """
-        if timeout is None:
-            timeout = self._timeout
+        step = self.current_step
         if poll is None:
-            poll = self._poll
-        return int(math.ceil(float(timeout) / poll))
+            poll = step.poll if step is not None and step.poll else self._poll
+        return self.poll_schedule_class(
+            self._timeout if timeout is None else timeout, poll, initial=self.initial_poll, backoff=self.poll_backoff,
+            record=step, check=self.check_error_sentinels, clock=self.clock,
+            sleep=self.warped_sleep if self.time_warp > 1 else self.sleep)
+
+    def warped_sleep(self, seconds):
+        """ Sleep, fast-forwarding page time so it runs `time_warp` times faster meanwhile, see `time_warp`.
+
+        :param seconds: real time to sleep in seconds
+        """
+        self.sleep(seconds)
+        try:
+            self.runtime.call('advance', seconds * 1000. * (self.time_warp - 1))
+        except WebDriverException as e:
+            logger.debug('Page time cannot be fast-forwarded: %s' % e)  # ie. page being unloaded
+
+    @classmethod
+    def error_sentinel(cls, spec):
+        """ Parse error sentinel string, see `selexe.selenium_sentinel`.
+
+        :param spec: sentinel string, ie. 'title=^500', 'css=.error-banner' or 'js=window.appCrashed'
+        :return ErrorSentinel instance
+        :raises ValueError if sentinel is not valid
+        """
+        tag_and_value = functools.partial(cls._tag_and_value, locators=cls._target_locators, default='identifier')
+        return ErrorSentinel.from_spec(spec, tag_and_value)
+
+    @property
+    def active_error_sentinels(self):
+        """ Error sentinels applying to current baseuri. """
+        return self.error_sentinels.get(None, []) + self.error_sentinels.get(self.baseuri, [])
+
+    def check_error_sentinels(self, force=False):
+        """ Check error sentinels of current baseuri in page, at most once every `sentinel_interval`.
+
+        :param force: check even if last check is recent
+        :raises SentinelTriggered if any sentinel condition is met
+        """
+        sentinels = self.active_error_sentinels
+        if not sentinels:
+            return
+        now = self.clock()
+        if not force and self._sentinels_checked is not None and \
+                now - self._sentinels_checked < self.sentinel_interval / 1000.:
+            return
+        self._sentinels_checked = now
+        try:
+            index = self.runtime.call('checkSentinels', [[sentinel.kind, sentinel.value] for sentinel in sentinels])
+        except WebDriverException as e:
+            logger.debug('Error sentinels cannot be checked: %s' % e)  # ie. page being unloaded
+            return
+        if index is not None and index >= 0:
+            raise SentinelTriggered('Error sentinel %r triggered, aborting wait' % sentinels[index].spec)
 
-    def retries(self, timeout=None):
-        """ Iterable that sleeps, poll and finally raises RuntimeError timeout if exhausted
+    def retries(self, timeout=None, poll=None):
+        """ Iterable that sleeps, poll and finally raises TimeoutException if deadline is reached
 
         :param timeout: timeout in milliseconds, defaults to default timeout
-        :yields None before sleeping continuously until timeout
+        :param poll: maximum time between polls in milliseconds, see `poll_schedule`
+        :yields attempt number before sleeping (with backoff) until timeout
         :raises TimeoutException if timeout is exhausted
         """
-        repeats = self._num_retries if timeout is None else self._count_retries(timeout=timeout)
-        poll = self._poll / 1000.
-        for i in range(repeats):
-            yield i
-            self.sleep(poll)
-        raise TimeoutException("Timed out after %d ms" % (self._timeout if timeout is None else timeout))
+        return iter(self.poll_schedule(timeout, poll))
 
     def _autotimeout(self, timeout=None):
-        """ Iterable that iterates until timeout gets exhausted. It's less efficient than _retries, but more accurate.
+        """ Iterable that iterates until timeout gets exhausted, like `retries` but yielding remaining time.
 
         :param timeout: timeout in milliseconds, defaults to default timeout
-        :yields remaining timeout
+        :yields remaining timeout in milliseconds
         :raises TimeoutException if timeout is exhausted
         """
-        timeout = self._timeout if timeout is None else timeout
-        dest = time.time() + timeout/1000.
-        poll = self._poll / 1000.
-        ct = time.time()
-        while ct < dest:
-            yield int((dest-ct)*1000)
-            nt = time.time()
-            if nt-ct < poll:
-                self.sleep(poll-nt+ct)
-                ct += poll
-            else:
-                ct = nt
-        raise TimeoutException("Timed out after %d ms" % timeout)
+        schedule = self.poll_schedule(timeout)
+        for _ in schedule:
+            yield schedule.remaining
 
-    def __init__(self, driver, baseuri=None, timeout=30000, poll=100):
+    def __init__(self, driver, baseuri=None, timeout=30000, poll=100, http_timeout=None, error_sentinels=None,
+                 smart_pause=False, network_idle=False, time_warp=1, animations=True, native_input=None):
         """
         :param driver: selenium WebDriver instance
         :param baseuri: base url or None
         :param timeout: timeout in milliseconds
         :param poll: polling interval in milliseconds
+        :param http_timeout: timeout in milliseconds for REST requests, defaults to timeout
+        :param error_sentinels: iterable of error sentinels aborting waits (see `selexe.selenium_sentinel`), or
+                                dictionary of those by baseuri (None key for sentinels applying to every baseuri)
+        :param smart_pause: if True, `pause` waits until page is quiet (loaded, without pending requests nor recent DOM
+                            mutations), using pause time as upper bound
+        :param network_idle: if True, page changes (`open`, `AndWait` commands and `waitForPageToLoad`) are also waited
+                             for network idle, see `wait_network_idle`
+        :param time_warp: if greater than 1, page timers run this many times faster while waiting (on `pause` and
+                          between polls), see `selexe.selenium_runtime` timewarp option
+        :param animations: if False, CSS transitions, animations and smooth scrolling are disabled on every page, see
+                           `selexe.selenium_runtime` noanimations option
+        :param native_input: CSS selector of form fields `fill_form` must leave to native commands, in addition to
+                             `native_input_selector` ones
         """
 
         self.driver = driver
@@ -158,12 +249,84 @@ class SeleniumDriver:
         """
         self.baseuri = baseuri or ''
         self.verification_errors = []
-        self._importUserFunctions()  # FIXME
+        # timing records of executed steps, see `slowest_steps`
+        self.step_timings = []
+        self.current_step = None
         self.timeout = timeout
         self.poll = poll
         self.custom_locators = {}
+        if not isinstance(error_sentinels, dict):
+            error_sentinels = {None: error_sentinels or ()}
+        self.error_sentinels = {
+            baseuri: [self.error_sentinel(spec) for spec in specs]
+            for baseuri, specs in six.iteritems(error_sentinels)
+            }
+        self._sentinels_checked = None
+        self.smart_pause = smart_pause
+        self.pause_saved = 0  # milliseconds not waited by smart pause
+        self.network_idle = network_idle
+        self.time_warp = time_warp
+        if native_input:
+            self.native_input_selector = '%s, %s' % (self.native_input_selector, native_input)
+        # in-page helper runtime, installed once per document
+        self.runtime = self.runtime_class(driver, locators=self.custom_locators, options={
+            'monitor': smart_pause or network_idle,
+            'timewarp': time_warp > 1,
+            'noanimations': not animations,
+            })
+        # selenese event compiler, see `_event`
+        self.events = self.event_engine_class(driver, self.runtime, functools.partial(self._find_target, 'css=body'))
         # 'storedVariables' is used through the 'create_store' decorator above to store values during a selenium run:
         self.storedVariables = {}
+        self._stored_variables_tokens = ('%s-%d' % (id(self), i) for i in itertools.count())
+        # keep-alive connections used by REST user functions
+        self.connection_pool = self.connection_pool_class(timeout=(timeout if http_timeout is None else http_timeout)
+                                                          / 1000.)
+
+    @property
+    def storedVariables(self):
+        """ Stored variables, changes are tracked and only those are sent to the browser on every eval. """
+        return self._stored_variables
+
+    @storedVariables.setter
+    def storedVariables(self, value):
+        self._stored_variables = value if isinstance(value, StoredVariables) else StoredVariables(value)
+        self._stored_variables_token = None  # browser copy is outdated, send all variables on next eval
+
+    def snapshot(self):
+        """ Capture browser session state (cookies, localStorage, sessionStorage and current url) and stored
+        variables, ie. after fixture setUp.
+
+        :return SessionSnapshot instance
+        """
+        storage = self.runtime.call('storage')
+        return SessionSnapshot(
+            self.driver.current_url, self.driver.get_cookies(), local_storage=storage['localStorage'],
+            session_storage=storage['sessionStorage'], stored_variables=self.storedVariables)
+
+    def restore(self, snapshot):
+        """ Restore session state captured by `snapshot`, replacing current cookies, storages and stored variables,
+        and open snapshot url.
+
+        :param snapshot: SessionSnapshot instance
+        """
+        self.driver.get(snapshot.url)  # cookies and storages can only be set on their own origin
+        self.driver.delete_all_cookies()
+        for cookie in snapshot.cookies:
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException as e:
+                logger.debug('Cookie %r cannot be restored: %s' % (cookie['name'], e))  # ie. from another domain
+        self.runtime.call('restoreStorage', {
+            'localStorage': snapshot.local_storage,
+            'sessionStorage': snapshot.session_storage,
+            })
+        self.storedVariables = snapshot.stored_variables
+        self.driver.get(snapshot.url)
+
+    def close_connections(self):
+        """ Close all idle connections of REST connection pool """
+        self.connection_pool.close()
 
     def clean_verification_errors(self):
         """ Clean verification errors """
@@ -182,42 +345,101 @@ class SeleniumDriver:
         Examples for methods are 'verifyText', 'assertText', 'waitForText', etc., so methods that are
         typically available in the Selenium IDE.
 
-        Most methods are dynamically created through decorator functions (from 'wd_SEL*-methods) and hence are
-        dynamically looked up in the class dictionary.
+        Most methods are dynamically created through decorator functions (from 'wd_SEL*-methods) and, along with user
+        functions, collected into the `commands` class registry when the class is created.
 
         :param command: Selenium IDE command.
         :param target: command's first parameter, usually target.
         :param value: command's second parameter, optional.
         :return value returned by command, usually True, False or string.
         """
-        try:
-            method = getattr(self, command)
-        except AttributeError:
+        method = self.commands.get(command)
+        if method is None:
             raise NotImplementedError('no proper function for sel command "%s" implemented' % command)
 
         v_target = self._expandVariables(target) if target else target
         v_value = self._expandVariables(value) if value else value
 
-        return method(v_target, v_value)
+        step = self.step_timing_class(command, v_target, v_value, poll=method.command.poll)
+        self.step_timings.append(step)
+        previous, self.current_step = self.current_step, step
+        start = self.clock()
+        try:
+            return method(self, v_target, v_value)
+        finally:
+            step.elapsed = self.clock() - start
+            self.current_step = previous
+
+    def fill_form(self, rows):
+        """ Apply consecutive form commands (see `form_commands`) on current page, setting values and dispatching
+        input and change events in a single script call.
 
-    def _importUserFunctions(self):  # TODO: replace for flexibility
-        """ Import user functions from module userfunctions.
+        Fields which cannot be set this way (ie. not found in main document, custom locators, pattern option locators
+        or fields matching `native_input_selector`) are handled by executing their commands natively, in order.
 
-        Each function in module userfunction (excluding the ones starting with "_") has to take
-        3 arguments: SeleniumDriver instance, target string, value string. Wrap these function
-        by the decorator function "seleniumcommand" and add them as bound methods.
+        :param rows: iterable of (command, target, value) tuples of `form_commands`
         """
+        rows = list(rows)
+        self.wait_pageload()
+        start = 0
+        while start < len(rows):
+            fields = []
+            for command, target, value in rows[start:]:
+                field = self._form_field(command, target, value)
+                if field is None:
+                    break
+                fields.append(field)
+            if fields:
+                step = self.step_timing_class('fillForm', '%d fields' % len(fields))
+                self.step_timings.append(step)
+                begin = self.clock()
+                start += self.runtime.call('fillForm', fields, self.native_input_selector)
+                step.elapsed = self.clock() - begin
+            if start < len(rows):
+                self.execute(*rows[start])
+                start += 1
+
+    def _form_field(self, command, target, value):
+        """ Get field description for runtime's fillForm, see `fill_form`.
+
+        :return dictionary or None if command must be executed natively
+        """
+        target = self._expandVariables(target) if target else target
+        value = self._expandVariables(value) if value else value
         try:
-            from selexe import userfunctions
-
-            fncdict = {key: value for key, value in six.iteritems(userfunctions.__dict__)
-                       if not key.startswith("_") and callable(value)}
-            for funcName, fnc in six.iteritems(fncdict):
-                newBoundMethod = types.MethodType(seleniumcommand(fnc), self)
-                setattr(self, funcName, newBoundMethod)
-            logger.info("User functions: %s" % ", ".join(fncdict))
-        except ImportError:
-            logger.info("Using no user functions")
+            kind, locator = self._tag_and_value(target, locators=self._target_locators, default='identifier')
+        except WebDriverException:
+            return None  # ie. custom locators
+        if kind not in self.script_locator_kinds:
+            return None
+        field = {'command': command, 'kind': kind, 'locator': locator, 'text': value or ''}
+        if command == 'select':
+            option, text = self._tag_and_value(value, locators=('id', 'label', 'value', 'index'), default='label')
+            if option in ('label', 'value'):
+                if text.startswith('exact:'):
+                    text = text[6:]
+                elif text.startswith('glob:'):
+                    text = text[5:]
+                elif text.startswith('regexp') or '*' in text or '?' in text:
+                    return None  # patterns are matched natively
+            field.update(option=option, text=text)
+        return field
+
+    def slowest_steps(self, n=10):
+        """ Get executed steps which spent most time polling.
+
+        :param n: maximum number of steps
+        :return list of StepTiming instances, sorted by time spent sleeping between polls
+        """
+        waiting = [step for step in self.step_timings if step.waits]
+        return sorted(waiting, key=lambda step: (step.slept, step.attempts), reverse=True)[:n]
+
+    def __getattr__(self, name):
+        """ Give access to registered commands which are not class attributes (i.e. user functions) as methods. """
+        try:
+            return types.MethodType(self.commands[name], self)
+        except KeyError:
+            raise AttributeError('%r object has no attribute %r' % (self.__class__.__name__, name))
 
     def _expandVariablesCallback(self, match):
         return self.storedVariables.get(match.group(1), match.group(0))
@@ -256,21 +478,7 @@ class SeleniumDriver:
         :param id: script tag id
         :param where: where script should be placed (head or body)
         """
-        set_id_part = 'script.attributes.id=\'%s(id)s\';' if id else ''
-        script = (
-                     'var parent=document.getElementsByTagName(\'%(parent)s\')[0]||document,'
-                     'script=document.createElement(\'script\'),'
-                     'content=document.createTextNode(%(content)s);'
-                     'script.attributes.type=\'text/javascript\';'
-                     '%(set_id_part)s'
-                     'script.appendChild(content);'
-                     'parent.appendChild(script);'
-                 ) % {
-                     'parent': where,
-                     'set_id_part': set_id_part,
-                     'content': json.dumps(content),
-                 }
-        self.driver.execute_script(script)
+        self.runtime.call('writeScript', content, where, id)
 
     @seleniumcommand.nowait  # 'open' has no AndWait variant
     def open(self, target, value=None):  # noqa
@@ -288,14 +496,14 @@ class SeleniumDriver:
                 target = '%s/%s' % (self.driver.current_url.rstrip('/'), target.lstrip('/'))
         self.deprecate_page()
         self.driver.get(target)
-        self.wait_pageload()
+        self.wait_pagechange()
 
     @seleniumimperative.nowait
     def refresh(self, _target=None, value=None):  # noqa
         """ Simulate the user clicking the "Refresh" button on their browser. """
         self.deprecate_page()
         self.driver.refresh()
-        self.wait_pageload()
+        self.wait_pagechange()
 
     @seleniumimperative
     def click(self, target, value=None):  # noqa
@@ -431,7 +639,7 @@ class SeleniumDriver:
     @seleniumcommand
     def waitForPageToLoad(self, _target=None, value=None):  # noqa
         """Wait until page changes."""
-        self.wait_pageload()
+        self.wait_pagechange()
 
     @seleniumcommand
     def type(self, target, value):
@@ -466,46 +674,22 @@ class SeleniumDriver:
         if target_elem.is_selected():
             target_elem.click()
 
-    def _event(self, target, name):
-        """ Generate given event with webdriver.
+    def _event(self, target, name, coords=None):
+        """ Generate given event, as a single W3C actions request for pointer events, or a single in-page dispatch for
+        any other, see `selexe.selenium_events`.
 
         :param target: target element or locator
         :param name: event name
+        :param coords: optional "x,y" coordinate string, relative to element's top-left corner, for pointer events
         """
         element = self._find_target(target) if isinstance(target, six.string_types) else target
         with element_context(element):
-            if name == 'blur':
-                self._event(element, 'focus')
-                body = self._find_target('css=body')
-                chain = ActionChains(self.driver)
-                chain.move_to_element(body)
-                chain.click(body)
-                chain.perform()
-            elif name == 'focus':
-                if element.tag_name == 'input':
-                    element.send_keys('')
-                else:
-                    chain = ActionChains(self.driver)
-                    chain.move_to_element(element)
-                    chain.perform()
-            elif name == 'mouseover':
-                chain = ActionChains(self.driver)
-                chain.move_to_element(element)
-                chain.perform()
-            elif name == 'mouseout':
-                body = self._find_target('css=body')
-                chain = ActionChains(self.driver)
-                chain.move_to_element(element)
-                chain.perform()
-                chain.move_to_element_with_offset(body, -1, -1)
-                chain.perform()
-            elif name == 'click':
-                chain = ActionChains(self.driver)
-                chain.move_to_element(element)
-                chain.click(element)
-                chain.perform()
+            if name in self.events.pointer_events:
+                if coords:
+                    coords = tuple(int(float(coord)) for coord in coords.split(','))
+                self.events.perform(self.events.compile(name, element, coords))
             else:
-                logger.exception('Event trigger for %r is not implemented yet, will be ignored.' % name)
+                self.events.dispatch(element, name)
 
     @seleniumimperative
     def mouseOver(self, target, value=None):  # noqa
@@ -533,6 +717,182 @@ class SeleniumDriver:
         """
         self._event(target, 'mouseout')
 
+    @seleniumimperative
+    def mouseDown(self, target, value=None):  # noqa
+        """ Simulate a user pressing the left mouse button (without releasing it yet) on the specified element.
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._event(target, 'mousedown')
+
+    @seleniumimperative
+    def mouseDownAt(self, target, value):  # noqa
+        """ Simulate a user pressing the left mouse button (without releasing it yet) at the specified location.
+
+        :param target: an element locator
+        :param value: "x,y" coordinates relative to element's top-left corner, ie. "10,20"
+        """
+        self._event(target, 'mousedown', value)
+
+    @seleniumimperative
+    def mouseDownRight(self, target, value=None):  # noqa
+        """ Simulate a user pressing the right mouse button (without releasing it yet) on the specified element.
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._event(target, 'mousedownright')
+
+    @seleniumimperative
+    def mouseDownRightAt(self, target, value):  # noqa
+        """ Simulate a user pressing the right mouse button (without releasing it yet) at the specified location.
+
+        :param target: an element locator
+        :param value: "x,y" coordinates relative to element's top-left corner, ie. "10,20"
+        """
+        self._event(target, 'mousedownright', value)
+
+    @seleniumimperative
+    def mouseUp(self, target, value=None):  # noqa
+        """ Simulate the event that occurs when the user releases the left mouse button (i.e., stops holding the
+        button down) on the specified element.
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._event(target, 'mouseup')
+
+    @seleniumimperative
+    def mouseUpAt(self, target, value):  # noqa
+        """ Simulate the event that occurs when the user releases the left mouse button (i.e., stops holding the
+        button down) at the specified location.
+
+        :param target: an element locator
+        :param value: "x,y" coordinates relative to element's top-left corner, ie. "10,20"
+        """
+        self._event(target, 'mouseup', value)
+
+    @seleniumimperative
+    def mouseUpRight(self, target, value=None):  # noqa
+        """ Simulate the event that occurs when the user releases the right mouse button (i.e., stops holding the
+        button down) on the specified element.
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._event(target, 'mouseupright')
+
+    @seleniumimperative
+    def mouseUpRightAt(self, target, value):  # noqa
+        """ Simulate the event that occurs when the user releases the right mouse button (i.e., stops holding the
+        button down) at the specified location.
+
+        :param target: an element locator
+        :param value: "x,y" coordinates relative to element's top-left corner, ie. "10,20"
+        """
+        self._event(target, 'mouseupright', value)
+
+    @seleniumimperative
+    def mouseMove(self, target, value=None):  # noqa
+        """ Simulate a user moving the mouse pointer to the specified element.
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._event(target, 'mousemove')
+
+    @seleniumimperative
+    def mouseMoveAt(self, target, value):  # noqa
+        """ Simulate a user moving the mouse pointer to the specified location.
+
+        :param target: an element locator
+        :param value: "x,y" coordinates relative to element's top-left corner, ie. "10,20"
+        """
+        self._event(target, 'mousemove', value)
+
+    @seleniumimperative
+    def keyDown(self, target, value):  # noqa
+        """ Simulate a user pressing a key (without releasing it yet).
+
+        As in Selenium IDE, a synthetic keydown event is dispatched, carrying modifier keys pressed by altKeyDown,
+        shiftKeyDown, controlKeyDown and metaKeyDown.
+
+        :param target: an element locator
+        :param value: either a single character, or a backslash followed by a numeric key code, ie. "w" or "\\119"
+        """
+        element = self._find_target(target)
+        with element_context(element):
+            self.events.key(element, 'keydown', value)
+
+    @seleniumimperative
+    def keyUp(self, target, value):  # noqa
+        """ Simulate a user releasing a key.
+
+        As in Selenium IDE, a synthetic keyup event is dispatched, carrying modifier keys pressed by altKeyDown,
+        shiftKeyDown, controlKeyDown and metaKeyDown.
+
+        :param target: an element locator
+        :param value: either a single character, or a backslash followed by a numeric key code, ie. "w" or "\\119"
+        """
+        element = self._find_target(target)
+        with element_context(element):
+            self.events.key(element, 'keyup', value)
+
+    @seleniumimperative
+    def keyPress(self, target, value):  # noqa
+        """ Simulate a user pressing and releasing a key.
+
+        As in Selenium IDE, a synthetic keypress event is dispatched, carrying modifier keys pressed by altKeyDown,
+        shiftKeyDown, controlKeyDown and metaKeyDown.
+
+        :param target: an element locator
+        :param value: either a single character, or a backslash followed by a numeric key code, ie. "w" or "\\119"
+        """
+        element = self._find_target(target)
+        with element_context(element):
+            self.events.key(element, 'keypress', value)
+
+    @seleniumimperative
+    def altKeyDown(self, target=None, value=None):  # noqa
+        """ Press the alt key and hold it down until altKeyUp is called. """
+        self.events.modifier('alt', True)
+
+    @seleniumimperative
+    def altKeyUp(self, target=None, value=None):  # noqa
+        """ Release the alt key. """
+        self.events.modifier('alt', False)
+
+    @seleniumimperative
+    def shiftKeyDown(self, target=None, value=None):  # noqa
+        """ Press the shift key and hold it down until shiftKeyUp is called. """
+        self.events.modifier('shift', True)
+
+    @seleniumimperative
+    def shiftKeyUp(self, target=None, value=None):  # noqa
+        """ Release the shift key. """
+        self.events.modifier('shift', False)
+
+    @seleniumimperative
+    def controlKeyDown(self, target=None, value=None):  # noqa
+        """ Press the control key and hold it down until controlKeyUp is called. """
+        self.events.modifier('control', True)
+
+    @seleniumimperative
+    def controlKeyUp(self, target=None, value=None):  # noqa
+        """ Release the control key. """
+        self.events.modifier('control', False)
+
+    @seleniumimperative
+    def metaKeyDown(self, target=None, value=None):  # noqa
+        """ Press the meta key and hold it down until metaKeyUp is called. """
+        self.events.modifier('meta', True)
+
+    @seleniumimperative
+    def metaKeyUp(self, target=None, value=None):  # noqa
+        """ Release the meta key. """
+        self.events.modifier('meta', False)
+
     @seleniumcommand.nowait
     def waitForPopUp(self, target=None, value=None):
         """ Wait for a popup window to appear and load up.
@@ -857,16 +1217,39 @@ class SeleniumDriver:
 
     @seleniumimperative.nowait
     def addLocationStrategy(self, target, value=None):
-        self.custom_locators[target] = value
+        self.runtime.add_locator(target, value)
 
     @seleniumcommand
     def pause(self, target, value=None):  # noqa
         """ Wait for the specified amount of time (in milliseconds).
 
-        :param target: the amount of time to sleep (in milliseconds)
+        With smart pause enabled, waits only until page is quiet (see `wait_quiet`). With time warp, page time still
+        advances by the whole amount, but real time is divided by `time_warp`.
+
+        :param target: the amount of time to sleep (in milliseconds), defaults to timeout
+        """
+        milliseconds = int(target) if target else self._timeout
+        if self.smart_pause:
+            self.wait_quiet(milliseconds)
+        elif self.time_warp > 1:
+            self.warped_sleep(milliseconds / 1000. / self.time_warp)
+        else:
+            self.sleep(milliseconds / 1000.)
+
+    def wait_quiet(self, timeout):
+        """ Wait until page is loaded, without pending XMLHttpRequest or fetch requests, and without DOM mutations
+        for `quiet_period`, at most `timeout` milliseconds. Time not waited is added to `pause_saved`.
+
+        :param timeout: maximum time to wait in milliseconds
         """
-        milliseconds = (int(target) / 1000.) if target else self._timeout
-        time.sleep(milliseconds)  # TODO: find a better way
+        start = self.clock()
+        try:
+            for _ in self.retries(timeout=timeout):
+                if self.runtime.call('quiet', self.quiet_period):
+                    break
+        except TimeoutException:
+            return
+        self.pause_saved += max(timeout - (self.clock() - start) * 1000, 0)
 
     @seleniumimperative
     def runScript(self, _target, value=None):  # noqa
@@ -943,9 +1326,10 @@ class SeleniumDriver:
         with element_context(element):
             source = self.driver.page_source
 
+        import bs4 as beautifulsoup
         return beautifulsoup.BeautifulSoup(source, "html.parser").select(css)[0]
 
-    @seleniummulticommand
+    @seleniummulticommand.polling(500)  # every probe parses whole page source
     def TextPresent(self, target, value=None):  # noqa
         """ Verify that the specified text pattern appears somewhere on the page shown to the user (if visible).
 
@@ -953,6 +1337,7 @@ class SeleniumDriver:
         :param value: <not used>
         :return true if the pattern matches the text, false otherwise
         """
+        import bs4 as beautifulsoup
         doc = beautifulsoup.BeautifulSoup(self.driver.page_source, "html.parser").body
         for result in doc.findAll(text=self._translatePatternToRegex(target)):
             if self._element_from_soup(result).is_displayed():
@@ -1049,19 +1434,20 @@ class SeleniumDriver:
         :param value: variable name
         :return the value of the specified attribute
         """
-        reset = ['document']  # ensure consistent behavior
-        js = (
-            'var %(reset)s,'
-            'storedVars=%(variables)s,'
-            'r = eval(%(target)s);'
-            # We need to care about Selenium IDE returning 'null' instead of 'undefined'.
-            'return [\'\'+(r===undefined?null:r), storedVars];'
-            ) % {
-            'reset': ','.join('%s = undefined' % i for i in reset),
-            'variables': json.dumps(self.storedVariables),
-            'target': json.dumps(target),
-            }
-        result, self.storedVariables = self.driver.execute_script(js)
+        changed, deleted = self.storedVariables.take_changes()
+        token = next(self._stored_variables_tokens)
+        try:
+            result = self.runtime.call('evaluate', target, self._stored_variables_token, token, changed, deleted,
+                                       False)
+            if result is None:
+                # page has no (or another) copy of stored variables, ie. after navigation: send all of them
+                result = self.runtime.call('evaluate', target, None, token, dict(self.storedVariables), [], True)
+        except:  # noqa
+            self._stored_variables_token = None  # changes were not received, resync everything on next call
+            raise
+        self._stored_variables_token = token
+        result, remote_changed, remote_deleted = result
+        self.storedVariables.apply_changes(remote_changed, remote_deleted)
         return value, result
 
     @seleniummulticommand
@@ -1201,6 +1587,18 @@ class SeleniumDriver:
         param = {'tag': tag, 'value': value}
         return locators[tag][0] % param, locators[tag][1] % param
 
+    def _find_script_target(self, name, *args):
+        """ Find element using given runtime locator function.
+
+        :param name: runtime function name
+        :param args: runtime function arguments
+        :return the webelement instance found
+        """
+        element = self.runtime.call(name, *args)
+        if element is None:
+            raise NoSuchElementException('Element with %r not found.' % (args[-1],))
+        return element
+
     def _find_target(self, target, click=False):
         """ Select and execute the appropriate find_element_* method for an element locator.
 
@@ -1209,20 +1607,23 @@ class SeleniumDriver:
         @rtype: selenium.webdriver.remote.webelement.WebElement
         """
         if self.custom_locators:
-            template = '(function(locator, inWindow, inDocument){%s}(\'%s\', window, window.document));'
             locators = dict(self._target_locators)
-            locators.update((name, ('dom', template % body)) for name, body in six.iteritems(self.custom_locators))
+            locators.update((name, None) for name in self.custom_locators)
         else:
             locators = self._target_locators
 
         tag, value = self._tag_and_value(target, locators=locators, default='identifier')
-        if tag == 'ui':
+        if tag in self.custom_locators:
+            # compiled once per document by the runtime
+            find_one = functools.partial(self._find_script_target, 'locate', tag, value)
+            find_many = lambda: [find_one()]
+        elif tag == 'ui':
             raise NotImplementedError('ui locators are not implemented yet')  # TODO: implement
         elif tag == 'css':
             find_one = functools.partial(self.driver.find_element_by_css_selector, value)
             find_many = functools.partial(self.driver.find_elements_by_css_selector, value)
         elif tag == 'dom':
-            find_one = functools.partial(self.driver.execute_script, 'return eval(%s)' % json.dumps(value))
+            find_one = functools.partial(self._find_script_target, 'dom', value)
             find_many = lambda: [find_one()]
         elif tag in self._by_target_locators:
             by = self._by_target_locators[tag]
@@ -1339,115 +1740,23 @@ class SeleniumDriver:
 
     # ############################################ Unimplemented stuff #################################################
 
-    @seleniumimperative
+    @seleniumimperative.stub
     def allowNativeXpath(self, target, value=None):  # pragma: nocover
         raise NotImplementedError('not implemented yet')
 
-    @seleniumcommand
+    @seleniumcommand.stub
     def answerOnNextPrompt(self, target, value=None):  # pragma: nocover
         raise NotImplementedError('not implemented yet')
 
-    @seleniumcommand
+    @seleniumcommand.stub
     def windowFocus(self, target, value=None):  # pragma: nocover
         raise NotImplementedError('not implemented yet')
 
-    @seleniumimperative
+    @seleniumimperative.stub
     def windowMaximize(self, target, value=None):  # pragma: nocover
         raise NotImplementedError('not implemented yet')
 
-    @seleniumimperative
-    def altKeyDown(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def shiftKeyDown(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def controlKeyDown(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def keyDown(self, target, value=None):  # pragma: nocover
-        # target_elm = self._find_target(target)
-        # self._chain.key_down(target_elm, value)
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def keyUp(self, target, value=None):   # pragma: nocover
-        # target_elm = self._find_target(target)
-        # self._chain.key_up(target_elm, value)
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def metaKeyDown(self, target=None, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def metaKeyUp(self, target=None, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseDown(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseDownAt(self, target, value):  # pragma: nocover
-        """
-        :param target: locator
-        :param value: coordstring
-        """
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseDownRight(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseDownRightAt(self, target, value):  # pragma: nocover
-        """
-        :param target: locator
-        :param value: coordstring
-        """
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseMove(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseMoveAt(self, target, value):  # pragma: nocover
-        """
-        :param target: locator
-        :param value: coordstring
-        """
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseUp(self, target, value=None):  # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseUpAt(self, target, value):  # pragma: nocover
-        """
-        :param target: locator
-        :param value: coordstring
-        """
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseUpRight(self, target, value=None):   # pragma: nocover
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
-    def mouseUpRightAt(self, target, value):  # pragma: nocover
-        """
-        :param target: locator
-        :param value: coordstring
-        """
-        raise NotImplementedError('not implemented yet')
-
-    @seleniumimperative
+    @seleniumimperative.stub
     def openWindow(self, target, value):  # pragma: nocover
         """
         Open a popup window (if a window with that ID isn't already open). After opening the window, you'll
@@ -1463,7 +1772,7 @@ class SeleniumDriver:
         """
         raise NotImplementedError('not implemented yet')
 
-    @seleniumimperative
+    @seleniumimperative.stub
     def rollup(self, target, value):  # pragma: nocover
         """
         Executes a command rollup, which is a series of commands with a unique name, and optionally arguments that
@@ -1475,7 +1784,7 @@ class SeleniumDriver:
         """
         raise NotImplementedError('not implemented yet')
 
-    @seleniumimperative
+    @seleniumimperative.stub
     def addScript(self, target, value=None):  # pragma: nocover
         """
         *Important:* Not implemented as it's not supported by Selenium IDE itself,
@@ -1492,7 +1801,7 @@ class SeleniumDriver:
         """
         raise NotImplementedError('Unsupported by Selenium IDE and unable to get Selenium document using webdriver.')
 
-    @seleniumimperative
+    @seleniumimperative.stub
     def removeScript(self, _target, value=None):  # noqa   # pragma: nocover
         """
         *Important:* This command does nothing as works along with with `addScript` which is unsupported.
@@ -0,0 +1,276 @@
+"""
+Event engine
+------------
+Selenese events are compiled into a single W3C Actions payload (pointer moves, mouse buttons and modifier keys), sent
+to the browser in one request, instead of performing several action chains per event.
+
+Events webdriver cannot generate natively (focus, blur, keyboard events of keyDown/keyUp/keyPress commands and any
+other fireEvent name) are dispatched in page, also in a single call, through the selexe runtime.
+
+Drivers not speaking W3C WebDriver protocol fall back to legacy ActionChains.
+"""
+import logging
+
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.command import Command
+from selenium.common.exceptions import StaleElementReferenceException
+
+from .selenium_external import original_element
+
+
+logger = logging.getLogger(__name__)
+
+# W3C WebDriver element reference key
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+
+
+class ActionSequence(object):
+    """
+    W3C Actions payload builder with a mouse pointer and a keyboard input source, every action taking a tick.
+
+    Pointer moves are relative to element's top-left corner, as selenese coordinate strings.
+    """
+    pointer_id = 'mouse'  # same input source ids as ActionChains, so input state is shared
+    keyboard_id = 'keyboard'
+
+    def __init__(self):
+        self.ticks = []  # (source, action, move) tuples, move being (element, x, y) of pointer moves
+
+    def move(self, element=None, x=None, y=None, size=None):
+        """
+        Add pointer move.
+
+        @param element: WebElement or None for viewport's top-left corner
+        @param x: horizontal offset from element's left border, or None for element center
+        @param y: vertical offset from element's top border, or None for element center
+        @param size: element size dictionary, required with offsets
+        @return: self
+        """
+        action = {'type': 'pointerMove', 'duration': 0, 'x': 0, 'y': 0, 'origin': 'viewport'}
+        if element is not None:
+            action['origin'] = {ELEMENT_KEY: original_element(element).id}
+            if x is not None:
+                # W3C offsets are relative to element's center
+                action['x'] = int(x - size['width'] / 2)
+                action['y'] = int(y - size['height'] / 2)
+        self.ticks.append(('pointer', action, (element, x, y)))
+        return self
+
+    def down(self, button=0):
+        """
+        @param button: mouse button, 0 (left), 1 (middle) or 2 (right)
+        @return: self
+        """
+        self.ticks.append(('pointer', {'type': 'pointerDown', 'button': button}, None))
+        return self
+
+    def up(self, button=0):
+        """
+        @param button: mouse button, 0 (left), 1 (middle) or 2 (right)
+        @return: self
+        """
+        self.ticks.append(('pointer', {'type': 'pointerUp', 'button': button}, None))
+        return self
+
+    def key_down(self, key):
+        """
+        @param key: key character, or `selenium.webdriver.common.keys.Keys` value
+        @return: self
+        """
+        self.ticks.append(('key', {'type': 'keyDown', 'value': key}, None))
+        return self
+
+    def key_up(self, key):
+        """
+        @param key: key character, or `selenium.webdriver.common.keys.Keys` value
+        @return: self
+        """
+        self.ticks.append(('key', {'type': 'keyUp', 'value': key}, None))
+        return self
+
+    def payload(self):
+        """
+        @return: W3C Actions command payload, with a pause on every tick an input source does nothing
+        """
+        sources = (
+            ('pointer', {'type': 'pointer', 'id': self.pointer_id, 'parameters': {'pointerType': 'mouse'}}),
+            ('key', {'type': 'key', 'id': self.keyboard_id}),
+            )
+        actions = []
+        for name, source in sources:
+            if any(source_name == name for source_name, _, _ in self.ticks):
+                source['actions'] = [
+                    action if source_name == name else {'type': 'pause', 'duration': 0}
+                    for source_name, action, _ in self.ticks
+                    ]
+                actions.append(source)
+        return {'actions': actions}
+
+    def __len__(self):
+        return len(self.ticks)
+
+
+class EventEngine(object):
+    """
+    Compiles and performs selenese events, see module documentation.
+    """
+    action_sequence_class = ActionSequence
+    # pointer action compilers by event name
+    pointer_events = {
+        'click': lambda sequence: sequence.down(0).up(0),
+        'dblclick': lambda sequence: sequence.down(0).up(0).down(0).up(0),
+        'contextmenu': lambda sequence: sequence.down(2).up(2),
+        'mouseover': lambda sequence: sequence,
+        'mousemove': lambda sequence: sequence,
+        'mouseout': lambda sequence: sequence.move(),
+        'mousedown': lambda sequence: sequence.down(0),
+        'mouseup': lambda sequence: sequence.up(0),
+        'mousedownright': lambda sequence: sequence.down(2),
+        'mouseupright': lambda sequence: sequence.up(2),
+        }
+    modifier_keys = {
+        'alt': Keys.ALT,
+        'control': Keys.CONTROL,
+        'shift': Keys.SHIFT,
+        'meta': Keys.META,
+        }
+
+    def __init__(self, driver, runtime, find_body):
+        """
+        @param driver: selenium WebDriver instance
+        @param runtime: SeleniumRuntime instance
+        @param find_body: callable returning current document body element, used by legacy fallback
+        """
+        self.driver = driver
+        self.runtime = runtime
+        self.find_body = find_body
+        self.modifiers = dict.fromkeys(self.modifier_keys, False)
+        self._bodies = {}  # body elements by frame, for current runtime generation
+        self._bodies_generation = None
+
+    @property
+    def w3c(self):
+        """ True if driver speaks W3C WebDriver protocol. """
+        return getattr(self.driver, 'w3c', False)
+
+    def body(self, element=None):
+        """
+        Get body element of given element's document, cached until the runtime is installed again (page generation).
+
+        @param element: element whose document is used, defaults to current document
+        @return: WebElement
+        """
+        if self._bodies_generation != self.runtime.generation:
+            self._bodies.clear()
+            self._bodies_generation = self.runtime.generation
+        frame = getattr(element, '_frame_element', None)
+        frame_id = frame.id if frame is not None else None
+        if frame_id not in self._bodies:
+            self._bodies[frame_id] = self.find_body()
+        return self._bodies[frame_id]
+
+    def compile(self, name, element, coords=None):
+        """
+        Compile pointer event into an action sequence, moving pointer to the element first.
+
+        @param name: event name, one of `pointer_events`
+        @param element: target WebElement
+        @param coords: optional (x, y) offset tuple from element's top-left corner
+        @return: ActionSequence instance
+        """
+        sequence = self.action_sequence_class()
+        if coords:
+            sequence.move(element, coords[0], coords[1], size=element.size)
+        else:
+            sequence.move(element)
+        return self.pointer_events[name](sequence)
+
+    def perform(self, sequence):
+        """
+        Perform action sequence, in a single request when driver speaks W3C protocol.
+
+        @param sequence: ActionSequence instance
+        """
+        if not sequence:
+            return
+        if self.w3c:
+            self.driver.execute(Command.W3C_ACTIONS, sequence.payload())
+            return
+        try:
+            self._legacy_chain(sequence).perform()
+        except StaleElementReferenceException:
+            self._bodies.clear()  # cached body may belong to a replaced document
+            self._legacy_chain(sequence).perform()
+
+    def _legacy_chain(self, sequence):
+        """
+        Translate action sequence to legacy ActionChains.
+
+        @param sequence: ActionSequence instance
+        @return: ActionChains instance
+        """
+        chain = ActionChains(self.driver)
+        target = next((move[0] for _, _, move in sequence.ticks if move and move[0] is not None), None)
+        for source, action, move in sequence.ticks:
+            kind = action['type']
+            if kind == 'pointerMove':
+                element, x, y = move
+                if element is None:
+                    chain.move_to_element_with_offset(self.body(target), -1, -1)
+                elif x is None:
+                    chain.move_to_element(element)
+                else:
+                    chain.move_to_element_with_offset(element, x, y)
+            elif kind == 'pointerDown':
+                if action['button'] == 2:
+                    chain.context_click()
+                else:
+                    chain.click_and_hold()
+            elif kind == 'pointerUp':
+                if action['button'] != 2:
+                    chain.release()
+            elif kind == 'keyDown':
+                chain.key_down(action['value'])
+            elif kind == 'keyUp':
+                chain.key_up(action['value'])
+        return chain
+
+    def dispatch(self, element, name):
+        """
+        Dispatch event in page (focus, blur or any other event name) in a single call.
+
+        @param element: target WebElement
+        @param name: event name
+        """
+        self.runtime.call('fireEvent', original_element(element), name, self.modifiers)
+
+    def key(self, element, name, key):
+        """
+        Dispatch keyboard event in page, with current modifier keys state.
+
+        @param element: target WebElement
+        @param name: event name, keydown, keyup or keypress
+        @param key: either a single character or a backslash followed by a numeric key code, ie. "w" or "\\119"
+        """
+        if key.startswith('\\') and key[1:].isdigit():
+            code = int(key[1:])
+            key = chr(code)
+        else:
+            code = ord(key[0]) if key else 0
+        self.runtime.call('keyEvent', original_element(element), name, key, code, self.modifiers)
+
+    def modifier(self, name, down):
+        """
+        Press or release modifier key, kept pressed for following events.
+
+        @param name: modifier name, one of `modifier_keys`
+        @param down: True to press, False to release
+        """
+        self.modifiers[name] = down
+        sequence = self.action_sequence_class()
+        if down:
+            sequence.key_down(self.modifier_keys[name])
+        else:
+            sequence.key_up(self.modifier_keys[name])
+        self.perform(sequence)
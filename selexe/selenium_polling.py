@@ -0,0 +1,105 @@
+"""
+Polling
+-------
+Deadline-based polling used by waiting commands (see `SeleniumDriver.retries`).
+
+Polling starts with a short interval which backs off up to the driver (or command) polling time, so conditions which
+are met almost immediately do not cost a whole polling interval, while long waits do not hammer the browser. The
+deadline is computed once using a monotonic clock, so slow probes cannot stretch the timeout.
+"""
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+
+class StepTiming(object):
+    """
+    Timing record of a selenese step, filled by `PollSchedule` instances while the step runs.
+    """
+    __slots__ = ('command', 'target', 'value', 'poll', 'waits', 'attempts', 'slept', 'elapsed')
+
+    def __init__(self, command, target=None, value=None, poll=None):
+        """
+        @param command: selenese command name
+        @param target: command target
+        @param value: command value
+        @param poll: polling hint of command in milliseconds, if any
+        """
+        self.command = command
+        self.target = target
+        self.value = value
+        self.poll = poll
+        self.waits = 0  # number of polling loops
+        self.attempts = 0  # number of probes among all polling loops
+        self.slept = 0.  # seconds spent sleeping between probes
+        self.elapsed = 0.  # seconds spent running the whole step
+
+    def __repr__(self):
+        return '<%s %s(%r, %r) attempts=%d slept=%.3fs elapsed=%.3fs>' % (
+            self.__class__.__name__, self.command, self.target, self.value, self.attempts, self.slept, self.elapsed)
+
+
+class PollSchedule(object):
+    """
+    Iterable yielding attempt numbers until deadline, sleeping with exponential backoff between attempts.
+
+    At least one attempt is always made, and the last one is made at the deadline itself, then TimeoutException is
+    raised.
+    """
+    clock = staticmethod(time.monotonic)
+    sleep = staticmethod(time.sleep)
+
+    def __init__(self, timeout, poll, initial=None, backoff=2., record=None, check=None, clock=None, sleep=None):
+        """
+        @param timeout: timeout in milliseconds
+        @param poll: maximum time between attempts in milliseconds
+        @param initial: time before second attempt in milliseconds, defaults to poll (no backoff)
+        @param backoff: multiplier applied to time between attempts after every attempt
+        @param record: optional StepTiming instance where attempts and sleeping time are accounted
+        @param check: optional callable called before every attempt, raising to abort polling (ie. error sentinels)
+        @param clock: monotonic clock function returning seconds, defaults to time.monotonic
+        @param sleep: sleep function taking seconds, defaults to time.sleep
+        """
+        self.timeout = timeout
+        self.poll = poll
+        self.initial = poll if initial is None else min(initial, poll)
+        self.backoff = backoff
+        self.record = record
+        self.check = check
+        if clock is not None:
+            self.clock = clock
+        if sleep is not None:
+            self.sleep = sleep
+        self.deadline = None
+
+    @property
+    def remaining(self):
+        """ Remaining time until deadline in milliseconds. """
+        if self.deadline is None:
+            return int(self.timeout)
+        return max(int((self.deadline - self.clock()) * 1000), 0)
+
+    def __iter__(self):
+        record = self.record
+        if record is not None:
+            record.waits += 1
+        self.deadline = self.clock() + self.timeout / 1000.
+        maximum = self.poll / 1000.
+        delay = self.initial / 1000.
+        attempt = 0
+        while True:
+            if self.check is not None:
+                self.check()
+            if record is not None:
+                record.attempts += 1
+            yield attempt
+            attempt += 1
+            remaining = self.deadline - self.clock()
+            if remaining <= 0:
+                break
+            delay = min(delay, remaining)
+            self.sleep(delay)
+            if record is not None:
+                record.slept += delay
+            delay = min(delay * self.backoff, maximum)
+        raise TimeoutException('Timed out after %d ms' % self.timeout)
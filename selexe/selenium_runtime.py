@@ -0,0 +1,501 @@
+"""
+In-page runtime
+---------------
+Javascript helpers used by selexe commands are injected once per document as a versioned `window.__selexe` object,
+so every later call only ships a tiny function invocation instead of a whole script.
+
+Page replacement (navigation, reload, new frames) is detected when calling: if `window.__selexe` is missing or has
+another version, the runtime is installed and the call performed in the same round trip.
+
+Optional features are enabled by runtime options (see `SeleniumRuntime`), applied on installation:
+
+- monitor: count pending XMLHttpRequest and fetch requests and connecting WebSockets, and track last DOM mutation time,
+  so `quiet` and `networkIdle` can tell when a page has settled. Only requests started after installation (on first
+  selexe call in the document) are counted as pending, requests started before are only seen when they finish,
+  through resource timing entries.
+- timewarp: replace page timers (setTimeout, setInterval, requestAnimationFrame timestamps, Date and performance.now)
+  with virtual-time aware ones, so `advance` can fast-forward page time, running due timers immediately. Timers keep
+  running in real time too. Only timers created after installation can be fast-forwarded.
+- noanimations: add a stylesheet zeroing CSS transition and animation durations and disabling smooth scrolling, and
+  turn off jQuery effects if present, so elements reach their final state (and visibility) as soon as it changes.
+"""
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_VERSION = '11'
+
+# Returned by CALL_SCRIPT when runtime must be (re)installed
+RUNTIME_MISSING = '__selexe_runtime_missing__'
+
+# Stylesheet added by noanimations runtime option
+NO_ANIMATIONS_STYLE = (
+    '*, *::before, *::after {'
+    ' transition-duration: 0s !important; transition-delay: 0s !important;'
+    ' animation-duration: 0s !important; animation-delay: 0s !important;'
+    ' scroll-behavior: auto !important;'
+    ' }'
+    )
+
+# Function expression taking runtime version and configuration object, installing window.__selexe
+RUNTIME_SCRIPT = (
+    'function (version, config) {'
+    '  function evalWithVars(storedVars, expression) {'
+    '    var document = undefined;'  # ensure consistent behavior with Selenium IDE
+    '    return eval(expression);'
+    '  }'
+    '  var selexe = {'
+    '    version: version,'
+    '    locators: {},'
+    '    storedVars: null,'
+    '    monitor: null,'
+    '    clock: null,'
+    '    addLocator: function (name, body) {'
+    '      this.locators[name] = new Function(\'locator\', \'inWindow\', \'inDocument\', body);'
+    '    },'
+    '    locate: function (name, locator) {'
+    '      var element = this.locators[name](locator, window, window.document);'
+    '      return element === undefined ? null : element;'
+    '    },'
+    '    dom: function (expression) {'
+    '      var element = eval(expression);'
+    '      return element === undefined ? null : element;'
+    '    },'
+    '    pageReady: function () {'
+    '      return document.readyState === \'complete\' && !document._deprecated_by_selexe;'
+    '    },'
+    '    installMonitor: function () {'
+    '      var monitor = this.monitor = {pending: 0, mutated: Date.now(), settled: 0, marked: 0, unloading: false},'
+    '          send, fetch, WebSocket, i;'
+    '      function started() {'
+    '        var done = false;'
+    '        monitor.pending++;'
+    '        return function () {'
+    '          if (!done && !--monitor.pending) monitor.settled = Date.now();'
+    '          done = true;'
+    '        };'
+    '      }'
+    '      if (window.XMLHttpRequest) {'
+    '        send = XMLHttpRequest.prototype.send;'
+    '        XMLHttpRequest.prototype.send = function () {'
+    '          var finished = started();'
+    '          this.addEventListener(\'loadend\', finished);'
+    '          try {'
+    '            return send.apply(this, arguments);'
+    '          } catch (e) {'
+    '            finished();'
+    '            throw e;'
+    '          }'
+    '        };'
+    '      }'
+    '      if (window.fetch) {'
+    '        fetch = window.fetch;'
+    '        window.fetch = function () {'
+    '          var finished = started();'
+    '          try {'
+    '            return fetch.apply(this, arguments).then('
+    '              function (r) { finished(); return r; }, function (e) { finished(); throw e; });'
+    '          } catch (e) {'
+    '            finished();'
+    '            throw e;'
+    '          }'
+    '        };'
+    '      }'
+    '      if (window.WebSocket) {'
+    '        WebSocket = window.WebSocket;'
+    '        window.WebSocket = function (url, protocols) {'
+    '          var socket = protocols === undefined ? new WebSocket(url) : new WebSocket(url, protocols),'
+    '              finished = started();'
+    '          socket.addEventListener(\'open\', finished);'
+    '          socket.addEventListener(\'close\', finished);'
+    '          return socket;'
+    '        };'
+    '        window.WebSocket.prototype = WebSocket.prototype;'
+    '        for (i in {CONNECTING: 0, OPEN: 1, CLOSING: 2, CLOSED: 3}) window.WebSocket[i] = WebSocket[i];'
+    '      }'
+    '      window.addEventListener(\'beforeunload\', function () { monitor.unloading = true; });'
+    '      if (window.MutationObserver && document.documentElement) {'
+    '        new MutationObserver(function () { monitor.mutated = Date.now(); }).observe('
+    '          document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});'
+    '      }'
+    '    },'
+    # True when page is loaded, with no pending requests and no DOM mutations in the last `period` milliseconds
+    '    quiet: function (period) {'
+    '      var monitor = this.monitor;'
+    '      if (!this.pageReady()) return false;'
+    '      return !monitor || (monitor.pending <= 0 && Date.now() - monitor.mutated >= period);'
+    '    },'
+    '    installTimeWarp: function () {'
+    '      var clock = this.clock = {offset: 0, timers: {}},'
+    '          setTimeout = window.setTimeout, setInterval = window.setInterval,'
+    '          clearTimeout = window.clearTimeout, clearInterval = window.clearInterval,'
+    '          requestAnimationFrame = window.requestAnimationFrame, RealDate = window.Date,'
+    '          perf = window.performance, perfNow = perf && perf.now ? perf.now.bind(perf) : null;'
+    '      function now() {'
+    '        return RealDate.now() + clock.offset;'
+    '      }'
+    '      function add(real, callback, delay, args, interval) {'
+    '        var timer = {'
+    '          callback: typeof callback === \'string\' ? new Function(callback) : callback,'
+    '          args: args,'
+    '          delay: Math.max(+delay || 0, 0),'
+    '          interval: interval'
+    '        };'
+    '        timer.due = now() + timer.delay;'
+    '        timer.id = real.call(window, function () { clock.run(timer.id, false); }, timer.delay);'
+    '        clock.timers[timer.id] = timer;'
+    '        return timer.id;'
+    '      }'
+    '      function remove(real) {'
+    '        return function (id) {'
+    '          delete clock.timers[id];'
+    '          return real.call(window, id);'
+    '        };'
+    '      }'
+    # Run timer if due, real timer firings are ignored for intervals fast-forwarded ahead of real time
+    '      clock.run = function (id, virtual) {'
+    '        var timer = clock.timers[id];'
+    '        if (!timer || (!virtual && timer.interval && timer.due > now())) return;'
+    '        if (timer.interval) timer.due += Math.max(timer.delay, 1);'
+    '        else {'
+    '          delete clock.timers[id];'
+    '          if (virtual) clearTimeout.call(window, id);'
+    '        }'
+    '        timer.callback.apply(window, timer.args);'
+    '      };'
+    '      window.setTimeout = function (callback, delay) {'
+    '        return add(setTimeout, callback, delay, [].slice.call(arguments, 2), false);'
+    '      };'
+    '      window.setInterval = function (callback, delay) {'
+    '        return add(setInterval, callback, delay, [].slice.call(arguments, 2), true);'
+    '      };'
+    '      window.clearTimeout = remove(clearTimeout);'
+    '      window.clearInterval = remove(clearInterval);'
+    '      if (requestAnimationFrame) {'
+    '        window.requestAnimationFrame = function (callback) {'
+    '          return requestAnimationFrame.call(window, function (timestamp) {'
+    '            callback(timestamp + clock.offset);'
+    '          });'
+    '        };'
+    '      }'
+    '      if (perfNow) {'
+    '        try {'
+    '          perf.now = function () { return perfNow() + clock.offset; };'
+    '        } catch (e) {}'
+    '      }'
+    '      window.Date = function (a, b, c, d, e, f, g) {'
+    '        if (!(this instanceof window.Date)) return new RealDate(now()).toString();'
+    '        switch (arguments.length) {'
+    '          case 0: return new RealDate(now());'
+    '          case 1: return new RealDate(a);'
+    '          default: return new RealDate(a, b, c === undefined ? 1 : c, d || 0, e || 0, f || 0, g || 0);'
+    '        }'
+    '      };'
+    '      window.Date.prototype = RealDate.prototype;'
+    '      window.Date.now = now;'
+    '      window.Date.UTC = RealDate.UTC;'
+    '      window.Date.parse = RealDate.parse;'
+    '    },'
+    '    disableAnimations: function (css) {'
+    '      var parent = document.head || document.documentElement, style;'
+    '      if (parent && !document.getElementById(\'__selexe_noanimations\')) {'
+    '        style = document.createElement(\'style\');'
+    '        style.id = \'__selexe_noanimations\';'
+    '        style.appendChild(document.createTextNode(css));'
+    '        parent.appendChild(style);'
+    '      }'
+    '      if (window.jQuery && window.jQuery.fx) window.jQuery.fx.off = true;'
+    '    },'
+    # Fast-forward page virtual time, running due timers in order, return number of timers run
+    '    advance: function (milliseconds) {'
+    '      var clock = this.clock, target, id, next, count = 0;'
+    '      if (!clock) return 0;'
+    '      target = Date.now() + milliseconds;'
+    '      while (count < 10000) {'
+    '        next = null;'
+    '        for (id in clock.timers) {'
+    '          if (clock.timers[id].due <= target && (next === null || clock.timers[id].due < next.due)) {'
+    '            next = clock.timers[id];'
+    '          }'
+    '        }'
+    '        if (next === null) break;'
+    '        clock.offset += Math.max(next.due - Date.now(), 0);'
+    '        clock.run(next.id, true);'
+    '        count++;'
+    '      }'
+    '      clock.offset += Math.max(target - Date.now(), 0);'
+    '      return count;'
+    '    },'
+    # Time of last finished resource request (ie. started before monitor installation), 0 if unknown
+    '    lastResponse: function () {'
+    '      var entries = window.performance && performance.getEntriesByType ?'
+    '          performance.getEntriesByType(\'resource\') : [], last = 0, i;'
+    '      for (i = 0; i < entries.length; i++) last = Math.max(last, entries[i].responseEnd);'
+    '      return last && (performance.timeOrigin || performance.timing.navigationStart) + last;'
+    '    },'
+    # True when page is loaded and not being left, with no pending requests in the last `period` milliseconds, nor
+    # since `deprecate` was called: unlike `pageReady`, a deprecated document becomes idle again, as single-page
+    # applications change pages without loading a new document, so deprecation is cleared once idle
+    '    networkIdle: function (period) {'
+    '      var monitor = this.monitor;'
+    '      if (!monitor) return this.pageReady();'
+    '      if (document.readyState !== \'complete\' || monitor.unloading || monitor.pending > 0) return false;'
+    '      if (Date.now() - Math.max(monitor.settled, monitor.marked, this.lastResponse()) < period) return false;'
+    '      document._deprecated_by_selexe = false;'
+    '      monitor.marked = 0;'
+    '      return true;'
+    '    },'
+    # Find element in current document by locator kind (css, id, name, xpath or dom) and value, or null
+    '    find: function (kind, value) {'
+    '      var element = null;'
+    '      if (kind === \'css\') element = document.querySelector(value);'
+    '      else if (kind === \'id\') element = document.getElementById(value);'
+    '      else if (kind === \'name\') element = document.getElementsByName(value)[0];'
+    '      else if (kind === \'xpath\') element = document.evaluate('
+    '        value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;'
+    '      else if (kind === \'dom\') element = eval(value);'
+    '      return element || null;'
+    '    },'
+    # Apply form fields in order, setting values and dispatching input and change events. Stops at the first field
+    # which must be handled natively (not found, hidden, disabled or matching nativeSelector), returning its index.
+    '    fillForm: function (fields, nativeSelector) {'
+    '      var i, j, field, element, option, descriptor;'
+    '      function fire(element, name) {'
+    '        var event = document.createEvent(\'HTMLEvents\');'
+    '        event.initEvent(name, true, false);'
+    '        element.dispatchEvent(event);'
+    '      }'
+    '      for (i = 0; i < fields.length; i++) {'
+    '        field = fields[i];'
+    '        try {'
+    '          element = this.find(field.kind, field.locator);'
+    '        } catch (e) {'
+    '          element = null;'
+    '        }'
+    '        if (!element || element.disabled || element.readOnly || !element.getClientRects().length ||'
+    '            (nativeSelector && element.matches && element.matches(nativeSelector))) return i;'
+    '        if (field.command === \'type\') {'
+    '          if (!(\'value\' in element)) return i;'
+    '          if (element.focus) element.focus();'
+    # use prototype setter, so frameworks tracking value property (ie. React) notice the change
+    '          descriptor = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(element), \'value\');'
+    '          if (descriptor && descriptor.set) descriptor.set.call(element, field.text);'
+    '          else element.value = field.text;'
+    '          fire(element, \'input\');'
+    '          fire(element, \'change\');'
+    '        } else if (field.command === \'select\') {'
+    '          if (!element.options) return i;'
+    '          if (element.querySelector(\'option[onclick]\')) continue;'  # left to following click, see select
+    '          option = null;'
+    '          for (j = 0; j < element.options.length && !option; j++) {'
+    '            if (field.option === \'label\' ?'
+    '                element.options[j].text.replace(/\\s+/g, \' \').trim() === field.text :'
+    '                field.option === \'index\' ? j === +field.text : element.options[j][field.option] === field.text)'
+    '              option = element.options[j];'
+    '          }'
+    '          if (!option) return i;'
+    '          option.selected = true;'
+    '          fire(element, \'input\');'
+    '          fire(element, \'change\');'
+    '        } else {'
+    '          if (typeof element.checked !== \'boolean\') return i;'
+    '          if (element.checked !== (field.command === \'check\')) element.click();'
+    '        }'
+    '      }'
+    '      return fields.length;'
+    '    },'
+    # Dispatch event, focus and blur ones through element methods so focus actually changes
+    '    fireEvent: function (element, name, modifiers) {'
+    '      var event;'
+    '      if (name === \'focus\' && element.focus) return element.focus();'
+    '      if (name === \'blur\' && element.blur) {'
+    '        if (element.focus && document.activeElement !== element) element.focus();'
+    '        return element.blur();'
+    '      }'
+    '      event = document.createEvent(\'HTMLEvents\');'
+    '      event.initEvent(name, true, true);'
+    '      event.altKey = modifiers.alt;'
+    '      event.ctrlKey = modifiers.control;'
+    '      event.shiftKey = modifiers.shift;'
+    '      event.metaKey = modifiers.meta;'
+    '      element.dispatchEvent(event);'
+    '    },'
+    '    keyEvent: function (element, name, key, code, modifiers) {'
+    '      var event, init = {'
+    '        key: key, bubbles: true, cancelable: true, altKey: modifiers.alt, ctrlKey: modifiers.control,'
+    '        shiftKey: modifiers.shift, metaKey: modifiers.meta'
+    '      };'
+    '      try {'
+    '        event = new KeyboardEvent(name, init);'
+    '      } catch (e) {'
+    '        event = document.createEvent(\'Events\');'
+    '        event.initEvent(name, true, true);'
+    '      }'
+    # legacy key code properties are read-only on KeyboardEvent, so they are defined on the instance
+    '      [\'keyCode\', \'which\', \'charCode\'].forEach(function (property) {'
+    '        var value = property === \'charCode\' && name !== \'keypress\' ? 0 : code;'
+    '        Object.defineProperty(event, property, {get: function () { return value; }});'
+    '      });'
+    '      if (element.focus && document.activeElement !== element) element.focus();'
+    '      return element.dispatchEvent(event);'
+    '    },'
+    '    checkSentinels: function (sentinels) {'
+    '      var i, kind, value, found;'
+    '      for (i = 0; i < sentinels.length; i++) {'
+    '        kind = sentinels[i][0];'
+    '        value = sentinels[i][1];'
+    '        try {'
+    '          if (kind === \'title\') found = new RegExp(value).test(document.title);'
+    '          else if (kind === \'js\') found = eval(value);'
+    '          else found = this.find(kind, value);'
+    '        } catch (e) {'
+    '          found = false;'
+    '        }'
+    '        if (found) return i;'
+    '      }'
+    '      return -1;'
+    '    },'
+    '    storage: function () {'
+    '      var result = {}, names = [\'localStorage\', \'sessionStorage\'], i, j, storage, items;'
+    '      for (i = 0; i < names.length; i++) {'
+    '        items = result[names[i]] = {};'
+    '        try {'
+    '          storage = window[names[i]];'
+    '          for (j = 0; j < storage.length; j++) items[storage.key(j)] = storage.getItem(storage.key(j));'
+    '        } catch (e) {}'  # storage not available, ie. about:blank or disabled
+    '      }'
+    '      return result;'
+    '    },'
+    '    restoreStorage: function (items) {'
+    '      var name, storage, key;'
+    '      for (name in items) {'
+    '        try {'
+    '          storage = window[name];'
+    '          storage.clear();'
+    '          for (key in items[name]) storage.setItem(key, items[name][key]);'
+    '        } catch (e) {}'
+    '      }'
+    '    },'
+    '    deprecate: function () {'
+    '      document._deprecated_by_selexe = true;'
+    '      if (this.monitor) this.monitor.marked = Date.now();'
+    '    },'
+    '    writeScript: function (content, where, id) {'
+    '      var parent = document.getElementsByTagName(where)[0] || document.documentElement,'
+    '          script = document.createElement(\'script\');'
+    '      script.type = \'text/javascript\';'
+    '      if (id) script.id = id;'
+    '      script.appendChild(document.createTextNode(content));'
+    '      parent.appendChild(script);'
+    '    },'
+    # Keeps a persistent storedVars object identified by a sync token. Only changed variables are received and
+    # returned (detected comparing JSON serializations), null is returned if page copy does not match the token.
+    '    evaluate: function (expression, token, newToken, changed, deleted, full) {'
+    '      var state = this.storedVars, key, json, i, r;'
+    '      if (full) state = this.storedVars = {token: null, values: {}, json: {}};'
+    '      else if (!state || state.token !== token) return null;'
+    '      for (key in changed) {'
+    '        state.values[key] = changed[key];'
+    '        state.json[key] = JSON.stringify(changed[key]);'
+    '      }'
+    '      for (i = 0; i < deleted.length; i++) {'
+    '        delete state.values[deleted[i]];'
+    '        delete state.json[deleted[i]];'
+    '      }'
+    '      state.token = newToken;'
+    '      r = evalWithVars(state.values, expression);'
+    '      changed = {};'
+    '      deleted = [];'
+    '      for (key in state.values) {'
+    '        json = JSON.stringify(state.values[key]);'
+    '        if (json !== state.json[key]) {'
+    '          state.json[key] = json;'
+    '          changed[key] = state.values[key];'
+    '        }'
+    '      }'
+    '      for (key in state.json) {'
+    '        if (!state.values.hasOwnProperty(key)) {'
+    '          delete state.json[key];'
+    '          deleted.push(key);'
+    '        }'
+    '      }'
+    # We need to care about Selenium IDE returning 'null' instead of 'undefined'.
+    '      return [\'\' + (r === undefined ? null : r), changed, deleted];'
+    '    }'
+    '  };'
+    '  for (var name in config.locators) selexe.addLocator(name, config.locators[name]);'
+    '  if (config.monitor) selexe.installMonitor();'
+    '  if (config.timewarp) selexe.installTimeWarp();'
+    '  if (config.noanimations) selexe.disableAnimations(config.noanimations);'
+    '  window.__selexe = selexe;'
+    '}'
+    )
+
+# Call runtime function, arguments: version, function name, function arguments
+CALL_SCRIPT = (
+    'var selexe = window.__selexe;'
+    'if (!selexe || selexe.version !== arguments[0]) return \'%s\';'
+    'return selexe[arguments[1]].apply(selexe, arguments[2]);'
+    ) % RUNTIME_MISSING
+
+# Install runtime and call function, arguments: version, function name, function arguments, configuration
+INSTALL_SCRIPT = (
+    '(%s)(arguments[0], arguments[3]);'
+    'var selexe = window.__selexe;'
+    'return selexe[arguments[1]].apply(selexe, arguments[2]);'
+    ) % RUNTIME_SCRIPT
+
+
+class SeleniumRuntime(object):
+    """
+    Caller of `window.__selexe` runtime functions, installing the runtime when needed.
+    """
+    version = RUNTIME_VERSION
+    call_script = CALL_SCRIPT
+    install_script = INSTALL_SCRIPT
+
+    def __init__(self, driver, locators=None, options=None):
+        """
+        @param driver: selenium WebDriver instance
+        @param locators: dictionary of custom location strategies (name and javascript function body) installed
+                         along with the runtime, kept as reference so later additions are honored
+        @param options: dictionary of optional runtime features (ie. {'monitor': True}), see module documentation
+        """
+        self.driver = driver
+        self.locators = {} if locators is None else locators
+        self.options = dict(options or ())
+        self.generation = 0  # number of installations, increasing on every new document
+
+    @property
+    def config(self):
+        """ Configuration object given to runtime on installation. """
+        config = dict(self.options, locators=self.locators)
+        if config.get('noanimations'):
+            config['noanimations'] = NO_ANIMATIONS_STYLE
+        return config
+
+    def call(self, name, *args):
+        """
+        Call runtime function on current document, installing runtime first if necessary.
+
+        @param name: runtime function name
+        @param args: function arguments, serializable by webdriver
+        @return: function result
+        """
+        result = self.driver.execute_script(self.call_script, self.version, name, list(args))
+        if result == RUNTIME_MISSING:
+            logger.debug('Installing selexe runtime')
+            self.generation += 1
+            result = self.driver.execute_script(self.install_script, self.version, name, list(args), self.config)
+        return result
+
+    def add_locator(self, name, body):
+        """
+        Register a custom location strategy, compiled once per document.
+
+        @param name: locator name
+        @param body: javascript function body, receiving locator, inWindow and inDocument arguments
+        """
+        self.locators[name] = body
+        self.call('addLocator', name, body)
@@ -0,0 +1,59 @@
+"""
+Error sentinels
+---------------
+Conditions telling the application under test is broken (ie. a 500 error page or a known error banner), checked
+while waiting, so waits fail immediately instead of polling until timeout.
+
+Sentinels are given as strings:
+    title=REGEX         document title matches javascript regular expression
+    js=EXPRESSION       javascript expression is truthy
+    LOCATOR             element locator (css=, id=, name=, xpath=, dom=, link= or identifier) finds an element
+"""
+import collections
+
+from selenium.common.exceptions import WebDriverException
+
+
+class SentinelTriggered(WebDriverException):
+    """Raised when an error sentinel condition is met while waiting"""
+    pass
+
+
+class ErrorSentinel(collections.namedtuple('ErrorSentinel', ('kind', 'value', 'spec'))):
+    """
+    Error sentinel condition, checked in the page by runtime's `checkSentinels` function.
+
+    kind: one of `kinds`
+    value: regular expression, javascript expression or locator value, depending on kind
+    spec: original sentinel string, used for reporting
+    """
+    __slots__ = ()
+    kinds = ('title', 'js')
+    locator_kinds = ('css', 'id', 'name', 'xpath', 'dom')
+
+    @classmethod
+    def from_spec(cls, spec, tag_and_value):
+        """
+        Parse sentinel string.
+
+        @param spec: sentinel string, see module documentation
+        @param tag_and_value: callable splitting element locators into locator kind and value, already translated to
+                              one of `locator_kinds`, ie. `SeleniumDriver._tag_and_value` partial
+        @return: ErrorSentinel instance
+        @raise ValueError: if sentinel cannot be checked
+        """
+        if isinstance(spec, cls):
+            return spec
+        kind, sep, value = spec.partition('=')
+        if sep and kind in cls.kinds:
+            return cls(kind, value, spec)
+        try:
+            kind, value = tag_and_value(spec)
+        except WebDriverException as e:
+            raise ValueError('Invalid error sentinel %r: %s' % (spec, e.msg))
+        if kind not in cls.locator_kinds:
+            raise ValueError('Invalid error sentinel %r: %r locators are not supported' % (spec, kind))
+        return cls(kind, value, spec)
+
+    def __str__(self):
+        return self.spec
@@ -9,11 +9,8 @@ import time
 import timeit
 import six
 
-from selenium import webdriver
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
-
 from .parse_sel import SeleniumParser
-from .selenium_driver import SeleniumDriver
+from .lazy_import import LazyImportMapping, lazyimport
 
 logger = logging.getLogger(__name__)
 
@@ -28,32 +25,110 @@ class SelexeRunner(object):
     Selenium file execution class
     """
     parser_class = SeleniumParser
-    driver_class = SeleniumDriver
-    webdriver_classes = {
-        'firefox': webdriver.Firefox,
-        'chrome': webdriver.Chrome,
-        'ie': webdriver.Ie,
-        'opera': webdriver.Opera,
-        'safari': webdriver.Safari,
-        'phantomjs': webdriver.PhantomJS,
-        'android': webdriver.Android,
-    }
+    browser_driver_class = lazyimport('selexe.selenium_driver.SeleniumDriver')
+    validator_class = lazyimport('selexe.selenese_check.SeleneseValidator')
+    proxy_class = lazyimport('selexe.proxy.LocalProxy')
+    # webdriver classes are imported on first use, as selenium.webdriver imports every browser module at once
+    webdriver_classes = LazyImportMapping({
+        'firefox': 'selenium.webdriver.Firefox',
+        'chrome': 'selenium.webdriver.Chrome',
+        'ie': 'selenium.webdriver.Ie',
+        'opera': 'selenium.webdriver.Opera',
+        'safari': 'selenium.webdriver.Safari',
+        'phantomjs': 'selenium.webdriver.PhantomJS',
+        'android': 'selenium.webdriver.Android',
+        'http': 'selexe.http_driver.HttpSession',
+        'static': 'selexe.static_driver.StaticSession',
+    })
+    # selenese drivers used instead of browser_driver_class for browserless webdrivers
+    driver_classes = LazyImportMapping({
+        'http': 'selexe.http_driver.HttpDriver',
+        'static': 'selexe.static_driver.StaticDriver',
+    })
     webdriver_useragents = {}
+    # browser tuning applied at launch by driver, arguments can use %(width)d and %(height)d window size variables,
+    # window_size tells arguments set window size, so no set_window_size call is needed after launch
+    launch_profiles = {
+        'fast-headless': {
+            'firefox': {
+                'arguments': ['-headless', '--width=%(width)d', '--height=%(height)d'],
+                'window_size': True,
+                'preferences': {
+                    'permissions.default.image': 2,  # do not load images
+                    'browser.display.use_document_fonts': 0,  # do not download web fonts
+                    'ui.prefersReducedMotion': 1,
+                    'toolkit.cosmeticAnimations.enabled': False,
+                    'browser.shell.checkDefaultBrowser': False,
+                    'browser.startup.homepage_override.mstone': 'ignore',
+                    'startup.homepage_welcome_url': 'about:blank',
+                    'datareporting.healthreport.uploadEnabled': False,
+                    'datareporting.policy.dataSubmissionEnabled': False,
+                    'toolkit.telemetry.enabled': False,
+                    'app.update.auto': False,
+                    'app.update.enabled': False,
+                    'extensions.update.enabled': False,
+                    'browser.safebrowsing.malware.enabled': False,
+                    'browser.safebrowsing.phishing.enabled': False,
+                    'network.prefetch-next': False,
+                    },
+                },
+            'chrome': {
+                'arguments': [
+                    '--headless', '--window-size=%(width)d,%(height)d', '--blink-settings=imagesEnabled=false',
+                    '--force-prefers-reduced-motion', '--no-first-run', '--no-default-browser-check',
+                    '--disable-extensions', '--disable-background-networking', '--disable-sync',
+                    '--disable-component-update', '--metrics-recording-only', '--disable-gpu',
+                    '--disable-dev-shm-usage', '--mute-audio',
+                    ],
+                'window_size': True,
+                'preferences': {
+                    'profile.managed_default_content_settings.images': 2,
+                    },
+                },
+            },
+        }
 
     def __init__(self, filename, baseuri=None, fixtures=None, pmd=False, timeit=False, driver='firefox',
                  window_size=(1280, 720), encoding='utf-8', timeout=30000, error_screenshot_dir=None, useragent=None,
-                 **options):
+                 http_timeout=None, check=True, error_sentinels=None, snapshot_cache=None, prefetcher=None,
+                 profile=None, block=None, proxy=None, cache=None, smart_pause=False, network_idle=False, time_warp=1,
+                 animations=True, fast_forms=False, native_input=None, **options):
         """
         @param filename: Selenium IDE file
         @param baseuri: base url for selenium tests
         @param fixtures: 2-tuple of callable fixtures or module path with global SetUp and tearDown functions
         @param pmd: launches pdb on fail if True, defaults to False
         @param timeit: logs time taken by every command on logging level INFO if True, defaults to False
-        @param driver: selenium driver as string, defaults to 'firefox'
+        @param driver: selenium driver as string, defaults to 'firefox', 'http' and 'static' run browserless (see
+                       `selexe.http_driver` and `selexe.static_driver`)
         @param window_size: desired window size as (width, height) tuple, defaults to None
         @param encoding: encoding will be used by Selenium IDE test parser
         @param timeout: maximum milliseconds will be waited for every command before failing, defaults to 30000 (30s)
         @param error_screenshot_dir: directory will be used to store screenshots when test fails
+        @param useragent: custom browser useragent
+        @param http_timeout: timeout in milliseconds for REST user functions, defaults to timeout
+        @param check: validate selenese file before launching the browser if True (default)
+        @param error_sentinels: iterable of error sentinel strings (ie. 'title=^500'), or dictionary of those by
+                                baseuri (None key for every baseuri), see `selexe.selenium_sentinel`
+        @param snapshot_cache: SnapshotCache instance, if given, session state after setUp fixture is cached and
+                               restored instead of calling setUp again, see `selexe.session_snapshot`
+        @param prefetcher: BrowserPrefetcher instance launching browsers ahead of demand, see `selexe.browser_pool`
+        @param profile: name of browser launch profile (see `launch_profiles`), ie. 'fast-headless'
+        @param block: iterable of url block list patterns (ie. '*.google-analytics.com'), or dictionary of those by
+                      baseuri (None key for every baseuri), served by a local proxy started for this runner
+        @param proxy: LocalProxy instance browsers will use, ie. shared between runners, see `selexe.proxy`
+        @param cache: AssetCache instance caching static assets in a local proxy started for this runner (unless
+                      proxy is given), see `selexe.asset_cache`
+        @param smart_pause: make pause commands wait until page is quiet instead of sleeping if True, defaults to False
+        @param network_idle: make page changes (`open`, `AndWait` commands...) also wait for network idle if True,
+                             defaults to False
+        @param time_warp: speed factor of page timers while waiting (on pause and between polls), 1 (default) for
+                          real time
+        @param animations: if False, CSS transitions, animations and smooth scrolling are disabled on every page,
+                           defaults to True
+        @param fast_forms: apply consecutive type, select, check and uncheck rows in a single script call if True,
+                           see `SeleniumDriver.fill_form`, defaults to False
+        @param native_input: CSS selector of form fields which must always get real keystrokes and clicks
         @param **options: extra keyword arguments will be forwarded directly to selenium driver
         """
         self.filename = filename
@@ -65,9 +140,29 @@ class SelexeRunner(object):
         self.useragent = useragent
 
         self.timeout = timeout
+        self.http_timeout = http_timeout
+        self.check = check
+        self.error_sentinels = error_sentinels
+        self.smart_pause = smart_pause
+        self.network_idle = network_idle
+        self.time_warp = time_warp
+        self.animations = animations
+        self.fast_forms = fast_forms
+        self.native_input = native_input
+        self.snapshot_cache = snapshot_cache
+        self.prefetcher = prefetcher
         self.encoding = encoding
         self.error_screenshot_dir = error_screenshot_dir
         self.window_size = window_size
+        if profile is not None and profile not in self.launch_profiles:
+            raise SelexeError('Unknown launch profile %r, available: %s' % (profile, ', '.join(self.launch_profiles)))
+        self.profile = profile
+        if isinstance(block, dict):
+            block = list(block.get(None, ())) + list(block.get(self.baseuri, ()))
+        self._own_proxy = proxy is None and bool(block or cache is not None)
+        self.proxy = self.proxy_class(block=block, cache=cache) if self._own_proxy else proxy
+        self.blocked_requests = None
+        self._cache_counters = (0, 0)  # asset cache hits and misses when run started
 
         self.options = self._default_options()
         self.options.update(options)
@@ -75,17 +170,126 @@ class SelexeRunner(object):
     def run(self):
         """Start execution of selenium tests (within setUp and tearDown wrappers)"""
         logger.info('Selexe working on file %s' % self.filename)
-        parser = self.parser_class.from_path(self.filename, encoding=self.encoding)
-        # Note: some RemoteWebDriver-based drivers accept an `timeout` parameter but it's *absolutely unused*
-        driver = self.webdriver_classes[self.webdriver](**self.options)
-        width, height = self.window_size
-        driver.set_window_size(width, height)
-        logger.info('baseURI: %s' % self.baseuri)
+        self.track_proxy()
         try:
-            sd = self.driver_class(driver, self.baseuri, self.timeout)
-            return self._wrapExecution(parser, sd)
+            parser = self.parser_class.from_path(self.filename, encoding=self.encoding)
+            if self.check:
+                self.validate(parser)
+        except Exception:  # noqa
+            if self.prefetcher is not None:
+                self.prefetcher.discard(self)
+            self.release_proxy()
+            raise
+        try:
+            driver = self.acquire_webdriver()  # proxy is released even if browser cannot be launched
+            logger.info('baseURI: %s' % self.baseuri)
+            try:
+                sd = self.create_driver(driver)
+                try:
+                    return self._wrapExecution(parser, sd)
+                finally:
+                    sd.close_connections()
+            finally:
+                driver.quit()
         finally:
-            driver.quit()
+            self.release_proxy()
+
+    def track_proxy(self):
+        """Remember asset cache counters when run starts, so `release_proxy` reports requests of this run only"""
+        if self.proxy is not None and self.proxy.cache is not None:
+            stats = self.proxy.cache.stats()
+            self._cache_counters = (stats['hits'], stats['misses'])
+
+    def release_proxy(self):
+        """Report requests blocked by proxy during this run, and close proxy if owned by this runner"""
+        if self.proxy is None:
+            return
+        self.blocked_requests = self.proxy.take_counts()
+        if self.blocked_requests:
+            logger.info('Blocked %d requests in %s (%s)' % (
+                sum(self.blocked_requests.values()), self.filename,
+                ', '.join('%s: %d' % item for item in self.blocked_requests.most_common())))
+        if self.proxy.cache is not None:
+            stats = self.proxy.cache.stats()
+            hits, misses = stats['hits'] - self._cache_counters[0], stats['misses'] - self._cache_counters[1]
+            if hits or misses:
+                logger.info('Asset cache: %d hits, %d misses (%.0f%% hit ratio) in %s, %d assets kept' % (
+                    hits, misses, hits * 100. / (hits + misses), self.filename, stats['entries']))
+        if self._own_proxy:
+            self.proxy.close()
+
+    def acquire_webdriver(self):
+        """
+        Get browser for this run, launched ahead by prefetcher if any.
+
+        @return: selenium WebDriver instance
+        """
+        if self.prefetcher is not None:
+            return self.prefetcher.acquire(self)
+        return self.launch_webdriver()
+
+    def launch_webdriver(self):
+        """
+        Start browser for current webdriver, options and window size.
+
+        @return: selenium WebDriver instance
+        """
+        if self.proxy is not None:
+            self.proxy.start()
+        # Note: some RemoteWebDriver-based drivers accept an `timeout` parameter but it's *absolutely unused*
+        driver = self.webdriver_classes[self.webdriver](**self.options)
+        if not self.launch_settings.get('window_size'):
+            width, height = self.window_size
+            driver.set_window_size(width, height)
+        return driver
+
+    @classmethod
+    def driver_class_for(cls, webdriver):
+        """
+        @param webdriver: webdriver name, ie. "firefox" or "http"
+        @return: selenese driver class running commands on given webdriver
+        """
+        if webdriver in cls.driver_classes:
+            return cls.driver_classes[webdriver]
+        return cls.browser_driver_class
+
+    @property
+    def driver_class(self):
+        """Selenese driver class for current webdriver, imported on first access"""
+        return self.driver_class_for(self.webdriver)
+
+    @property
+    def launch_settings(self):
+        """Settings of current launch profile for current webdriver, see `launch_profiles`"""
+        if self.profile is None:
+            return {}
+        return self.launch_profiles[self.profile].get(self.webdriver, {})
+
+    def create_driver(self, driver):
+        """
+        Create selenium driver (running selenese commands) for given webdriver.
+
+        @param driver: selenium WebDriver instance
+        @return: `driver_class` instance
+        """
+        return self.driver_class(driver, self.baseuri, self.timeout, http_timeout=self.http_timeout,
+                                 error_sentinels=self.error_sentinels, smart_pause=self.smart_pause,
+                                 network_idle=self.network_idle, time_warp=self.time_warp,
+                                 animations=self.animations, native_input=self.native_input)
+
+    def validate(self, parser):
+        """
+        Validate parsed selenese file without launching any browser, see `selexe.selenese_check`.
+
+        @param parser: selenese parser instance
+        @raise SelexeError: if any problem is found
+        """
+        from .selenese_check import format_problems
+        validator = self.validator_class(self.driver_class, baseuri=self.baseuri, encoding=self.encoding)
+        problems = validator.validate_parser(parser)
+        if problems:
+            path = parser.path or self.filename
+            raise SelexeError('Invalid selenese file %s:\n%s' % (path, format_problems(problems)))
 
     def _default_options(self):
         """
@@ -93,50 +297,69 @@ class SelexeRunner(object):
 
         @return: capabilities object
         """
-
         useragent = self.useragent or self.webdriver_useragents.get(self.webdriver)
+        if self.webdriver in self.driver_classes:
+            # browserless drivers do not need selenium at all
+            if self.proxy is not None:
+                logger.warning('Local proxy couldn\'t be set on %s driver.' % self.webdriver)
+            return {'useragent': useragent, 'timeout': self.timeout / 1000.}
+
+        from selenium import webdriver
+        from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+
+        settings = self.launch_settings
+        if self.profile and not settings:
+            logger.warning('Launch profile %r has no settings for %s driver.' % (self.profile, self.webdriver))
+        width, height = self.window_size
+        arguments = [argument % {'width': width, 'height': height} for argument in settings.get('arguments', ())]
+        preferences = dict(settings.get('preferences', {}))
+        if self.proxy is not None:
+            if self.webdriver == 'firefox':
+                preferences.update(self.proxy.firefox_preferences())
+            elif self.webdriver == 'chrome':
+                arguments.extend(self.proxy.chrome_arguments())
+            else:
+                logger.warning('Local proxy couldn\'t be set on %s driver.' % self.webdriver)
         options = {}
-        if useragent:
-            if self.webdriver == 'phantomjs':
-                capabilities = DesiredCapabilities.PHANTOMJS.copy()
-                capabilities['phantomjs.page.settings.userAgent'] = useragent
-                options['desired_capabilities'] = capabilities
-            elif self.webdriver == 'firefox':
-                profile = webdriver.FirefoxProfile()
+        if useragent and self.webdriver == 'phantomjs':
+            capabilities = DesiredCapabilities.PHANTOMJS.copy()
+            capabilities['phantomjs.page.settings.userAgent'] = useragent
+            options['desired_capabilities'] = capabilities
+        elif (useragent or preferences or arguments) and self.webdriver == 'firefox':
+            profile = webdriver.FirefoxProfile()
+            if useragent:
                 profile.set_preference('general.useragent.override', useragent)
-                options['firefox_profile'] = profile
-            elif self.webdriver == 'chrome':
-                chrome_options = webdriver.ChromeOptions()
+            for key, value in six.iteritems(preferences):
+                profile.set_preference(key, value)
+            options['firefox_profile'] = profile
+            if arguments:
+                firefox_options = webdriver.FirefoxOptions()
+                for argument in arguments:
+                    firefox_options.add_argument(argument)
+                options['options'] = firefox_options
+        elif (useragent or preferences or arguments) and self.webdriver == 'chrome':
+            chrome_options = webdriver.ChromeOptions()
+            if useragent:
                 chrome_options.add_argument('--user-agent=\'%s\'' % useragent.replace("'", "'\\''"))
-                options['chrome_options'] = chrome_options
-            else:
-                logger.exception('Custom useragent couldn\'t be set on %s driver.' % self.webdriver)
+            for argument in arguments:
+                chrome_options.add_argument(argument)
+            if preferences:
+                chrome_options.add_experimental_option('prefs', preferences)
+            options['chrome_options'] = chrome_options
+        elif useragent:
+            logger.exception('Custom useragent couldn\'t be set on %s driver.' % self.webdriver)
         return options
 
     def _wrapExecution(self, seleniumParser, sd):
         """Wrap execution of selenium tests in setUp and tearDown functions if available"""
         if self.setUpFunc:
-            logger.info("Calling setUp()")
-            self.setUpFunc(sd)
-            logger.info("setUp() finished")
-            # remove all verification errors possibly generated during setUpFunc()
-            sd.clean_verification_errors()
+            self._setUp(sd)
 
         try:
             return self._executeSelenium(seleniumParser, sd)
         except:  # noqa
-            if self.error_screenshot_dir:
-                path = os.path.join(self.error_screenshot_dir, time.strftime('%Y%m%d.%H%M%S.png'))
-                sd.save_screenshot(path)
-                logger.error('Screenshot saved to %s' % path)
-            if self.pmd:
-                tb = sys.exc_info()[2]
-                try:
-                    import ipdb as pdb
-                except ImportError:
-                    import pdb
-                pdb.post_mortem(tb)
-            else:
+            self._handleFailure(sd)
+            if not self.pmd:
                 raise
         finally:
             if self.tearDownFunc:
@@ -144,12 +367,74 @@ class SelexeRunner(object):
                 self.tearDownFunc(sd)
                 logger.info("tearDown() finished")
 
+    def _handleFailure(self, sd):
+        """Save screenshot of failed test if `error_screenshot_dir` is set, and debug current exception if `pmd`"""
+        if self.error_screenshot_dir:
+            path = os.path.join(self.error_screenshot_dir, time.strftime('%Y%m%d.%H%M%S.png'))
+            sd.save_screenshot(path)
+            logger.error('Screenshot saved to %s' % path)
+        if self.pmd:
+            tb = sys.exc_info()[2]
+            try:
+                import ipdb as pdb
+            except ImportError:
+                import pdb
+            pdb.post_mortem(tb)
+
+    @property
+    def snapshot_key(self):
+        """Key of session snapshots taken after setUp: setUp function, baseuri and webdriver names"""
+        fixture = '%s.%s' % (self.setUpFunc.__module__, getattr(self.setUpFunc, '__qualname__', self.setUpFunc))
+        return fixture, self.baseuri or '', self.webdriver
+
+    def _setUp(self, sd):
+        """Call setUp fixture, or restore session snapshot taken after a previous call if cached"""
+        snapshot = self.snapshot_cache.get(self.snapshot_key) if self.snapshot_cache is not None else None
+        if snapshot is not None:
+            logger.info("Restoring session snapshot taken after setUp() %d sec ago" % snapshot.age())
+            try:
+                sd.restore(snapshot)
+                return
+            except Exception:  # noqa
+                logger.exception('Session snapshot cannot be restored, calling setUp()')
+                self.snapshot_cache.discard(self.snapshot_key)
+        logger.info("Calling setUp()")
+        self.setUpFunc(sd)
+        logger.info("setUp() finished")
+        # remove all verification errors possibly generated during setUpFunc()
+        sd.clean_verification_errors()
+        if self.snapshot_cache is not None:
+            self.snapshot_cache.set(self.snapshot_key, sd.snapshot())
+
     def _executeSelenium(self, seleniumParser, sd):
         """Execute the actual selenium statements found in *sel file"""
-        for baseuri, command, target, value in seleniumParser:
+        try:
+            self._executeSteps(seleniumParser, sd)
+        finally:
+            if self.timeit:
+                for step in sd.slowest_steps(5):
+                    logger.info('Waited %f sec in %d polls for %s(%r, %r)' % (
+                        step.slept, step.attempts, step.command, step.target, step.value))
+            if sd.pause_saved:
+                logger.info('Smart pause saved %.1f sec in %s' % (sd.pause_saved / 1000., self.filename))
+        return sd.verification_errors
+
+    def _executeSteps(self, seleniumParser, sd):
+        """Execute selenium statements one by one, or consecutive form ones at once in fast form-fill mode"""
+        batches = self._batchSteps(seleniumParser, sd.form_commands if self.fast_forms else ())
+        for baseuri, rows in batches:
             if not self.baseuri and baseuri and baseuri != sd.baseuri:
                 logger.info("BaseURI: %s" % baseuri)
                 sd.baseuri = baseuri
+            if len(rows) > 1:
+                try:
+                    sd.fill_form(rows)
+                except:  # noqa
+                    logger.error('Form fill %s failed on \'%s\'.' % (
+                        ', '.join('%s(%r, %r)' % row for row in rows), sd.driver.current_url))
+                    raise
+                continue
+            (command, target, value), = rows
             try:
                 if self.timeit:
                     numsec = timeit.timeit(functools.partial(sd.execute, command, target, value), number=1)
@@ -159,7 +444,29 @@ class SelexeRunner(object):
             except:   # noqa
                 logger.error('Command %s(%r, %r) failed on \'%s\'.' % (command, target, value, sd.driver.current_url))
                 raise
-        return sd.verification_errors
+
+    @staticmethod
+    def _batchSteps(seleniumParser, commands=()):
+        """
+        Group consecutive selenium statements of given commands and baseuri.
+
+        @param seleniumParser: iterable of (baseuri, command, target, value) tuples
+        @param commands: commands to group
+        @yield (baseuri, rows) tuples, rows being lists of (command, target, value) tuples
+        """
+        batch = []
+        batch_baseuri = None
+        for baseuri, command, target, value in seleniumParser:
+            if batch and (command not in commands or baseuri != batch_baseuri):
+                yield batch_baseuri, batch
+                batch = []
+            if command in commands:
+                batch_baseuri = baseuri
+                batch.append((command, target, value))
+            else:
+                yield baseuri, [(command, target, value)]
+        if batch:
+            yield batch_baseuri, batch
 
     @staticmethod
     def findFixtureFunctions(modulePath=None):
@@ -0,0 +1,149 @@
+"""
+Session snapshots
+-----------------
+Browser session state (cookies, localStorage, sessionStorage, current url) and selexe stored variables captured after
+fixture setUp, so later runs can restore it instead of repeating slow setUp steps (ie. logging in through the UI).
+
+See `SeleniumDriver.snapshot`, `SeleniumDriver.restore` and `SelexeRunner` `snapshot_cache` parameter.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionSnapshot(object):
+    """
+    Captured browser session state.
+    """
+    __slots__ = ('url', 'cookies', 'local_storage', 'session_storage', 'stored_variables', 'created')
+    # cookie keys accepted by webdriver's add_cookie
+    cookie_keys = ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite')
+
+    def __init__(self, url, cookies=(), local_storage=None, session_storage=None, stored_variables=None,
+                 created=None):
+        """
+        @param url: current url when snapshot was taken
+        @param cookies: list of cookie dictionaries, as returned by webdriver's get_cookies
+        @param local_storage: dictionary of localStorage items
+        @param session_storage: dictionary of sessionStorage items
+        @param stored_variables: dictionary of selexe stored variables
+        @param created: creation unix time, defaults to current time
+        """
+        self.url = url
+        self.cookies = [
+            {key: cookie[key] for key in self.cookie_keys if cookie.get(key) is not None}
+            for cookie in cookies
+            ]
+        self.local_storage = dict(local_storage or ())
+        self.session_storage = dict(session_storage or ())
+        self.stored_variables = dict(stored_variables or ())
+        self.created = time.time() if created is None else created
+
+    def age(self, now=None):
+        """
+        @param now: current unix time, defaults to time.time()
+        @return: snapshot age in seconds
+        """
+        return (time.time() if now is None else now) - self.created
+
+    def to_dict(self):
+        """
+        @return: JSON-serializable dictionary
+        """
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        @param data: dictionary as returned by `to_dict`
+        @return: SessionSnapshot instance
+        """
+        return cls(**data)
+
+    def __repr__(self):
+        return '<%s %s with %d cookies>' % (self.__class__.__name__, self.url, len(self.cookies))
+
+
+class SnapshotCache(object):
+    """
+    Thread-safe cache of session snapshots with expiry, kept in memory and optionally in a directory (as JSON files),
+    so snapshots can be shared between processes and runs.
+
+    Keys are tuples of strings, ie. (fixtures module, baseuri, driver name).
+    """
+    def __init__(self, expiry=600, directory=None):
+        """
+        @param expiry: maximum snapshot age in seconds, None for no expiry
+        @param directory: optional directory where snapshots are stored
+        """
+        self.expiry = expiry
+        self.directory = directory
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        digest = hashlib.sha1(json.dumps(list(key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, 'selexe-snapshot-%s.json' % digest)
+
+    def _expired(self, snapshot):
+        return self.expiry is not None and snapshot.age() > self.expiry
+
+    def get(self, key):
+        """
+        Get snapshot for given key.
+
+        @param key: tuple of strings
+        @return: SessionSnapshot instance or None if not cached or expired
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is None and self.directory:
+            try:
+                with open(self._path(key)) as f:
+                    snapshot = SessionSnapshot.from_dict(json.load(f))
+            except (IOError, ValueError, TypeError):
+                snapshot = None
+        if snapshot is None or self._expired(snapshot):
+            return None
+        return snapshot
+
+    def set(self, key, snapshot):
+        """
+        Store snapshot for given key.
+
+        @param key: tuple of strings
+        @param snapshot: SessionSnapshot instance
+        """
+        with self._lock:
+            self._snapshots[key] = snapshot
+        if self.directory:
+            path = self._path(key)
+            tmp = '%s.%d.tmp' % (path, os.getpid())
+            try:
+                # snapshots hold session cookies and tokens, keep them private to current user
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                    json.dump(snapshot.to_dict(), f)
+                os.replace(tmp, path)
+            except (IOError, TypeError, ValueError) as e:
+                logger.warning('Session snapshot cannot be saved to %s: %s' % (path, e))
+
+    def discard(self, key):
+        """
+        Remove snapshot for given key, ie. when it cannot be restored anymore.
+
+        @param key: tuple of strings
+        """
+        with self._lock:
+            self._snapshots.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
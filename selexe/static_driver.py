@@ -0,0 +1,418 @@
+"""
+Static DOM driver
+-----------------
+Browserless selenese driver for server-rendered pages without JavaScript (ie. admin forms), running in milliseconds
+with no browser process.
+
+`StaticSession` extends `selexe.http_driver.HttpSession` with an in-process DOM of the current page, built by
+BeautifulSoup (with lxml parser if installed). `StaticDriver` runs form commands on it (`type`, `select`, `check`,
+`uncheck`), follows links and submits forms on `click`, `submit` and their `AndWait` variants, and verifies texts,
+values and attributes of elements found by css, xpath, id, name, identifier and link locators.
+
+Form fields keep typed values until next page load, as browsers do. XPath locators require lxml, any other feature
+only depends on BeautifulSoup. Commands needing JavaScript (ie. clicks on elements without link or form behaviour,
+`javascript:` links, events) are refused with a clear error.
+"""
+import logging
+import importlib.util
+from urllib.parse import urljoin, urlsplit, urlunsplit, urlencode
+
+from selenium.common.exceptions import NoSuchElementException, NoSuchAttributeException
+
+from .selenium_command import seleniumcommand, seleniumimperative, seleniummulticommand, NOT_PRESENT_EXCEPTIONS
+from .http_driver import HttpSession, HttpDriver
+
+
+logger = logging.getLogger(__name__)
+
+
+def import_lxml():
+    """
+    Import lxml.html, required by xpath locators.
+
+    :return: lxml.html module
+    :raises NotImplementedError: if lxml is not installed
+    """
+    try:
+        import lxml.html
+    except ImportError:
+        raise NotImplementedError('xpath locators require lxml on static driver, install it with "pip install lxml"')
+    return lxml.html
+
+
+class StaticSession(HttpSession):
+    """
+    HttpSession keeping a DOM of current page, see module documentation.
+    """
+    # lxml is faster and builds the same tree xpath locators are evaluated on
+    parser_features = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+    def __init__(self, *args, **kwargs):
+        super(StaticSession, self).__init__(*args, **kwargs)
+        self._document = None
+        self._tree = None
+
+    def navigate(self, method, url, body=None, headers=None):
+        response = super(StaticSession, self).navigate(method, url, body, headers)
+        self._document = self._tree = None
+        return response
+
+    @property
+    def document(self):
+        """ BeautifulSoup document of current page, built on first use and kept until next page load. """
+        if self._document is None:
+            import bs4 as beautifulsoup
+            self._document = beautifulsoup.BeautifulSoup(self.page_source, self.parser_features)
+        return self._document
+
+    def xpath(self, expression):
+        """ Find elements of current document matching given xpath expression, evaluated by lxml.
+
+        Page structure does not change until next page load, so elements are mapped back to `document` ones by their
+        position in tree.
+
+        :param expression: xpath expression
+        :return list of BeautifulSoup tags
+        :raises NotImplementedError: if lxml is not installed
+        """
+        html = import_lxml()
+        if self._tree is None:
+            self._tree = html.document_fromstring(str(self.document))
+        elements = []
+        for node in self._tree.xpath(expression):
+            if not isinstance(getattr(node, 'tag', None), str):
+                continue  # ie. attribute or text results
+            path = []
+            while node.getparent() is not None:
+                parent = node.getparent()
+                path.append([child for child in parent if isinstance(child.tag, str)].index(node))
+                node = parent
+            element = self.document.find(node.tag)
+            for index in reversed(path):
+                element = element.find_all(True, recursive=False)[index]
+            elements.append(element)
+        return elements
+
+
+class StaticDriver(HttpDriver):
+    """
+    Selenese driver running form, link and verification commands on a `StaticSession` DOM, see module documentation.
+    """
+    _target_locators = {
+        'identifier': None,
+        'id': None,
+        'name': None,
+        'xpath': None,
+        'link': None,
+        'css': None,
+    }
+    option_locators = ('id', 'label', 'value', 'index')
+    text_input_types = ('text', 'password', 'email', 'number', 'search', 'tel', 'url', 'date', 'datetime-local',
+                        'month', 'week', 'time', 'color', 'range', 'hidden')
+    submit_types = ('submit', 'image')
+    hidden_text_tags = ('script', 'style', 'template', 'noscript')  # elements whose text browsers do not show
+
+    def _find_all(self, target):
+        """ Find all elements matching an element locator, in document order for each locator kind.
+
+        :param target: an element locator
+        :return list of BeautifulSoup tags
+        """
+        document = self.driver.document
+        tag, value = self._tag_and_value(target, locators=self._target_locators, default='identifier')
+        if tag == 'identifier' and value.startswith('//'):
+            tag = 'xpath'
+        if tag == 'identifier':
+            return document.find_all(id=value) + document.find_all(attrs={'name': value})
+        if tag == 'id':
+            return document.find_all(id=value)
+        if tag == 'name':
+            return document.find_all(attrs={'name': value})
+        if tag == 'css':
+            return document.select(value)
+        if tag == 'link':
+            return [link for link in document.find_all('a') if self.matches(value, ' '.join(link.get_text().split()))]
+        return self.driver.xpath(value)
+
+    def _find_target(self, target):
+        """ Find first element matching an element locator.
+
+        :param target: an element locator
+        :return BeautifulSoup tag
+        :raises NoSuchElementException if no element matches
+        """
+        elements = self._find_all(target)
+        if not elements:
+            raise NoSuchElementException('Element with %r not found.' % target)
+        return elements[0]
+
+    def _text(self, element):
+        """ Get text of an element without contents of `hidden_text_tags`, whitespace collapsed as browsers render it.
+
+        :param element: BeautifulSoup tag
+        :return text
+        """
+        texts = []
+        for text in element.strings:
+            parent = text.parent
+            while parent is not element and parent.name not in self.hidden_text_tags:
+                parent = parent.parent
+            if parent is element:
+                texts.append(text)
+        return ' '.join(''.join(texts).split())
+
+    def _form(self, element):
+        """ Get form element belongs to, or None """
+        if element.get('form'):
+            return self.driver.document.find('form', id=element['form'])
+        return element.find_parent('form')
+
+    @staticmethod
+    def _checked(element):
+        return element.has_attr('checked')
+
+    def _set_checked(self, element, checked):
+        """ Check or uncheck checkbox or radio button, unchecking other radio buttons of its group """
+        if checked and element.get('type', '').lower() == 'radio' and element.get('name'):
+            scope = self._form(element) or self.driver.document
+            for radio in scope.find_all('input', attrs={'type': 'radio', 'name': element['name']}):
+                del radio['checked']
+        if checked:
+            element['checked'] = 'checked'
+        else:
+            del element['checked']
+
+    def _form_data(self, form, submitter=None):
+        """ Get successful controls of a form, as browsers submit them.
+
+        :param form: form element
+        :param submitter: submit button used, if any
+        :return list of (name, value) tuples
+        """
+        data = []
+        for element in form.find_all(['input', 'button', 'select', 'textarea']):
+            name = element.get('name')
+            if not name or element.has_attr('disabled'):
+                continue
+            kind = element.get('type', 'submit' if element.name == 'button' else 'text').lower()
+            if element.name == 'select':
+                options = element.find_all('option')
+                selected = [option for option in options if option.has_attr('selected')]
+                if not selected and options and not element.has_attr('multiple'):
+                    selected = options[:1]
+                data.extend((name, self._option_value(option)) for option in selected)
+            elif element.name == 'textarea':
+                data.append((name, element.get_text()))
+            elif kind in self.submit_types or element.name == 'button':
+                if element is not submitter:
+                    continue
+                if kind == 'image':
+                    data.extend([('%s.x' % name, '0'), ('%s.y' % name, '0')])
+                else:
+                    data.append((name, element.get('value', '')))
+            elif kind in ('checkbox', 'radio'):
+                if self._checked(element):
+                    data.append((name, element.get('value', 'on')))
+            elif kind == 'file':
+                logger.warning('File input %r cannot be submitted by static driver, it is sent empty' % name)
+            elif kind != 'reset':
+                data.append((name, element.get('value', '')))
+        return data
+
+    def _submit(self, form, submitter=None):
+        """ Submit form as browsers do, opening the response page.
+
+        :param form: form element
+        :param submitter: submit button used, if any
+        :raises NotImplementedError: for multipart forms
+        """
+        overrides = submitter if submitter is not None else {}  # submit buttons can override form attributes
+        method = (overrides.get('formmethod') or form.get('method') or 'get').lower()
+        action = urljoin(self.driver.current_url, overrides.get('formaction') or form.get('action') or '')
+        enctype = (overrides.get('formenctype') or form.get('enctype') or '').lower()
+        if enctype == 'multipart/form-data':
+            raise NotImplementedError('multipart forms cannot be submitted by static driver')
+        data = urlencode(self._form_data(form, submitter))
+        if method == 'post':
+            self.driver.navigate('POST', action, data, {'Content-Type': 'application/x-www-form-urlencoded'})
+        else:
+            self.driver.get(urlunsplit(urlsplit(action)._replace(query=data, fragment='')))
+
+    @staticmethod
+    def _option_value(option):
+        return option.get('value', ' '.join(option.get_text().split()))
+
+    @seleniumimperative
+    def click(self, target, value=None):  # noqa
+        """ Click onto a link, submit button, checkbox or radio button.
+
+        :param target: an element locator
+        :param value:  <not used>
+        :raises NotImplementedError: if element has no link nor form behaviour, as it would need JavaScript
+        """
+        element = self._find_target(target)
+        kind = element.get('type', 'submit' if element.name == 'button' else '').lower()
+        if element.name == 'a' and element.get('href') is not None:
+            href = element['href'].strip()
+            if href.lower().startswith('javascript:'):
+                raise NotImplementedError('Link %r requires JavaScript, not supported by static driver' % target)
+            if not href.startswith('#'):
+                self.driver.get(urljoin(self.driver.current_url, href))
+        elif element.name in ('input', 'button') and kind in self.submit_types:
+            form = self._form(element)
+            if form is not None:
+                self._submit(form, element)
+        elif element.name == 'input' and kind == 'checkbox':
+            self._set_checked(element, not self._checked(element))
+        elif element.name == 'input' and kind == 'radio':
+            self._set_checked(element, True)
+        elif element.name == 'option' and element.find_parent('select') is not None:
+            self._select_option(element.find_parent('select'), element)
+        else:
+            raise NotImplementedError('Clicking <%s> element %r requires JavaScript, not supported by static driver'
+                                      % (element.name, target))
+
+    @seleniumimperative
+    def submit(self, target, value=None):  # noqa
+        """ Submit a form, without submit button.
+
+        :param target: a form element locator
+        :param value:  <not used>
+        """
+        self._submit(self._find_target(target))
+
+    @seleniumcommand
+    def type(self, target, value):
+        """ Set the value of an input field or text area.
+
+        :param target: an element locator
+        :param value: the text to type
+        """
+        element = self._find_target(target)
+        if element.name == 'textarea':
+            element.string = value or ''
+        elif element.name == 'input' and element.get('type', 'text').lower() in self.text_input_types:
+            element['value'] = value or ''
+        else:
+            raise NotImplementedError('Typing into <%s> element %r is not supported by static driver'
+                                      % (element.name, target))
+
+    def _select_option(self, element, option):
+        """ Select option of select element, unselecting other ones unless it allows multiple selection """
+        if not element.has_attr('multiple'):
+            for other in element.find_all('option'):
+                del other['selected']
+        option['selected'] = 'selected'
+
+    @seleniumimperative
+    def select(self, target, value):
+        """ Select an option from a drop-down using an option locator, see `SeleniumDriver.select`.
+
+        :param target: an element locator identifying a drop-down menu
+        :param value: an option locator (a label by default) which points at an option of the select element
+        """
+        element = self._find_target(target)
+        options = element.find_all('option')
+        tag, pattern = self._tag_and_value(value, locators=self.option_locators, default='label')
+        if tag == 'index':
+            chosen = options[int(pattern)] if int(pattern) < len(options) else None
+        elif tag == 'id':
+            chosen = next((option for option in options if option.get('id') == pattern), None)
+        elif tag == 'value':
+            chosen = next((option for option in options if self.matches(pattern, self._option_value(option))), None)
+        else:
+            chosen = next((option for option in options
+                           if self.matches(pattern, ' '.join(option.get_text().split()))), None)
+        if chosen is None:
+            raise NoSuchElementException('Option with %r not found in %r.' % (value, target))
+        self._select_option(element, chosen)
+
+    @seleniumcommand
+    def check(self, target, value=None):  # noqa
+        """ Check a toggle-button (checkbox/radio).
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._set_checked(self._find_target(target), True)
+
+    @seleniumcommand
+    def uncheck(self, target, value=None):  # noqa
+        """ Uncheck a toggle-button (checkbox/radio).
+
+        :param target: an element locator
+        :param value: <not used>
+        """
+        self._set_checked(self._find_target(target), False)
+
+    @seleniummulticommand
+    def ElementPresent(self, target, value=None):  # noqa
+        """ Verify that the specified element is somewhere on the page.
+
+        :param target: an element locator
+        :param value: <not used>
+        :return true if the element is present, false otherwise
+        """
+        try:
+            self._find_target(target)
+            return True, True
+        except NOT_PRESENT_EXCEPTIONS:
+            return True, False
+
+    @seleniummulticommand
+    def Attribute(self, target, value):
+        """ Get the value of an element attribute.
+
+        :param target: an element locator followed by an @ sign and then the name of the attribute, e.g. "foo@bar"
+        :param value: the expected value of the specified attribute
+        :return the value of the specified attribute
+        """
+        target, sep, attr = target.rpartition('@')
+        attrValue = self._find_target(target).get(attr)
+        if attrValue is None:
+            raise NoSuchAttributeException(attr)
+        if isinstance(attrValue, list):  # ie. class
+            attrValue = ' '.join(attrValue)
+        return value, attrValue.strip()
+
+    @seleniummulticommand
+    def Text(self, target, value):
+        """ Get the text of an element, as server rendered it, whitespace collapsed as browsers render it.
+
+        :param target: an element locator
+        :param value: the expected text of the element
+        :return the text of the element
+        """
+        return value, self._text(self._find_target(target))
+
+    @seleniummulticommand
+    def Value(self, target, value):
+        """ Get the value of a form field, "on" or "off" for checkboxes and radio buttons.
+
+        :param target: an element locator
+        :param value: the expected element value
+        :return the element value
+        """
+        element = self._find_target(target)
+        if element.name == 'textarea':
+            result = element.get_text()
+        elif element.name == 'select':
+            options = element.find_all('option')
+            selected = [option for option in options if option.has_attr('selected')] or options[:1]
+            result = self._option_value(selected[0]) if selected else ''
+        elif element.get('type', '').lower() in ('checkbox', 'radio'):
+            result = 'on' if self._checked(element) else 'off'
+        else:
+            result = element.get('value', '')
+        return value, ' '.join(result.split())
+
+    @seleniummulticommand
+    def XpathCount(self, target, value):
+        """ Get the number of nodes that match the specified xpath, e.g. "//table" would give the number of tables.
+
+        :param target: an xpath expression to locate elements
+        :param value: the number of nodes that should match the specified xpath
+        :return the number of nodes that match the specified xpath
+        """
+        count = len(self.driver.xpath(target))
+        return (int(value) if value else count), count
@@ -0,0 +1,94 @@
+"""
+Stored variables
+----------------
+Selenese stored variables are shared between python (`${name}` expansion, store* commands) and javascript
+(`storedVars` in getEval, storeEval and so on).
+
+This module provides a dictionary which tracks which keys changed since last synchronization, so only those need to
+be sent to the browser instead of the whole dictionary on every eval.
+"""
+
+
+class StoredVariables(dict):
+    """
+    Dictionary of stored variables tracking keys changed or deleted since last `take_changes` call.
+    """
+    __slots__ = ('_changed', '_deleted')
+
+    def __init__(self, *args, **kwargs):
+        super(StoredVariables, self).__init__(*args, **kwargs)
+        self._changed = set(self)
+        self._deleted = set()
+
+    def __setitem__(self, key, value):
+        super(StoredVariables, self).__setitem__(key, value)
+        self._changed.add(key)
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        super(StoredVariables, self).__delitem__(key)
+        self._changed.discard(key)
+        self._deleted.add(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super(StoredVariables, self).pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        key, value = super(StoredVariables, self).popitem()
+        self._changed.discard(key)
+        self._deleted.add(key)
+        return key, value
+
+    def clear(self):
+        self._deleted.update(self)
+        self._changed.clear()
+        super(StoredVariables, self).clear()
+
+    def copy(self):
+        return self.__class__(self)
+
+    def take_changes(self):
+        """
+        Get changes since last call and reset tracking.
+
+        @return: tuple with dictionary of changed variables and list of deleted variable names
+        """
+        changed = {key: self[key] for key in self._changed}
+        deleted = list(self._deleted)
+        self._changed = set()
+        self._deleted = set()
+        return changed, deleted
+
+    def mark_changed(self):
+        """Mark all variables as changed, so next `take_changes` returns all of them."""
+        self._changed = set(self)
+        self._deleted = set()
+
+    def apply_changes(self, changed, deleted):
+        """
+        Apply changes coming from the other side of synchronization, without tracking them.
+
+        @param changed: dictionary of changed variables
+        @param deleted: iterable of deleted variable names
+        """
+        for key, value in changed.items():
+            super(StoredVariables, self).__setitem__(key, value)
+            self._changed.discard(key)
+        for key in deleted:
+            if key in self:
+                super(StoredVariables, self).__delitem__(key)
+            self._changed.discard(key)
+            self._deleted.discard(key)
@@ -1,12 +1,21 @@
+import os
 import json
-import http.client
 from selenium.webdriver.common.action_chains import ActionChains
 
+JSON_HEADERS = {"Content-type": 'application/json'}
 
-def _connect(url):
-    url = url[7:] if url.startswith('http://') else url
-    connection = http.client.HTTPConnection(url)
-    return connection
+
+def _request(self, method, target, value=None, headers=None):
+    """ Send a REST request over the keep-alive connection pool of given SeleniumDriver.
+
+    :param self: SeleniumDriver instance
+    :param method: HTTP method
+    :param target: url, relative to driver's baseuri if not absolute
+    :param value: optional request body
+    :param headers: optional request headers
+    :return: selexe.connection_pool.Response
+    """
+    return self.connection_pool.request(method, target, value, headers, baseuri=self.baseuri)
 
 
 def putRest(self, target, value):
@@ -17,17 +26,11 @@ def putRest(self, target, value):
             contentType: 'application/json', async: false, type: 'put'});
     };
     """
-    connection = _connect(self.baseuri)
-    headers = {"Content-type": 'application/json'}
-    connection.request('PUT', target, value, headers)
-    assert connection.getresponse().status == 200
+    assert _request(self, 'PUT', target, value, JSON_HEADERS).status == 200
 
 
 def postRest(self, target, value):
-    connection = _connect(self.baseuri)
-    headers = {"Content-type": 'application/json'}
-    connection.request('POST', target, value, headers)
-    assert connection.getresponse().status == 200
+    assert _request(self, 'POST', target, value, JSON_HEADERS).status == 200
 
 
 def deleteRest(self, target, _value):
@@ -37,9 +40,7 @@ def deleteRest(self, target, _value):
         type: 'delete'});
     };
     """
-    connection = _connect(self.baseuri)
-    connection.request('DELETE', target)
-    assert connection.getresponse().status == 200
+    assert _request(self, 'DELETE', target).status == 200
 
 
 def assertGetRest(self, target, value):
@@ -57,17 +58,48 @@ def assertGetRest(self, target, value):
         };
     };
     """
-    connection = _connect(self.baseuri)
-    connection.request('GET', target)
-    response = connection.getresponse()
+    response = _request(self, 'GET', target)
     assert response.status == 200
     # do a strip because a json value is returned in a list if it is requested with parameters
-    data = json.loads(response.read().strip('[]'))
+    data = json.loads(response.data.decode('utf-8').strip().strip('[]'))
     expectedData = json.loads(value)
     for key in expectedData:
         if data[key] != expectedData[key]:
             raise AssertionError("%s: actual value %s does not match expected value %s"
-                                 % key, data[key], expectedData[key])
+                                 % (key, data[key], expectedData[key]))
+
+
+def batchRest(self, target, value=None):
+    """ Send many REST fixtures concurrently over the connection pool, useful for loading setup data in parallel.
+
+    Fixtures are given as a JSON list of objects with "method", "url", and optional "data" and "status" (expected
+    response status, defaults to 200) keys, e.g.
+
+        [{"method": "PUT", "url": "/api/user/1", "data": {"name": "joe"}}, {"method": "DELETE", "url": "/api/user/2"}]
+
+    :param target: JSON list of fixtures, or path of a file containing it
+    :param value: maximum number of concurrent requests, defaults to connection pool size
+    :raises AssertionError: if any response status does not match the expected one
+    """
+    if target.lstrip().startswith('['):
+        fixtures = json.loads(target)
+    else:
+        with open(os.path.expanduser(target)) as fp:
+            fixtures = json.load(fp)
+
+    requests = []
+    for fixture in fixtures:
+        data = fixture.get('data')
+        if data is not None and not isinstance(data, str):
+            data = json.dumps(data)
+        requests.append((fixture['method'].upper(), fixture['url'], data, JSON_HEADERS if data is not None else None))
+
+    responses = self.connection_pool.batch(requests, baseuri=self.baseuri, max_workers=int(value) if value else None)
+    failed = ['%s %s: status %d' % (method, url, response.status)
+              for fixture, (method, url, _, _), response in zip(fixtures, requests, responses)
+              if response.status != fixture.get('status', 200)]
+    if failed:
+        raise AssertionError('REST fixtures failed: %s' % ', '.join(failed))
 
 
 def assertTextContainedInEachElement(self, target, value):
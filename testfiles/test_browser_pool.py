@@ -0,0 +1,62 @@
+"""
+UT module to test browser prefetching
+"""
+import sys
+import time
+import threading
+
+sys.path.insert(0, '..')
+
+from selexe.browser_pool import BrowserPrefetcher  # noqa
+
+
+class FakeBrowser(object):
+    def __init__(self, runner):
+        self.runner = runner
+        self.quitted = False
+
+    def quit(self):
+        self.quitted = True
+
+
+class FakeRunner(object):
+    webdriver = 'fake'
+    launches = []
+    lock = threading.Lock()
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def launch_webdriver(self):
+        time.sleep(0.05)
+        with self.lock:
+            self.launches.append(self.filename)
+        self.browser = FakeBrowser(self)
+        return self.browser
+
+
+def test_prefetch():
+    FakeRunner.launches = []
+    runners = [FakeRunner('%d.sel' % i) for i in range(4)]
+    prefetcher = BrowserPrefetcher(size=2)
+    prefetcher.schedule(runners)
+    with prefetcher:
+        browser = prefetcher.acquire(runners[0])
+        assert browser.runner is runners[0]
+        time.sleep(0.2)
+        assert sorted(FakeRunner.launches) == ['0.sel', '1.sel', '2.sel']  # two ahead of demand
+        assert prefetcher.acquire(runners[1]).runner is runners[1]
+    # browsers launched ahead but never acquired are quitted
+    assert runners[2].browser.quitted
+    assert not runners[1].browser.quitted
+
+
+def test_discard():
+    FakeRunner.launches = []
+    runners = [FakeRunner('%d.sel' % i) for i in range(3)]
+    prefetcher = BrowserPrefetcher(size=1)
+    prefetcher.schedule(runners)
+    with prefetcher:
+        prefetcher.acquire(runners[0])
+        prefetcher.discard(runners[1])
+        assert prefetcher.acquire(runners[2]).runner is runners[2]
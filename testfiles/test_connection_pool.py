@@ -0,0 +1,114 @@
+"""
+UT module to test the keep-alive connection pool used by REST user functions
+"""
+import sys
+import select
+import threading
+import pytest
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, '..')
+
+from selexe.connection_pool import ConnectionPool  # noqa
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    peers = set()
+    dropped = []
+
+    def do_GET(self):  # noqa
+        self.peers.add(self.client_address)
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.startswith('/drop'):
+            self.dropped.append(self.command)  # close connection without answering, as a stale one
+            self.close_connection = True
+            return
+        body = data if self.path == '/echo' else self.path.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.close_connection = self.path.startswith('/close')  # without telling client
+
+    do_PUT = do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    KeepAliveHandler.peers.clear()
+    del KeepAliveHandler.dropped[:]
+    httpd = ThreadingHTTPServer(('localhost', 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://localhost:%d' % httpd.server_port
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_split_url():
+    assert ConnectionPool.split_url('/api/x?y=1', 'http://localhost:8000') == (('http', 'localhost', 8000), '/api/x?y=1')
+    assert ConnectionPool.split_url('https://example.com') == (('https', 'example.com', 443), '/')
+    assert ConnectionPool.split_url('api', 'localhost:8000/') == (('http', 'localhost', 8000), '/api')
+    with pytest.raises(RuntimeError):
+        ConnectionPool.split_url('/api')
+
+
+def test_keepalive(server):
+    pool = ConnectionPool(timeout=5)
+    for i in range(5):
+        response = pool.request('GET', '/item/%d' % i, baseuri=server)
+        assert response.status == 200
+        assert response.data == ('/item/%d' % i).encode('utf-8')
+    pool.close()
+    assert len(KeepAliveHandler.peers) == 1
+
+
+def test_batch(server):
+    pool = ConnectionPool(timeout=5, maxsize=4)
+    requests = [('PUT', '/item/%d' % i, '{}') for i in range(20)]
+    responses = pool.batch(requests, baseuri=server)
+    assert [response.data for response in responses] == [('/item/%d' % i).encode('utf-8') for i in range(20)]
+    pool.close()
+    assert len(KeepAliveHandler.peers) <= 4
+
+
+def test_closed_idle_connection(server):
+    pool = ConnectionPool(timeout=5)
+    pool.request('GET', '/close', baseuri=server)
+    connection, = pool._idle[pool.split_url(server)[0]]
+    select.select([connection.sock], [], [], 5)  # wait for server to close it
+    response = pool.request('POST', '/item/2', '{}', baseuri=server)
+    assert response.data == b'/item/2'
+    pool.close()
+
+
+def test_stale_retry(server):
+    pool = ConnectionPool(timeout=5)
+    pool.request('GET', '/item/1', baseuri=server)
+    with pytest.raises(Exception):
+        pool.request('GET', '/drop', baseuri=server)
+    assert KeepAliveHandler.dropped == ['GET', 'GET']  # retried once only
+
+    del KeepAliveHandler.dropped[:]
+    pool.request('GET', '/item/1', baseuri=server)
+    with pytest.raises(Exception):
+        pool.request('POST', '/drop', '{}', baseuri=server)
+    assert KeepAliveHandler.dropped == ['POST']  # never replayed
+    pool.close()
+
+
+def test_unicode_body(server):
+    pool = ConnectionPool(timeout=5)
+    body = '{"name": "Zoë Ångström ✓"}'
+    for headers in ({'Content-Type': 'application/json'}, [('Content-Type', 'application/json')]):
+        response = pool.request('POST', '/echo', body=body, headers=headers, baseuri=server)
+        assert response.data.decode('utf-8') == body
+    pool.close()
@@ -0,0 +1,88 @@
+"""
+UT module to test data-driven execution, without any browser
+"""
+import sys
+import json
+import pytest
+
+sys.path.insert(0, '..')
+
+from selexe import SelexeError  # noqa
+from selexe.data_driven import DataDrivenRunner, load_data  # noqa
+from selexe.parse_sel import SeleniumParser  # noqa
+
+
+class FakeBrowser(object):
+    def __init__(self):
+        self.quitted = False
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quitted = True
+
+
+class FakeDriver(object):
+    def __init__(self, browser):
+        self.browser = browser
+        self.storedVariables = {}
+
+    def close_connections(self):
+        pass
+
+
+class CountingParser(SeleniumParser):
+    parsed = 0
+
+    @classmethod
+    def from_path(cls, path, encoding='utf-8'):
+        CountingParser.parsed += 1
+        return super(CountingParser, cls).from_path(path, encoding=encoding)
+
+
+class FakeRunner(DataDrivenRunner):
+    parser_class = CountingParser
+
+    def __init__(self, *args, **kwargs):
+        super(FakeRunner, self).__init__(*args, **kwargs)
+        self.browsers = []
+
+    def launch_webdriver(self):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    def create_driver(self, driver):
+        return FakeDriver(driver)
+
+    def _wrapExecution(self, rows, sd):
+        if sd.storedVariables['user'] == 'carol':
+            raise SelexeError('carol cannot log in')
+        return [] if sd.storedVariables['user'] != 'bob' else ['bob failed']
+
+
+def test_load_data(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('user,sku\nalice,1\nbob,2\n')
+    assert load_data(str(path)) == [{'user': 'alice', 'sku': '1'}, {'user': 'bob', 'sku': '2'}]
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps([{'user': 'alice', 'sku': 1, 'price': 2.5, 'member': True, 'coupon': None}]))
+    assert load_data(str(path)) == [{'user': 'alice', 'sku': '1', 'price': '2.5', 'member': 'true', 'coupon': 'null'}]
+    path.write_text('{"user": "alice"}')
+    with pytest.raises(SelexeError):
+        load_data(str(path))
+
+
+def test_rows_run_in_parallel():
+    data = [{'user': user} for user in ('alice', 'bob', 'carol', 'dave', 'erin')]
+    runner = FakeRunner('form1.sel', data=data, workers=2, check=False)
+    CountingParser.parsed = 0
+    results = runner.run()
+    assert CountingParser.parsed == 1
+    assert list(results) == runner.labels
+    assert results['form1.sel [row 2]'] == ['bob failed']
+    assert results['form1.sel [row 3]'] == 'Running form1.sel [row 3] failed with carol cannot log in\n'
+    assert sum(1 for errors in results.values() if errors) == 2
+    assert 1 <= len(runner.browsers) <= 2
+    assert all(browser.quitted for browser in runner.browsers)
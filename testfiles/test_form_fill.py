@@ -0,0 +1,28 @@
+"""
+UT module to test fast form-fill row batching
+"""
+import sys
+
+sys.path.insert(0, '..')
+
+from selexe.selexe_runner import SelexeRunner  # noqa
+from selexe.selenium_driver import SeleniumDriver  # noqa
+
+
+def test_batch_steps():
+    rows = [
+        ('http://a', 'open', '/', ''),
+        ('http://a', 'type', 'id=name', 'John'),
+        ('http://a', 'select', 'id=country', 'Spain'),
+        ('http://a', 'check', 'id=terms', ''),
+        ('http://b', 'type', 'id=name', 'Jane'),
+        ('http://b', 'clickAndWait', 'id=submit', ''),
+        ]
+    batches = list(SelexeRunner._batchSteps(rows, SeleniumDriver.form_commands))
+    assert batches == [
+        ('http://a', [('open', '/', '')]),
+        ('http://a', [('type', 'id=name', 'John'), ('select', 'id=country', 'Spain'), ('check', 'id=terms', '')]),
+        ('http://b', [('type', 'id=name', 'Jane')]),
+        ('http://b', [('clickAndWait', 'id=submit', '')]),
+        ]
+    assert all(len(rows) == 1 for _, rows in SelexeRunner._batchSteps(rows))
@@ -0,0 +1,123 @@
+"""
+UT module to test the browserless HTTP driver against a local server
+"""
+import sys
+import json
+import threading
+import pytest
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, '..')
+
+from selexe.http_driver import HttpDriver, HttpSession, PageParser  # noqa
+from selexe.selenese_check import SeleneseValidator  # noqa
+from selexe.selexe_runner import SelexeRunner  # noqa
+
+PAGE = '''<html><head><title> Welcome
+ page </title><script>var hidden = "Secret";</script></head>
+<body><h1>Hello &amp; welcome, <b>%s</b></h1><noscript>Enable JavaScript</noscript><p>Visible text</p></body></html>'''
+
+
+class AppHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    posted = []
+
+    def _send(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # noqa
+        if self.path == '/login':
+            self._send(302, headers=[('Location', '/home'), ('Set-Cookie', 'user=joe; Path=/')])
+        elif self.path == '/home':
+            cookie = self.headers.get('Cookie', '')
+            user = cookie.split('=', 1)[1] if cookie.startswith('user=') else 'anonymous'
+            self._send(200, (PAGE % user).encode('utf-8'), [('Content-Type', 'text/html; charset=utf-8')])
+        elif self.path == '/api/user':
+            self._send(200, b'{"name": "joe", "admin": false}', [('Content-Type', 'application/json')])
+        else:
+            self._send(404)
+
+    def do_POST(self):  # noqa
+        self.posted.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+        self._send(200)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), AppHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:%d' % httpd.server_port
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def driver(server):
+    session = HttpSession(timeout=5)
+    try:
+        yield HttpDriver(session, server, timeout=5000)
+    finally:
+        session.quit()
+
+
+def test_page_parser():
+    page = PageParser.parse(PAGE % 'joe')
+    assert page.title == 'Welcome page'
+    assert page.texts == ['Hello & welcome, ', 'joe', 'Visible text']
+    page = PageParser.parse('<body><p>Hello <b>joe</b>,\n   <i>welcome</i></p><p>Bye</p><script>x</script></body>')
+    assert page.text == 'Hello joe, welcome Bye'
+
+
+def test_navigation(driver):
+    driver.execute('open', '/login')
+    assert driver.driver.current_url.endswith('/home')
+    assert driver.execute('verifyTitle', 'Welcome page')
+    assert driver.execute('verifyLocation', '*/home')
+    assert driver.execute('verifyTextPresent', 'welcome, joe')
+    assert not driver.execute('verifyTextPresent', 'Secret')
+    assert not driver.execute('verifyTextPresent', 'Enable JavaScript')
+    driver.execute('assertTextNotPresent', 'anonymous')
+    assert len(driver.verification_errors) == 2
+    driver.driver.delete_all_cookies()
+    driver.execute('open', '/home')
+    driver.execute('waitForTextPresent', 'anonymous')
+    with pytest.raises(Exception):
+        driver.execute('waitForTextPresent', 'joe')
+
+
+def test_rest(driver):
+    driver.storedVariables['name'] = 'joe'
+    driver.execute('postRest', '/api/user', '{"name": "${name}"}')
+    assert AppHandler.posted[-1] == {'name': 'joe'}
+    driver.execute('assertGetRest', '/api/user', '{"name": "joe"}')
+    with pytest.raises(AssertionError):
+        driver.execute('assertGetRest', '/api/user', '{"admin": true}')
+
+
+def test_browser_commands(driver):
+    assert 'postRest' in HttpDriver.commands and 'verifyValidation' not in HttpDriver.commands
+    with pytest.raises(NotImplementedError, match='requires a browser'):
+        driver.execute('click', 'id=submit')
+    rows = [('http://localhost', 'open', '/', ''), ('http://localhost', 'clickAndWait', 'id=submit', '')]
+    problems = SeleneseValidator(HttpDriver).validate_rows('test.sel', rows)
+    assert [problem.row for problem in problems] == [2]
+    assert problems[0].message.startswith('requires a browser')
+
+
+def test_runner():
+    runner = SelexeRunner('verifyTests.sel', driver='http', check=False)
+    assert runner.driver_class is HttpDriver
+    assert runner.options == {'useragent': None, 'timeout': 30.}
@@ -0,0 +1,29 @@
+"""
+UT module checking that selexe startup does not import heavy modules, see benchmarks/import_time.py
+"""
+import sys
+import subprocess
+
+HEAVY_MODULES = ('selenium.webdriver', 'bs4', 'pkg_resources', 'html.entities')
+
+
+def imported_modules(code):
+    output = subprocess.check_output((sys.executable, '-c', '%s; import sys; print("\\n".join(sys.modules))' % code),
+                                     cwd='..')
+    return set(output.decode('utf-8').split())
+
+
+def test_cli_startup_is_lazy():
+    modules = imported_modules('import selexe.__main__; selexe.__main__.SelexeArgumentParser().format_help()')
+    assert not modules.intersection(HEAVY_MODULES)
+
+
+def test_webdriver_classes_are_lazy():
+    modules = imported_modules('from selexe import SelexeRunner; sorted(SelexeRunner.webdriver_classes)')
+    assert 'selenium.webdriver' not in modules
+    assert 'selexe.selenium_driver' not in modules
+
+
+def test_browserless_runner_is_lazy():
+    modules = imported_modules('from selexe import SelexeRunner; SelexeRunner("testfiles/form1.sel", driver="http")')
+    assert 'selenium.webdriver' not in modules
@@ -0,0 +1,29 @@
+"""
+UT module to test browser launch profiles
+"""
+import sys
+import pytest
+
+sys.path.insert(0, '..')
+
+from selexe.selexe_runner import SelexeRunner, SelexeError  # noqa
+
+
+def test_chrome_profile():
+    runner = SelexeRunner('test.sel', driver='chrome', window_size=(800, 600), profile='fast-headless')
+    chrome_options = runner.options['chrome_options']
+    assert '--headless' in chrome_options.arguments
+    assert '--window-size=800,600' in chrome_options.arguments
+    assert chrome_options.experimental_options['prefs']['profile.managed_default_content_settings.images'] == 2
+    assert runner.launch_settings['window_size']
+
+
+def test_firefox_profile():
+    runner = SelexeRunner('test.sel', driver='firefox', window_size=(800, 600), profile='fast-headless')
+    assert '--width=800' in runner.options['options'].arguments
+    assert runner.options['firefox_profile'].default_preferences['permissions.default.image'] == 2
+
+
+def test_unknown_profile():
+    with pytest.raises(SelexeError):
+        SelexeRunner('test.sel', profile='unknown')
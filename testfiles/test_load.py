@@ -0,0 +1,109 @@
+"""
+UT module to test load generation, without any browser
+"""
+import sys
+import json
+import pytest
+
+sys.path.insert(0, '..')
+
+from selexe.load import LoadRunner, LoadReport, percentile  # noqa
+from selexe.__main__ import LoadArgumentParser  # noqa
+from selexe.selenium_polling import StepTiming  # noqa
+
+
+class FakeBrowser(object):
+    def __init__(self):
+        self.quitted = False
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quitted = True
+
+
+class FakeDriver(object):
+    def __init__(self, browser):
+        self.browser = browser
+        self.step_timings = []
+
+    def close_connections(self):
+        pass
+
+
+class FakeRunner(LoadRunner):
+    def __init__(self, *args, **kwargs):
+        super(FakeRunner, self).__init__(*args, **kwargs)
+        self.browsers = []
+
+    def launch_webdriver(self):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    def create_driver(self, driver):
+        return FakeDriver(driver)
+
+    def _wrapExecution(self, rows, sd):
+        for baseuri, command, target, value in rows:
+            step = StepTiming(command, target, value)
+            step.elapsed = 0.01
+            sd.step_timings.append(step)
+        return []
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([1.], 99) == 1.
+    assert percentile([1., 2., 3., 4., 5.], 50) == 3.
+    assert percentile([1., 2., 3., 4., 5.], 90) == 4.6
+    assert percentile([1., 2., 3., 4., 5.], 100) == 5.
+
+
+def test_report(tmp_path):
+    report = LoadReport(users=2)
+    report.start()
+    opened, typed, waited = StepTiming('open', '/'), StepTiming('type', 'id=q'), StepTiming('waitForText', 'id=r')
+    opened.elapsed, waited.elapsed = 0.2, 0.5
+    report.add_iteration('a.sel', [opened, waited], 1.)
+    report.add_iteration('a.sel', [opened, waited], 1., 'Running a.sel failed with timeout', waited)
+    report.finish()
+    summary = report.summary()
+    assert (summary['iterations'], summary['failed']) == (2, 1)
+    steps = {step['command']: step for step in summary['steps']}
+    assert steps['open']['count'] == 2 and steps['open']['p95'] == 200.
+    assert (steps['waitForText']['count'], steps['waitForText']['errors']) == (1, 1)
+    assert steps['(iteration)']['count'] == 2
+    assert 'a.sel open /' in report.format()
+    path = tmp_path / 'report.json'
+    report.write(str(path))
+    assert json.loads(path.read_text())['errors'] == {'Running a.sel failed with timeout': 1}
+
+
+def test_virtual_users():
+    runner = FakeRunner(['form1.sel', 'verifyTests.sel'], users=3, iterations=2, check=False)
+    assert runner.profile == 'fast-headless'
+    summary = runner.run().summary()
+    assert (summary['users'], summary['iterations'], summary['failed']) == (3, 6, 0)
+    files = set(step['file'] for step in summary['steps'])
+    assert files == {'form1.sel', 'verifyTests.sel'}
+    assert all(runner.measured(step['command']) for step in summary['steps'] if step['command'] != '(iteration)')
+    assert len(runner.browsers) == 3 and all(browser.quitted for browser in runner.browsers)
+
+
+def test_duration():
+    runner = FakeRunner(['form1.sel'], users=2, ramp_up=0.1, think_time=0.05, duration=0.3, check=False)
+    report = runner.run()
+    assert report.iterations >= 2
+    assert 0.3 <= report.duration < 2.
+
+
+def test_arguments():
+    parser = LoadArgumentParser()
+    args = parser.parse_args(['-u', '5', '--think-time', '1-3', '--block', '*.example', 'a.sel'])
+    assert (args.users, args.think_time, args.block, args.paths) == (5, (1., 3.), ['*.example'], ['a.sel'])
+    for option in ('--workers', '--data', '--shared-prefix', '--prefetch', '--snapshot-setup', '--pmd'):
+        assert option not in parser.format_help()
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--workers', '2', 'a.sel'])
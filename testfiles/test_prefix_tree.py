@@ -0,0 +1,133 @@
+"""
+UT module to test prefix tree of test case rows
+"""
+import sys
+import logging
+
+sys.path.insert(0, '..')
+
+from selexe.prefix_tree import PrefixTree, SharedPrefixRunner  # noqa
+from selexe.session_snapshot import SessionSnapshot  # noqa
+
+LOGIN = [(None, 'open', '/login', None), (None, 'type', 'id=user', 'admin'), (None, 'clickAndWait', 'id=ok', None)]
+
+
+def test_shared_prefix():
+    tree = PrefixTree([
+        ('a.sel', LOGIN + [(None, 'verifyTitle', 'A', None)]),
+        ('b.sel', LOGIN + [(None, 'verifyTitle', 'B', None)]),
+        ('c.sel', LOGIN),
+        ('d.sel', [(None, 'open', '/', None)]),
+        ])
+    assert tree.total_rows == 12
+    assert tree.tree_rows == 6
+    root = tree.root
+    assert root.rows == []
+    login, other = root.children
+    assert login.rows == LOGIN
+    assert login.paths == ['c.sel']
+    assert [child.paths for child in login.children] == [['a.sel'], ['b.sel']]
+    assert other.paths == ['d.sel']
+    assert list(root.iter_paths()) == ['c.sel', 'a.sel', 'b.sel', 'd.sel']
+
+
+def test_single_file():
+    tree = PrefixTree([('a.sel', LOGIN)])
+    assert tree.tree_rows == tree.total_rows == 3
+    assert tree.root.rows == LOGIN
+
+
+class FakeBrowser(object):
+    def __init__(self):
+        self.current_url = 'about:blank'
+        self.cookies = {}  # by origin
+        self.screenshots = []
+        self.quitted = False
+
+    def quit(self):
+        self.quitted = True
+
+
+class FakeDriver(object):
+    """Driver running open, createCookie and verifyCookiePresent on a FakeBrowser, failing on any other command"""
+    form_commands = ()
+    baseuri = None
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.verification_errors = []
+
+    def execute(self, command, target=None, value=None):
+        if command == 'open':
+            self.driver.current_url = target
+        elif command == 'createCookie':
+            self.driver.cookies.setdefault(self.driver.current_url, set()).add(target)
+        elif command == 'verifyCookiePresent':
+            if target not in self.driver.cookies.get(self.driver.current_url, ()):
+                self.verification_errors.append('%s not present' % target)
+        else:
+            raise RuntimeError('%s failed' % command)
+
+    def snapshot(self):
+        cookies = self.driver.cookies.get(self.driver.current_url, ())
+        return SessionSnapshot(self.driver.current_url, [{'name': name} for name in cookies])
+
+    def restore(self, snapshot):
+        # as browsers, only cookies of snapshot origin are reset
+        self.driver.current_url = snapshot.url
+        self.driver.cookies[snapshot.url] = {cookie['name'] for cookie in snapshot.cookies}
+
+    def save_screenshot(self, path):
+        self.driver.screenshots.append(path)
+
+    def close_connections(self):
+        pass
+
+
+class FakeRunner(SharedPrefixRunner):
+    def __init__(self, *args, **kwargs):
+        super(FakeRunner, self).__init__(*args, **kwargs)
+        self.browsers = []
+
+    def launch_webdriver(self):
+        self.browsers.append(FakeBrowser())
+        return self.browsers[-1]
+
+    def create_driver(self, driver):
+        return FakeDriver(driver)
+
+
+def selenese(path, rows):
+    cells = ''.join('<tr><td>%s</td><td>%s</td><td></td></tr>' % row for row in rows)
+    path.write_text('<html><head><link rel="selenium.base" href="http://localhost/" /></head><body><table><tbody>%s'
+                    '</tbody></table></body></html>' % cells)
+    return str(path)
+
+
+def test_unrelated_files_isolation(tmp_path):
+    a = selenese(tmp_path / 'a.sel', [('open', 'http://a/'), ('createCookie', 'session=a'), ('open', 'http://b/'),
+                                      ('createCookie', 'session=b')])
+    b = selenese(tmp_path / 'b.sel', [('open', 'http://b/'), ('verifyCookiePresent', 'session=b')])
+    runner = FakeRunner([a, b], check=False)
+    results = runner.run()
+    assert results == {a: [], b: ['session=b not present']}
+    assert len(runner.browsers) == 2
+    assert all(browser.quitted for browser in runner.browsers)
+
+
+def test_branch_origin_warning(tmp_path, caplog):
+    login = [('open', 'http://a/'), ('createCookie', 'session=a')]
+    a = selenese(tmp_path / 'a.sel', login + [('open', 'http://sso/'), ('createCookie', 'token=a')])
+    b = selenese(tmp_path / 'b.sel', login + [('verifyCookiePresent', 'session=a')])
+    with caplog.at_level(logging.WARNING, logger='selexe'):
+        results = FakeRunner([a, b], check=False).run()
+    assert results == {a: [], b: []}
+    assert '%s ended on http://sso, cookies and storages left on that origin are not reset' % a in caplog.text
+
+
+def test_error_screenshot(tmp_path):
+    a = selenese(tmp_path / 'a.sel', [('open', 'http://a/'), ('click', 'id=missing')])
+    runner = FakeRunner([a], check=False, error_screenshot_dir=str(tmp_path))
+    results = runner.run()
+    assert results[a].startswith('Running %s failed with click failed' % a)
+    assert len(runner.browsers[0].screenshots) == 1
@@ -0,0 +1,206 @@
+"""
+UT module to test local proxy used by browsers
+"""
+import sys
+import socket
+import logging
+import threading
+import http.client
+import pytest
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, '..')
+
+from selexe.proxy import LocalProxy  # noqa
+from selexe.selexe_runner import SelexeRunner  # noqa
+from selexe.asset_cache import AssetCache  # noqa
+from selexe.connection_pool import Response  # noqa
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    streaming = threading.Event()  # set to end streamed response
+
+    def do_GET(self):  # noqa
+        if self.path == '/headers':
+            body = '\n'.join(self.headers.get_all('X-Tag')).encode('utf-8')
+        elif self.path == '/events':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b'7\r\ndata: 1\r\n')
+            self.wfile.flush()
+            self.streaming.wait(5)
+            self.wfile.write(b'7\r\ndata: 2\r\n0\r\n\r\n')
+            return
+        else:
+            body = ('upstream %s' % self.path).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'max-age=60')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), UpstreamHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:%d' % httpd.server_port
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def proxied(proxy, url):
+    connection = http.client.HTTPConnection(*proxy.address, timeout=5)
+    try:
+        connection.request('GET', url)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def test_block(upstream):
+    with LocalProxy(block=['*.analytics.example', 'http://127.0.0.1:*/ads/*']) as proxy:
+        assert proxied(proxy, '%s/app.js' % upstream) == (200, b'upstream /app.js')
+        assert proxied(proxy, '%s/ads/banner.js' % upstream) == (204, b'')
+        assert proxied(proxy, 'http://www.analytics.example/track') == (204, b'')
+        assert proxy.take_counts() == {'127.0.0.1': 1, 'www.analytics.example': 1}
+        assert not proxy.take_counts()
+
+
+def test_blocked_tunnel():
+    with LocalProxy(block=['*.analytics.example']) as proxy:
+        connection = http.client.HTTPConnection(*proxy.address, timeout=5)
+        connection.request('CONNECT', 'www.analytics.example:443')
+        assert connection.getresponse().status == 403
+        connection.close()
+
+
+def test_asset_cache(upstream):
+    cache = AssetCache(rules=['*.js'])
+    with LocalProxy(cache=cache) as proxy:
+        for i in range(3):
+            assert proxied(proxy, '%s/bundle.js' % upstream) == (200, b'upstream /bundle.js')
+        assert proxied(proxy, '%s/index.html' % upstream) == (200, b'upstream /index.html')
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.stats()['entries'] == 1
+
+
+def test_asset_cache_directory(tmpdir, upstream):
+    url = '%s/bundle.js' % upstream
+    AssetCache(directory=str(tmpdir)).put(url, {}, Response(200, 'OK', [('Content-Type', 'text/javascript')], b'x'))
+    cache = AssetCache(directory=str(tmpdir))
+    assert cache.get(url, {}).data == b'x'
+    assert cache.get(url, {'Accept-Encoding': 'gzip'}) is None
+    assert cache.hit_ratio == 0.5
+
+
+def test_tunnel():
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def echo():
+        connection, _ = server.accept()
+        with connection:
+            while True:
+                data = connection.recv(1024)
+                if not data:
+                    break
+                connection.sendall(data)
+
+    thread = threading.Thread(target=echo)
+    thread.daemon = True
+    thread.start()
+    with LocalProxy() as proxy, socket.create_connection(proxy.address, timeout=5) as client:
+        client.sendall(b'CONNECT 127.0.0.1:%d HTTP/1.1\r\n\r\n' % server.getsockname()[1])
+        assert client.recv(1024).startswith(b'HTTP/1.1 200')
+        for i in range(5):
+            message = b'message %d' % i
+            client.sendall(message)
+            assert client.recv(1024) == message
+    server.close()
+
+
+def test_repeated_headers(upstream):
+    with LocalProxy() as proxy:
+        connection = http.client.HTTPConnection(*proxy.address, timeout=5)
+        connection.putrequest('GET', '%s/headers' % upstream)
+        connection.putheader('X-Tag', 'a')
+        connection.putheader('X-Tag', 'b')
+        connection.endheaders()
+        assert connection.getresponse().read() == b'a\nb'
+        connection.close()
+
+
+def test_streaming(upstream):
+    UpstreamHandler.streaming.clear()
+    with LocalProxy() as proxy:
+        connection = http.client.HTTPConnection(*proxy.address, timeout=5)
+        try:
+            connection.request('GET', '%s/events' % upstream)
+            response = connection.getresponse()
+            assert response.read1(1024) == b'data: 1'  # before upstream response is over
+            UpstreamHandler.streaming.set()
+            assert response.read() == b'data: 2'
+            assert proxied(proxy, '%s/app.js' % upstream) == (200, b'upstream /app.js')
+        finally:
+            UpstreamHandler.streaming.set()
+            connection.close()
+
+
+def test_asset_cache_vary():
+    cache = AssetCache()
+    for vary in ('Accept-Encoding', 'Cookie', 'accept-encoding, Authorization', '*'):
+        url = 'http://localhost/%s.js' % vary
+        cache.put(url, {}, Response(200, 'OK', [('Vary', vary)], b'x'))
+    assert cache.stats()['entries'] == 1
+    assert cache.get('http://localhost/Accept-Encoding.js', {}).data == b'x'
+
+
+def test_asset_cache_credentials():
+    cache = AssetCache()
+    cache.put('http://localhost/cookie.js', {'Cookie': 'session=1'}, Response(200, 'OK', [], b'x'))
+    cache.put('http://localhost/auth.js', [('Authorization', 'Basic Zm9vOmJhcg==')], Response(200, 'OK', [], b'x'))
+    cache.put('http://localhost/login.js', {}, Response(200, 'OK', [('Set-Cookie', 'session=1')], b'x'))
+    assert cache.stats()['entries'] == 0
+    cache.put('http://localhost/app.js', {'Accept-Encoding': 'gzip'}, Response(200, 'OK', [], b'x'))
+    assert cache.stats()['entries'] == 1
+
+
+def test_asset_cache_run_stats(caplog):
+    cache = AssetCache()
+    cache.put('http://localhost/app.js', {}, Response(200, 'OK', [], b'x'))
+    cache.get('http://localhost/app.js', {})  # hit of a previous run
+    with LocalProxy(cache=cache) as proxy:
+        runner = SelexeRunner('test.sel', proxy=proxy)
+        runner.track_proxy()
+        cache.get('http://localhost/app.js', {})
+        cache.get('http://localhost/other.js', {})
+        with caplog.at_level(logging.INFO, logger='selexe'):
+            runner.release_proxy()
+    assert 'Asset cache: 1 hits, 1 misses (50% hit ratio) in test.sel' in caplog.text
+
+
+def test_proxy_released_on_launch_failure():
+    def broken(**options):
+        raise RuntimeError('browser cannot be launched')
+
+    class BrokenRunner(SelexeRunner):
+        webdriver_classes = {'firefox': broken}
+
+    runner = BrokenRunner('form1.sel', block=['*.analytics.example'], check=False)
+    with pytest.raises(RuntimeError):
+        runner.run()
+    assert runner.proxy._thread is None
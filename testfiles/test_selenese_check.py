@@ -0,0 +1,74 @@
+"""
+UT module to test pre-flight validation of selenese files, which runs without any browser
+"""
+import sys
+import pytest
+
+sys.path.insert(0, '..')
+
+from selexe import SelexeRunner, SelexeError                     # noqa
+from selexe.selenese_check import SeleneseValidator, check_paths  # noqa
+from selexe.__main__ import main                                  # noqa
+
+TESTCASE = """<html><head><link rel="selenium.base" href="http://localhost:8080/" /></head><body><table><tbody>
+%s
+</tbody></table></body></html>"""
+SUITE = """<html><body><table id="suiteTable"><tbody>
+%s
+</tbody></table></body></html>"""
+
+
+def write_testcase(tmp_path, name, *rows):
+    path = tmp_path / name
+    path.write_text(TESTCASE % '\n'.join('<tr><td>%s</td><td>%s</td><td>%s</td></tr>' % row for row in rows))
+    return str(path)
+
+
+def test_valid_files():
+    assert check_paths(['verifyTests.sel', 'form1.sel', 'fixtures.sel', 'verifyTestFailing.sel']) == []
+
+
+def test_invalid_rows(tmp_path):
+    path = write_testcase(
+        tmp_path, 'invalid.sel',
+        ('open', '/static/page1', ''),
+        ('verifyTxt', 'css=h1', 'H1 text'),
+        ('click', 'foo=bar', ''),
+        ('addLocationStrategy', 'foo', 'return null;'),
+        ('click', 'foo=bar', ''),
+        ('click', '${prefix}=bar', ''),
+        ('select', 'id=selectTest', 'index=first'),
+        ('setTimeout', 'soon', ''),
+        ('openWindow', '/popup', 'popup'),
+        )
+    problems = SeleneseValidator().validate_path(path)
+    assert [(problem.row, problem.command) for problem in problems] == [
+        (2, 'verifyTxt'), (3, 'click'), (7, 'select'), (8, 'setTimeout'), (9, 'openWindow')]
+    assert "did you mean 'verifyText'" in problems[0].message
+
+
+def test_suite_links(tmp_path):
+    write_testcase(tmp_path, 'valid.sel', ('open', '/static/page1', ''))
+    suite = tmp_path / 'suite.sel'
+    suite.write_text(SUITE % '<tr><td><a href="valid.sel">a</a></td></tr><tr><td><a href="missing.sel">b</a></td></tr>')
+    problems = check_paths([str(suite)])
+    assert len(problems) == 1
+    assert problems[0].row == 2
+    assert 'missing.sel' in problems[0].message
+
+
+def test_runner_rejects_invalid_file_before_launching_browser(tmp_path):
+    path = write_testcase(tmp_path, 'invalid.sel', ('clik', 'id=x', ''))
+    with pytest.raises(SelexeError):
+        SelexeRunner(path, driver='no-such-driver').run()
+
+
+def test_check_driver(tmp_path, capsys):
+    path = write_testcase(tmp_path, 'hover.sel', ('open', '/static/page1', ''), ('mouseOver', 'id=menu', ''))
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--check', path])
+    assert exit_info.value.code == 0
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--check', '--driver', 'http', path])
+    assert exit_info.value.code == 1
+    assert 'requires a browser' in capsys.readouterr().out
@@ -0,0 +1,42 @@
+"""
+UT module to test selenium command registry and catalogue, which must work without any webdriver
+"""
+import sys
+
+sys.path.insert(0, '..')
+
+from selexe.selenium_command import command_catalogue, seleniummulticommand   # noqa
+from selexe.selenium_driver import SeleniumDriver                              # noqa
+
+
+class CustomDriver(SeleniumDriver):
+    @seleniummulticommand
+    def Answer(self, target, value=None):  # noqa
+        """ Get the answer. """
+        return target, '42'
+
+
+def test_registry():
+    commands = SeleniumDriver.commands
+    assert 'clickAndWait' in commands
+    assert 'verifyNotText' in commands
+    assert 'putRest' in commands  # user function
+    assert 'ActionChains' not in commands  # imported names are not user functions
+    assert 'verifyAnswer' not in commands
+    assert 'verifyAnswer' in CustomDriver.commands
+    assert 'waitForNotAnswer' in CustomDriver.commands
+
+
+def test_catalogue():
+    catalogue = {command['name']: command for command in command_catalogue(CustomDriver.commands)}
+    assert catalogue['clickAndWait']['proto'] == 'click'
+    assert catalogue['clickAndWait']['variant'] == 'AndWait'
+    assert catalogue['waitForNotAnswer']['variant'] == 'waitForNot'
+    assert catalogue['waitForNotAnswer']['wait_for_page'] is False
+    assert catalogue['getAnswer']['implemented'] is True
+    assert catalogue['openWindow']['implemented'] is False
+    assert catalogue['mouseDownAt']['implemented'] is True
+    assert catalogue['putRest']['source'] == 'userfunction'
+    assert catalogue['open']['source'] == 'driver'
+    # commands must not be modified by building catalogue
+    assert SeleniumDriver.commands['verifyText'].command.wait_for_page is True
@@ -473,3 +473,16 @@ class Test_SeleniumDriver:
         """ checking that a non-existent command raises a NotImplementedError"""
         with pytest.raises(NotImplementedError):
             self.exe('myNewCommand', 'action')
+
+    def test_network_idle_pushState(self):
+        """ checking that AndWait commands end on network idle when a single-page application changes page """
+        sd = selenium_driver.SeleniumDriver(self.driver, baseuri=SELEXE_BASEURI, timeout=SELEXE_TIMEOUT,
+                                            network_idle=True)
+        sd.execute('open', '/static/spa')
+        sd.execute('clickAndWait', 'id=next')
+        assert sd.execute('getLocation').endswith('/static/spa?page=2')
+        sd.execute('assertText', 'id=title', 'Page 2')
+        sd.execute('assertText', 'id=content', 'Loaded content')
+        # deprecation is cleared on the same document, so page load waits do not time out
+        assert sd.runtime.call('pageReady')
+        sd.execute('assertTitle', 'Single page')
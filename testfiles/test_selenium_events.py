@@ -0,0 +1,33 @@
+"""
+UT module to test compilation of selenese events into W3C actions
+"""
+import sys
+
+sys.path.insert(0, '..')
+
+from selexe.selenium_events import ActionSequence, EventEngine, ELEMENT_KEY  # noqa
+
+
+class FakeElement(object):
+    id = 'element-1'
+    size = {'width': 100, 'height': 40}
+
+
+def test_click_payload():
+    payload = EventEngine(None, None, None).compile('click', FakeElement()).payload()
+    pointer, = payload['actions']
+    assert pointer['id'] == 'mouse'
+    assert [action['type'] for action in pointer['actions']] == ['pointerMove', 'pointerDown', 'pointerUp']
+    assert pointer['actions'][0]['origin'] == {ELEMENT_KEY: 'element-1'}
+
+
+def test_coordinates_from_element_center():
+    pointer, = EventEngine(None, None, None).compile('mousemove', FakeElement(), (10, 30)).payload()['actions']
+    move = pointer['actions'][0]
+    assert (move['x'], move['y']) == (-40, 10)
+
+
+def test_input_sources_padded():
+    pointer, keyboard = ActionSequence().key_down('a').move().key_up('a').payload()['actions']
+    assert [action['type'] for action in pointer['actions']] == ['pause', 'pointerMove', 'pause']
+    assert [action['type'] for action in keyboard['actions']] == ['keyDown', 'pause', 'keyUp']
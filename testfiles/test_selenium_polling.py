@@ -0,0 +1,55 @@
+"""
+UT module to test deadline-based polling
+"""
+import sys
+import pytest
+
+sys.path.insert(0, '..')
+
+from selenium.common.exceptions import TimeoutException  # noqa
+from selexe.selenium_polling import PollSchedule, StepTiming  # noqa
+
+
+class FakeClock(object):
+    def __init__(self, probe_cost=0.):
+        self.now = 0.
+        self.probe_cost = probe_cost
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def test_backoff():
+    fake = FakeClock()
+    schedule = PollSchedule(1000, 100, initial=10, clock=fake.clock, sleep=fake.sleep)
+    with pytest.raises(TimeoutException):
+        for _ in schedule:
+            pass
+    assert fake.sleeps[:5] == [0.01, 0.02, 0.04, 0.08, 0.1]
+    assert fake.now == pytest.approx(1.)
+
+
+def test_deadline_accounts_probe_time():
+    fake = FakeClock()
+    record = StepTiming('waitForText')
+    schedule = PollSchedule(1000, 100, record=record, clock=fake.clock, sleep=fake.sleep)
+    with pytest.raises(TimeoutException):
+        for _ in schedule:
+            fake.now += 0.3  # slow probe
+    assert fake.now < 1.5
+    assert record.waits == 1
+    assert record.attempts == 3
+    assert record.slept == pytest.approx(0.2)
+
+
+def test_first_attempt_is_immediate():
+    fake = FakeClock()
+    for attempt in PollSchedule(0, 100, clock=fake.clock, sleep=fake.sleep):
+        break
+    assert attempt == 0
+    assert fake.sleeps == []
@@ -0,0 +1,28 @@
+"""
+UT module to test error sentinel parsing
+"""
+import sys
+import pytest
+
+sys.path.insert(0, '..')
+
+from selexe.selenium_driver import SeleniumDriver  # noqa
+
+
+@pytest.mark.parametrize('spec, kind, value', [
+    ('title=^500', 'title', '^500'),
+    ('js=window.appCrashed', 'js', 'window.appCrashed'),
+    ('css=.error-banner', 'css', '.error-banner'),
+    ('id=error', 'id', 'error'),
+    ('link=Retry', 'xpath', '//a[normalize-space(text())=\'Retry\']'),
+    ('errorbox', 'xpath', '//*[@id=\'errorbox\' or @name=\'errorbox\']'),
+    ])
+def test_error_sentinel(spec, kind, value):
+    sentinel = SeleniumDriver.error_sentinel(spec)
+    assert (sentinel.kind, sentinel.value, str(sentinel)) == (kind, value, spec)
+
+
+@pytest.mark.parametrize('spec', ['ui=error', 'unknown=error'])
+def test_invalid_error_sentinel(spec):
+    with pytest.raises(ValueError):
+        SeleniumDriver.error_sentinel(spec)
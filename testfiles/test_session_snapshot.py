@@ -0,0 +1,50 @@
+"""
+UT module to test session snapshot cache
+"""
+import os
+import sys
+
+sys.path.insert(0, '..')
+
+from selexe.session_snapshot import SessionSnapshot, SnapshotCache  # noqa
+
+KEY = ('fixtures.setUp', 'http://localhost:8080', 'firefox')
+
+
+def snapshot(**kwargs):
+    cookies = [{'name': 'session', 'value': 'abc', 'path': '/', 'sameSite': None}]
+    return SessionSnapshot('http://localhost:8080/home', cookies, local_storage={'token': 'x'},
+                           stored_variables={'user': 'admin'}, **kwargs)
+
+
+def test_cookie_keys():
+    assert snapshot().cookies == [{'name': 'session', 'value': 'abc', 'path': '/'}]
+
+
+def test_memory_cache():
+    cache = SnapshotCache()
+    assert cache.get(KEY) is None
+    cache.set(KEY, snapshot())
+    assert cache.get(KEY).stored_variables == {'user': 'admin'}
+    cache.discard(KEY)
+    assert cache.get(KEY) is None
+
+
+def test_expiry():
+    cache = SnapshotCache(expiry=60)
+    cache.set(KEY, snapshot(created=0))
+    assert cache.get(KEY) is None
+
+
+def test_directory_cache(tmpdir):
+    SnapshotCache(directory=str(tmpdir)).set(KEY, snapshot())
+    restored = SnapshotCache(directory=str(tmpdir)).get(KEY)
+    assert restored.to_dict() == snapshot(created=restored.created).to_dict()
+
+
+def test_directory_permissions(tmpdir):
+    directory = tmpdir.join('snapshots')
+    cache = SnapshotCache(directory=str(directory))
+    cache.set(KEY, snapshot())
+    assert directory.stat().mode & 0o777 == 0o700
+    assert tmpdir.join('snapshots', os.path.basename(cache._path(KEY))).stat().mode & 0o777 == 0o600
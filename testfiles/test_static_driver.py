@@ -0,0 +1,129 @@
+"""
+UT module to test the static DOM driver against a local server
+"""
+import sys
+import threading
+import pytest
+
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, '..')
+
+from selexe.static_driver import StaticDriver, StaticSession  # noqa
+from selexe.selexe_runner import SelexeRunner  # noqa
+from selexe.selenese_check import SeleneseValidator  # noqa
+
+FORM = b'''<html><head><title>Edit user</title></head><body>
+<a href="/form?page=2" class="nav next">Next page</a> <a href="javascript:void(0)">Menu</a>
+<form action="/save" method="post">
+  <input type="hidden" name="csrf" value="token">
+  <input type="text" id="name" name="name" value="joe">
+  <textarea name="notes">old</textarea>
+  <select id="role" name="role"><option value="u">User</option><option value="a">Admin</option></select>
+  <input type="checkbox" name="active" value="yes" checked>
+  <input type="radio" name="plan" value="free" checked><input type="radio" name="plan" value="pro">
+  <input type="submit" name="action" value="Save"><input type="submit" name="action" value="Delete">
+  <span onclick="edit()">Edit</span>
+</form>
+<p id="greeting">Hello
+     <b>joe</b><script>var x = 1;</script></p></body></html>'''
+
+
+class AppHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, body, headers=()):
+        self.send_response(200)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # noqa
+        self._send(FORM if self.path.startswith('/form') else b'<html><body><p id="path">%s</p></body></html>'
+                   % self.path.encode('utf-8'))
+
+    def do_POST(self):  # noqa
+        data = parse_qsl(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        items = ''.join('<li id="%s">%s</li>' % item for item in data)
+        self._send(('<html><body><ul>%s</ul></body></html>' % items).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def driver():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), AppHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    session = StaticSession(timeout=5)
+    try:
+        yield StaticDriver(session, 'http://127.0.0.1:%d' % httpd.server_port, timeout=5000)
+    finally:
+        session.quit()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_form_submit(driver):
+    driver.execute('open', '/form')
+    driver.execute('type', 'name', 'jane')
+    driver.execute('type', 'name=notes', 'new')
+    driver.execute('select', 'id=role', 'label=Admin')
+    driver.execute('uncheck', 'css=input[name=active]')
+    driver.execute('check', 'css=input[value=pro]')
+    assert driver.execute('verifyValue', 'id=name', 'jane')
+    assert driver.execute('verifyValue', 'role', 'a')
+    assert driver.execute('verifyValue', 'css=input[value=free]', 'off')
+    driver.execute('clickAndWait', 'css=input[value=Delete]')
+    assert [li.get_text() for li in driver.driver.document.find_all('li')] == [
+        'token', 'jane', 'new', 'a', 'pro', 'Delete']
+    assert driver.execute('verifyText', 'id=action', 'Delete')
+    assert not driver.verification_errors
+
+
+def test_links_and_verifications(driver):
+    driver.execute('open', '/form')
+    assert driver.execute('verifyTitle', 'Edit user')
+    assert driver.execute('verifyAttribute', 'link=Next page@class', 'nav next')
+    assert driver.execute('verifyElementPresent', 'css=form select')
+    assert driver.execute('verifyElementNotPresent', 'id=missing')
+    with pytest.raises(NotImplementedError, match='JavaScript'):
+        driver.execute('click', 'link=Menu')
+    with pytest.raises(NotImplementedError, match='JavaScript'):
+        driver.execute('click', 'css=span')
+    driver.execute('clickAndWait', 'link=Next*')
+    driver.execute('submitAndWait', 'css=form')
+    assert driver.execute('verifyText', 'id=csrf', 'token')
+    assert driver.execute('verifyElementNotPresent', 'id=action')  # no submit button used
+    driver.execute('open', '/other?x=1')
+    assert driver.execute('verifyText', 'path', '/other?x=1')
+
+
+def test_xpath(driver):
+    pytest.importorskip('lxml')
+    driver.execute('open', '/form')
+    driver.execute('type', '//input[@id="name"]', 'jim')
+    assert driver.execute('verifyValue', 'xpath=//form/input[2]', 'jim')
+    assert driver.execute('verifyXpathCount', '//input[@type="radio"]', '2')
+
+
+def test_runner():
+    runner = SelexeRunner('form1.sel', driver='static', check=False)
+    assert runner.driver_class is StaticDriver
+    rows = [(None, 'type', 'dom=document.forms[0]', 'x'), (None, 'mouseOver', 'id=x', '')]
+    problems = SeleneseValidator(StaticDriver).validate_rows('test.sel', rows)
+    assert [problem.row for problem in problems] == [1, 2]
+    assert problems[1].message.startswith('requires a browser')
+
+
+def test_texts(driver):
+    driver.execute('open', '/form')
+    assert driver.execute('getText', 'id=greeting') == 'Hello joe'
+    assert driver.execute('verifyTextPresent', 'Hello joe')
+    assert not driver.execute('verifyTextPresent', 'var x')
@@ -0,0 +1,31 @@
+"""
+UT module to test change tracking of stored variables
+"""
+import sys
+
+sys.path.insert(0, '..')
+
+from selexe.stored_variables import StoredVariables  # noqa
+
+
+def test_take_changes():
+    variables = StoredVariables(a=1, b=2)
+    assert variables.take_changes() == ({'a': 1, 'b': 2}, [])
+    assert variables.take_changes() == ({}, [])
+    variables['a'] = 3
+    del variables['b']
+    variables.setdefault('c', 4)
+    changed, deleted = variables.take_changes()
+    assert changed == {'a': 3, 'c': 4}
+    assert deleted == ['b']
+
+
+def test_apply_changes():
+    variables = StoredVariables(a=1, b=2)
+    variables.take_changes()
+    variables['b'] = 5
+    variables.apply_changes({'a': 2, 'c': 3}, ['b'])
+    assert variables == {'a': 2, 'c': 3}
+    assert variables.take_changes() == ({}, [])
+    variables.mark_changed()
+    assert variables.take_changes() == ({'a': 2, 'c': 3}, [])